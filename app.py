@@ -1,22 +1,31 @@
+import uuid
+
 from dotenv import load_dotenv
-from flask import Flask
+from flask import Flask, g, request
 from flask_swagger_ui import get_swaggerui_blueprint
 
 load_dotenv()
 
-from modules.message.message_controller import message_bp
+from modules.core.logging_config import bind_log_context, configure_logging, reset_log_context
+
+from modules.debug.debug_controller import debug_bp, is_debug_profiling_available
+from modules.jobs.job_controller import jobs_bp
+from modules.message.message_controller import message_bp, outbound_queue
+from modules.metrics.metrics_controller import metrics_bp
 from modules.models.exception.global_exception_handler import exception_scrape_bp
+from modules.models.utils.json_provider import PydanticJSONProvider
 from modules.web_scraping.scraping_controller import scraping_bp
 import logging
 
 
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
 
 app = Flask(__name__)
+app.json = PydanticJSONProvider(app)
 
 
 ### Configuração do Swagger UI ###
@@ -44,6 +53,39 @@ app.register_blueprint(scraping_bp)
 # Blueprint de message
 app.register_blueprint(message_bp)
 
+# Blueprint de jobs assíncronos
+app.register_blueprint(jobs_bp)
+
+# Blueprint de métricas (Prometheus)
+app.register_blueprint(metrics_bp)
+
+# Blueprint de profiling (desligado por padrão; ver DEBUG_PROFILING_ENABLED)
+if is_debug_profiling_available():
+    app.register_blueprint(debug_bp)
+
+# Retoma o envio do que ficou na fila de saída do WhatsApp (pendente ou com retentativa agendada) antes do reinício
+outbound_queue.start()
+
+@app.before_request
+def bind_request_id():
+    # Todo log emitido durante a requisição carrega o request_id (o do cliente, se enviado em X-Request-ID)
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.log_context_token = bind_log_context(request_id=g.request_id)
+
+
+@app.after_request
+def echo_request_id(response):
+    response.headers.setdefault("X-Request-ID", g.get("request_id", ""))
+    return response
+
+
+@app.teardown_request
+def unbind_request_id(_error=None):
+    token = g.pop("log_context_token", None)
+    if token is not None:
+        reset_log_context(token)
+
+
 @app.route('/')
 def home():
     logger.info("Acessando a rota inicial.")
@@ -0,0 +1,103 @@
+"""
+Compara o caminho validado (cada conversão entidade -> DTO -> análise revalida todos os movimentos,
+serialização via model_dump + json.dumps) com o caminho rápido usado pela aplicação (ProcessMapper e
+análise com model_construct, serialização com pydantic_core.to_json).
+
+Uso: python -m benchmarks.dto_pipeline_benchmark [--processes 20] [--movements 5000] [--repeat 3]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from pydantic_core import to_json
+
+from modules.models.process_dtos import AnaliseUltimoMovimentoDTO, MovimentoDTO, ProcessoScrapedDTO
+from modules.models.process_models import Movimento, Processo
+from modules.models.utils.process_mapper import ProcessMapper
+
+
+def build_entities(processes: int, movements: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    entities = []
+    for i in range(processes):
+        movimentos = [
+            Movimento(ordem=j + 1, nome=f"Juntada de petição {j}",
+                      dataHora=now - timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 5)))
+            for j in range(movements)
+        ]
+        entities.append(Processo(
+            partesEnvolvidas="AUTOR: Fulano; RÉU: Beltrano", numeroProcesso=f"{i:07d}-00.2024.8.19.0001",
+            tribunal="TJRJ", sistema="Eproc", grau="1ª Instância", movimentos=movimentos,
+            dataHoraUltimaAtualizacao=max(m.dataHora for m in movimentos)
+        ))
+    return entities
+
+
+def analysis_fields(dto: ProcessoScrapedDTO) -> dict:
+    ultimo = max(dto.movimentos, key=lambda m: m.dataHora)
+    return dict(
+        partesEnvolvidas=dto.partesEnvolvidas, numeroProcesso=dto.numeroProcesso, tribunal=dto.tribunal,
+        sistema=dto.sistema, grau=dto.grau, dataHoraUltimaAtualizacao=dto.dataHoraUltimaAtualizacao,
+        ultimoMovimento=ultimo, movimento_recente=True,
+        ultima_atualizacao_delta_horas=(datetime.now() - ultimo.dataHora).total_seconds() / 3600,
+        novosMovimentos=dto.movimentos[:10]
+    )
+
+
+def validated_path(entities):
+    """Caminho anterior: revalida em cada etapa e serializa passando por dicts."""
+    size = 0
+    for entity in entities:
+        dto = ProcessoScrapedDTO(
+            partesEnvolvidas=entity.partesEnvolvidas, numeroProcesso=entity.numeroProcesso,
+            tribunal=entity.tribunal, sistema=entity.sistema, grau=entity.grau,
+            movimentos=[MovimentoDTO(ordem=m.ordem, nome=m.nome, dataHora=m.dataHora) for m in entity.movimentos],
+            dataHoraUltimaAtualizacao=entity.dataHoraUltimaAtualizacao
+        )
+        analise = AnaliseUltimoMovimentoDTO(**analysis_fields(dto))
+        size += len(json.dumps({"result": dto.model_dump(mode="json")}))
+        size += len(json.dumps(analise.model_dump(mode="json")))
+    return size
+
+
+def fast_path(entities):
+    """Caminho atual: model_construct depois da validação no scraper e encoder do pydantic_core."""
+    size = 0
+    for entity in entities:
+        dto = ProcessMapper.from_entity_to_dto(entity)
+        analise = AnaliseUltimoMovimentoDTO.model_construct(**analysis_fields(dto))
+        size += len(to_json({"result": dto}))
+        size += len(to_json(analise))
+    return size
+
+
+def timed(func, *args, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=20)
+    parser.add_argument("--movements", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    entities = build_entities(args.processes, args.movements)
+    print(f"{args.processes} processos com {args.movements} movimentos cada (melhor de {args.repeat} execuções)")
+
+    validated = timed(validated_path, entities, repeat=args.repeat)
+    fast = timed(fast_path, entities, repeat=args.repeat)
+    print(f"  caminho validado : {validated * 1000:9.1f} ms")
+    print(f"  caminho rápido   : {fast * 1000:9.1f} ms  ({validated / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
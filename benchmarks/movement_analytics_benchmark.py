@@ -0,0 +1,132 @@
+"""
+Custo da análise de recência de um lote (último movimento, delta em horas, processos alterados e percentis
+de defasagem por tribunal), em três versões:
+
+- "por objeto": max() e aritmética de datetime por DTO e percentis em Python, como a análise fazia
+  processo a processo antes das colunas;
+- "colunar datetime64": todos os movimentos em colunas datetime64 e o último de cada processo achado com
+  lexsort (a primeira versão das colunas);
+- "colunar": dataHora em segundos (datetime.timestamp()) e último movimento por redução agrupada
+  (np.maximum.reduceat + argmax agrupado), como em movement_analytics. Também é medido só o fim da
+  passagem ("colunas prontas"): na consulta ativa cada worker converte os movimentos do seu processo ao
+  analisá-lo, e no fim resta a redução agrupada e os percentis.
+
+Converter cada datetime (timestamp()) custa mais que um max() por DTO; o ganho das colunas está no fim da
+passagem, que deixa de percorrer os objetos.
+
+Uso: python -m benchmarks.movement_analytics_benchmark [--processes 50000] [--movements 40] [--repeat 3]
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from modules.core.consults.movement_analytics import STALENESS_PERCENTILES, MovementColumns, analyze_recency
+from modules.models.process_dtos import MovimentoDTO, ProcessoScrapedDTO
+
+TRIBUNAIS = ["TJRJ", "TRF2", "TRT1"]
+
+
+def build_dtos(processes: int, movements: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    dtos = []
+    for i in range(processes):
+        movimentos = [
+            MovimentoDTO.model_construct(ordem=j, nome=f"Movimento {j}",
+                                         dataHora=now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)))
+            for j in range(rng.randint(0, movements))
+        ]
+        dtos.append(ProcessoScrapedDTO.model_construct(
+            partesEnvolvidas="", numeroProcesso=f"{i:07d}-00.2024.8.19.0001", tribunal=rng.choice(TRIBUNAIS),
+            sistema="pje_rj", grau="1", dataHoraUltimaAtualizacao=now, movimentos=movimentos
+        ))
+    changed = [rng.random() < 0.05 for _ in dtos]
+    return dtos, changed
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Interpolação linear, como np.percentile."""
+    position = (len(sorted_values) - 1) * p / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def per_object(dtos, changed):
+    now = datetime.now()
+    deltas_by_tribunal = {}
+    with_movements = 0
+    for dto in dtos:
+        if not dto.movimentos:
+            continue
+        ultimo = max(dto.movimentos, key=lambda m: m.dataHora)
+        delta = (now - ultimo.dataHora).total_seconds() / 3600
+        deltas_by_tribunal.setdefault(dto.tribunal, []).append(delta)
+        with_movements += 1
+    staleness = {}
+    for tribunal, deltas in deltas_by_tribunal.items():
+        deltas.sort()
+        staleness[tribunal] = {f"p{p}": round(percentile(deltas, p), 2) for p in STALENESS_PERCENTILES}
+    return {"processes": len(dtos), "with_movements": with_movements, "changed": sum(changed),
+            "staleness_by_tribunal": staleness}
+
+
+def columnar_datetime64(dtos, changed):
+    now = np.datetime64(datetime.now(), "s")
+    counts = np.fromiter((len(dto.movimentos) for dto in dtos), dtype=np.int64, count=len(dtos))
+    process_index = np.repeat(np.arange(len(dtos), dtype=np.int64), counts)
+    times = np.array([m.dataHora for dto in dtos for m in dto.movimentos], dtype="datetime64[s]")
+    order = np.lexsort((times.astype(np.int64), process_index))
+    sorted_process = process_index[order]
+    rows = order[np.append(sorted_process[1:] != sorted_process[:-1], True)]
+    last_at = np.full(len(dtos), np.datetime64("NaT"), dtype="datetime64[s]")
+    last_at[process_index[rows]] = times[rows]
+    delta_hours = (now - last_at) / np.timedelta64(1, "h")
+    tribunais, codes = np.unique(np.array([dto.tribunal for dto in dtos]), return_inverse=True)
+    has_movement = ~np.isnat(last_at)
+    return {str(tribunal): np.percentile(delta_hours[(codes == code) & has_movement], STALENESS_PERCENTILES)
+            for code, tribunal in enumerate(tribunais)}, int(np.sum(changed))
+
+
+def columnar(dtos, changed):
+    return analyze_recency(MovementColumns.from_scraped(dtos, changed)).summary()
+
+
+def best_of(func, dtos, changed, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(dtos, changed)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=50000)
+    parser.add_argument("--movements", type=int, default=40, help="máximo de movimentos por processo")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    dtos, changed = build_dtos(args.processes, args.movements)
+    total_movements = sum(len(dto.movimentos) for dto in dtos)
+    print(f"{args.processes} processos, {total_movements} movimentos")
+
+    # As versões chegam aos mesmos percentis (a menos do arredondamento)
+    expected = per_object(dtos, changed)["staleness_by_tribunal"]
+    for tribunal, percentiles in columnar(dtos, changed)["staleness_by_tribunal"].items():
+        assert np.allclose(list(percentiles.values()), list(expected[tribunal].values()), atol=0.011)
+
+    loop_seconds = best_of(per_object, dtos, changed, args.repeat)
+    datetime64_seconds = best_of(columnar_datetime64, dtos, changed, args.repeat)
+    columnar_seconds = best_of(columnar, dtos, changed, args.repeat)
+    columns = MovementColumns.from_scraped(dtos, changed)
+    prebuilt_seconds = best_of(lambda *_: analyze_recency(columns).summary(), dtos, changed, args.repeat)
+    print(f"por objeto:         {loop_seconds * 1000:.1f} ms")
+    print(f"colunar datetime64: {datetime64_seconds * 1000:.1f} ms ({loop_seconds / datetime64_seconds:.1f}x)")
+    print(f"colunar:            {columnar_seconds * 1000:.1f} ms ({loop_seconds / columnar_seconds:.1f}x)")
+    print(f"colunas prontas:    {prebuilt_seconds * 1000:.1f} ms ({loop_seconds / prebuilt_seconds:.1f}x)")
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from enum import Enum
+
+from modules.models.exception.exceptions import (
+    BaseScrapingException, CircuitOpenException, ScraperBusinessException
+)
+
+logger = logging.getLogger(__name__)
+
+# Códigos de exceção que indicam indisponibilidade do sistema (e não um problema do processo consultado).
+# Apenas estes contam como falha para abrir o circuito.
+CIRCUIT_BREAKER_FAILURE_CODES = {
+    "pje_rj": {
+        "PJE_WEBDRIVER_ERROR",
+        "PJE_UNEXPECTED_ERROR",
+        "PJE_SEARCH_FIELD_UNAVAILABLE",
+        "PJE_SEARCH_FIELD_RETRY_FAILED",
+    },
+    "eproc_rj": {
+        "EPROC_WEBDRIVER_ERROR",
+        "EPROC_SEARCH_FIELD_UNAVAILABLE",
+        "EPROC_DATA_EXTRACTION_FAILURE",
+        "EPROC_UNEXPECTED_ERROR",
+    },
+}
+
+# Códigos que não dizem nada sobre a saúde do sistema: não contam nem como falha nem como sucesso.
+CIRCUIT_BREAKER_NEUTRAL_CODES = {"DEADLINE_EXCEEDED"}
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "3"))
+DEFAULT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RECOVERY_TIMEOUT", "120"))
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um sistema de scraping.
+
+    - CLOSED: as consultas passam normalmente; falhas consecutivas são contadas.
+    - OPEN: as consultas falham imediatamente com CircuitOpenException, sem abrir o Chrome.
+    - HALF_OPEN: após `recovery_timeout` segundos, uma única consulta de teste (probe) é liberada.
+      Se der certo o circuito fecha, se falhar ele volta a abrir.
+    """
+
+    def __init__(self, system_type: str, failure_codes: set,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT):
+        self.system_type = system_type
+        self.failure_codes = failure_codes
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def before_call(self):
+        """
+        Verifica se a consulta pode seguir. Lança CircuitOpenException se o circuito estiver aberto
+        (ou se já houver um probe em andamento no estado HALF_OPEN).
+        """
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return
+
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == CircuitState.OPEN and elapsed >= self.recovery_timeout:
+                self._state = CircuitState.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("Circuit breaker de '%s' em HALF_OPEN. Liberando consulta de teste.", self.system_type)
+
+            if self._state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+
+            retry_after = max(self.recovery_timeout - elapsed, 0.0)
+
+        raise CircuitOpenException(self.system_type, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CircuitState.CLOSED:
+                logger.info("Circuit breaker de '%s' FECHADO. Sistema respondendo novamente.", self.system_type)
+            self._state = CircuitState.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, exception: Exception):
+        """
+        Registra o resultado de uma consulta que falhou:
+
+        - códigos em `failure_codes` e exceções inesperadas (fora da hierarquia de scraping) contam como falha;
+        - exceções de negócio (ex: PROCESS_NOT_FOUND) mostram que o sistema respondeu e contam como sucesso;
+        - os demais códigos (neutros ou não mapeados) não alteram o estado do circuito.
+        """
+        code = exception.code if isinstance(exception, BaseScrapingException) else None
+        if code is not None and code not in self.failure_codes:
+            if isinstance(exception, ScraperBusinessException) and code not in CIRCUIT_BREAKER_NEUTRAL_CODES:
+                self.record_success()
+                return
+            with self._lock:
+                self._probe_in_flight = False
+            return
+
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == CircuitState.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    "Circuit breaker de '%s' ABERTO após %s falha(s) (último código: %s). "
+                    "Consultas recusadas por %.0fs.",
+                    self.system_type, self._consecutive_failures, code, self.recovery_timeout
+                )
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(system_type: str) -> CircuitBreaker:
+    """
+    Retorna o circuit breaker do sistema. A instância é compartilhada por todo o processo,
+    para que todos os consumidores (API, consulta ativa, WhatsApp) enxerguem o mesmo estado.
+    """
+    with _circuit_breakers_lock:
+        if system_type not in _circuit_breakers:
+            _circuit_breakers[system_type] = CircuitBreaker(
+                system_type,
+                failure_codes=CIRCUIT_BREAKER_FAILURE_CODES.get(system_type, set())
+            )
+        return _circuit_breakers[system_type]
@@ -1,90 +1,132 @@
 import logging
+import os
+import socket
+import threading
 import time # Para manter o script rodando
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import List
+from typing import Callable, List, Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
+from modules.core.consults.court_calendar import CourtCalendar
+from modules.core.consults.movement_analytics import MovementColumns, analyze_recency, last_movement, movement_times
+from modules.core.consults.polling_scheduler import AdaptivePollingScheduler
+from modules.core.logging_config import configure_logging, log_context
 from modules.core.process_consultant import ProcessConsultant
+from modules.core.storage.movement_fingerprint_store import MovementFingerprintStore
+from modules.core.storage.movement_histogram_store import MovementHistogramStore
+from modules.core.storage.pass_checkpoint_store import PassCheckpointStore, STATUS_DONE, STATUS_FAILED
+from modules.core.storage.watch_list_store import WatchListStore
+from modules.message.whatsapp.digest_service import DIGEST_FLUSH_SECONDS, NotificationDigestService
+from modules.message.whatsapp.outbound_queue import OutboundWhatsappQueue
+from modules.message.whatsapp.whatsapp_service import WhatsappService
 from modules.models.process_dtos import ProcessoScrapedDTO, AnaliseUltimoMovimentoDTO
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 process_consultant = ProcessConsultant()
 
+# De quanto em quanto tempo o agendador procura entradas vencidas na lista de monitoramento
+MONITOR_TICK_SECONDS = float(os.getenv("MONITOR_TICK_SECONDS", "60"))
+# Workers por sistema (raia) e quantos itens podem aguardar na fila de cada raia
+MONITOR_LANE_WORKERS = int(os.getenv("MONITOR_LANE_WORKERS", "2"))
+MONITOR_LANE_QUEUE_SIZE = int(os.getenv("MONITOR_LANE_QUEUE_SIZE", "10"))
+# Identificação do nó e leases dos processos reivindicados na lista compartilhada
+MONITOR_NODE_ID = os.getenv("MONITOR_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+MONITOR_LEASE_SECONDS = float(os.getenv("MONITOR_LEASE_SECONDS", "300"))
+MONITOR_CLAIM_BATCH_SIZE = int(os.getenv("MONITOR_CLAIM_BATCH_SIZE", str(MONITOR_LANE_WORKERS)))
+# Processos concluídos há menos que isso não são raspados de novo ao retomar uma passagem interrompida
+MONITOR_FRESHNESS_SECONDS = float(os.getenv("MONITOR_FRESHNESS_SECONDS", "900"))
+
 
 class ActiveConsultantService :
-    def __init__(self):
+    def __init__(self, digest_service=None):
 
         self.scheduler = BackgroundScheduler()
+        self.node_id = MONITOR_NODE_ID
         self.process_consultant = ProcessConsultant()
-        self.processes_to_monitor = PROCESSES_TO_MONITOR_LIST
-
-    def _perform_scraping(self, num_processo, system_identifier, adv_wpp)-> ProcessoScrapedDTO | None :
+        self.watch_list_store = WatchListStore()
+        self.fingerprint_store = MovementFingerprintStore()
+        self.checkpoint_store = PassCheckpointStore()
+        self.movement_histogram = MovementHistogramStore()
+        self._seed_movement_histogram()
+        self.polling_scheduler = AdaptivePollingScheduler(
+            calendar=CourtCalendar.from_file(),
+            histogram=self.movement_histogram
+        )
+        self.result_consumers: List[Callable[[str, AnaliseUltimoMovimentoDTO], None]] = []
+        self.last_pass_stats: dict = {}
+        self._lanes = {}
+        self._pass_columns = MovementColumns()
+        self._stats_lock = threading.Lock()
+
+        # Etapa de resumo (NotificationDigestService): recebe os movimentos novos de cada assinante
+        self.digest_service = digest_service
+        if digest_service is not None:
+            self.add_result_consumer(digest_service.consume)
+
+    def _seed_movement_histogram(self):
+        """Na primeira execução, alimenta o histograma com os últimos movimentos já conhecidos da lista."""
+        if self.movement_histogram.total():
+            return
+        moments = [datetime.fromtimestamp(entry['last_movement_at'])
+                   for entry in self.watch_list_store.export() if entry.get('last_movement_at')]
+        if moments:
+            self.movement_histogram.record(moments)
+            logger.info("Histograma de movimentos por hora inicializado com %s movimentos.", len(moments))
+
+    def _perform_scraping(self, num_processo, system_identifier, subscribers_count)-> ProcessoScrapedDTO | None :
         """
         Main scheduled function that iterates over the list of processes
         and performs scraping for each, printing the result.
         """
-        logger.info(f"--- Iniciando a Ordenação do Scrape")
-
         try:
-            logger.info(f"Raspando processo: {num_processo} do sistema: {system_identifier} para {adv_wpp}...")
+            logger.info("Raspando processo: %s do sistema: %s para %d assinante(s)...",
+                        num_processo, system_identifier, subscribers_count)
 
             # Call the scraping function from the instantiated service
             scraped_dto: ProcessoScrapedDTO = self.process_consultant.get_process_details(
                  num_processo ,system_identifier
             )
 
-            logger.info(f"Scraping concluído para o processo: {num_processo}.")
-
-            logger.info("\n" + "=" * 50)
-            logger.info(f"RESULTADO DO SCRAPING PARA O PROCESSO {num_processo}:")
-            logger.info(scraped_dto)
-            logger.info("=" * 50 + "\n")
+            # O DTO só é convertido em texto se DEBUG estiver habilitado
+            logger.debug("Resultado do scraping para o processo %s: %s", num_processo, scraped_dto)
 
             return scraped_dto
 
         except Exception as e:
-            logger.error(f"Erro ao raspar o processo '{num_processo}': {e}", exc_info=True)
+            logger.error("Erro ao raspar o processo '%s': %s", num_processo, e, exc_info=True)
             return None
 
     logger.info("--- Tarefa de scraping agendada concluída. ---")
 
-    def _analyze_last_movement(self, scraped_dto: ProcessoScrapedDTO) -> AnaliseUltimoMovimentoDTO:
+    def _analyze_last_movement(self, scraped_dto: ProcessoScrapedDTO, system_identifier: str,
+                               num_processo: str, times=None) -> AnaliseUltimoMovimentoDTO:
         """
-        Analiza um ProcessoScrapedDTO para extrair o último movimento
-        e determinar se ele é recente.
+        Analiza um ProcessoScrapedDTO para extrair o último movimento e os movimentos novos
+        desde a consulta anterior (diff contra as impressões digitais guardadas). `times` são as
+        dataHora já convertidas por `movement_times`, reaproveitadas nas colunas da passagem.
         """
-        logger.info(f"Iniciando análise do último movimento para o processo: {scraped_dto.numeroProcesso}")
-
-        ultimo_movimento = None
+        ultimo_movimento = last_movement(scraped_dto.movimentos, times)
         movimento_recente = False
         ultima_atualizacao_delta_horas = 0.0
 
-        if scraped_dto.movimentos:
-            # Garante que estamos pegando o movimento com a dataHora mais recente
-            ultimo_movimento = max(scraped_dto.movimentos, key=lambda m: m.dataHora)
-            logger.info(f"Último movimento encontrado para {scraped_dto.numeroProcesso}: '{ultimo_movimento.nome}' em {ultimo_movimento.dataHora}")
-
+        if ultimo_movimento is not None:
             # Calcula a diferença de tempo desde a última atualização
             delta_tempo = datetime.now() - ultimo_movimento.dataHora
             ultima_atualizacao_delta_horas = delta_tempo.total_seconds() / 3600
-            logger.info(f"Delta de tempo para {scraped_dto.numeroProcesso}: {ultima_atualizacao_delta_horas:.2f} horas.")
-
-            # Define 'movimento_recente' com base no limite de 3 horas
-            if ultima_atualizacao_delta_horas < 3:
-                movimento_recente = True
-                logger.info(f"Movimento para {scraped_dto.numeroProcesso} é considerado RECENTE (< 3h).")
-            else:
-                movimento_recente = False
-                logger.info(f"Movimento para {scraped_dto.numeroProcesso} NÃO é considerado recente (>= 3h).")
         else:
-            logger.warning(f"Processo {scraped_dto.numeroProcesso} não possui movimentos. 'ultimoMovimento' será None.")
+            logger.warning("Processo %s não possui movimentos. 'ultimoMovimento' será None.", scraped_dto.numeroProcesso)
 
+        # 'movimento_recente' indica se há movimentos ainda não vistos; a primeira consulta só registra a linha de base
+        novos_movimentos, _ = self.fingerprint_store.diff(system_identifier, num_processo, scraped_dto.movimentos)
+        movimento_recente = bool(novos_movimentos)
 
-        analise_dto = AnaliseUltimoMovimentoDTO(
+        # Campos vindos do ProcessoScrapedDTO, já validado no scraper: construção sem nova validação,
+        # compartilhando os MovimentoDTO em vez de copiá-los
+        analise_dto = AnaliseUltimoMovimentoDTO.model_construct(
             partesEnvolvidas=scraped_dto.partesEnvolvidas,
             numeroProcesso=scraped_dto.numeroProcesso,
             tribunal=scraped_dto.tribunal,
@@ -93,86 +135,321 @@ class ActiveConsultantService :
             dataHoraUltimaAtualizacao=scraped_dto.dataHoraUltimaAtualizacao,
             ultimoMovimento=ultimo_movimento,
             movimento_recente=movimento_recente,
-            ultima_atualizacao_delta_horas=ultima_atualizacao_delta_horas
+            ultima_atualizacao_delta_horas=ultima_atualizacao_delta_horas,
+            novosMovimentos=novos_movimentos
         )
-        logger.info(f"Análise finalizada para o processo: {scraped_dto.numeroProcesso}. Movimento recente: {movimento_recente}")
-
-        logger.info(
-            f"DTO completo: {scraped_dto.numeroProcesso}.")
+        logger.info("Análise finalizada para o processo %s: %s movimento(s) novo(s), último há %.2fh.",
+                    scraped_dto.numeroProcesso, len(novos_movimentos), ultima_atualizacao_delta_horas)
         return analise_dto
 
+    @staticmethod
+    def analyze_batch(scraped_dtos: List[ProcessoScrapedDTO]) -> dict:
+        """
+        Estatísticas de recência de um lote inteiro de processos (ver movement_analytics): processos
+        com movimento e percentis de defasagem por tribunal. Sem o diff das impressões digitais,
+        `changed` é sempre 0.
+        """
+        return analyze_recency(MovementColumns.from_scraped(scraped_dtos)).summary()
+
+    def add_result_consumer(self, consumer: Callable[[str, AnaliseUltimoMovimentoDTO], None]):
+        """
+        Registra um consumidor chamado com (adv_wpp, análise) para cada assinante do processo,
+        assim que a análise fica pronta (na thread do worker). Só são entregues análises com
+        movimentos novos; o consumidor deve trabalhar sobre `novosMovimentos`.
+        """
+        self.result_consumers.append(consumer)
+
     def orchestrate_active_consultant(self) -> List[AnaliseUltimoMovimentoDTO]:
         """
-        Orquestra o scraping de todos os processos na lista e a análise do último movimento de cada um.
+        Orquestra o scraping dos processos vencidos na lista de monitoramento (WatchListStore)
+        e a análise do último movimento de cada um.
         Retorna uma lista de AnaliseUltimoMovimentoDTO para processos bem-sucedidos.
+
+        Cada sistema tem sua própria raia: um pool de MONITOR_LANE_WORKERS threads, alimentado por uma
+        thread que lê as entradas vencidas do sistema e mantém no máximo MONITOR_LANE_QUEUE_SIZE itens
+        aguardando. Assim um CAPTCHA lento do Eproc não segura os itens do PJE e a passagem dura o
+        tempo da raia mais lenta. Cada análise é entregue aos `result_consumers` assim que termina.
+
+        Cada processo é raspado uma única vez por passagem, mesmo que vários advogados o acompanhem:
+        a análise é repassada a todos os assinantes e todas as entradas do processo são reagendadas juntas.
+
+        Vários nós podem rodar sobre a mesma lista: cada raia reivindica lotes de MONITOR_CLAIM_BATCH_SIZE
+        processos com lease de MONITOR_LEASE_SECONDS, renovado em segundo plano durante a passagem e
+        liberado quando o processo termina. Um processo sob lease de outro nó não é reivindicado.
+
+        O progresso de cada processo é registrado em checkpoints (PassCheckpointStore). Processos que
+        ficaram pendentes numa passagem interrompida (nó reiniciado no meio) voltam a vencer e são
+        retomados nesta, salvo os concluídos nos últimos MONITOR_FRESHNESS_SECONDS.
         """
-        logger.info(
-            f"--- Iniciando Orquestração da Consulta Ativa de Processos às {datetime.now().strftime('%H:%M:%S')} ---")
+        logger.info("--- Iniciando Orquestração da Consulta Ativa de Processos às %s ---",
+                    datetime.now().strftime('%H:%M:%S'))
 
-        if not self.processes_to_monitor:
-            logger.warning("Nenhum processo configurado na lista PROCESSES_TO_MONITOR. Pulando esta execução.")
+        resumed = self.checkpoint_store.adopt_abandoned(
+            self.node_id, stale_after=MONITOR_LEASE_SECONDS, freshness_seconds=MONITOR_FRESHNESS_SECONDS
+        )
+        if resumed:
+            self.watch_list_store.make_due(resumed)
+            logger.info("Retomando %s processo(s) de passagens interrompidas.", len(resumed))
+
+        pass_started_at = time.time()
+        due_by_system = self.watch_list_store.count_by_system(due_before=pass_started_at)
+        total_due = sum(due_by_system.values())
+        if not total_due:
+            logger.info("Nenhum processo vencido na lista de monitoramento. Pulando esta execução.")
             logger.info("--- Orquestração da Consulta Ativa de Processos Concluída. ---")  # Log de fim
             return []  # Retorna lista vazia se não houver nada para fazer
 
         analyzed_results: List[AnaliseUltimoMovimentoDTO] = []  # Lista para coletar os DTOs analisados
+        lane_stats = {
+            system: {"due": due, "processed": 0, "failed": 0, "in_flight": 0, "max_queue_depth": 0,
+                     "duration_seconds": 0.0}
+            for system, due in due_by_system.items()
+        }
 
-        for i, process_data in enumerate(self.processes_to_monitor):
-            num_processo = process_data.get('num_processo')
-            system_identifier = process_data.get('system_identifier')
-            adv_wpp = process_data.get('adv_wpp')  # Certifique-se de que adv_wpp é usado, se necessário
-
-            logger.info(
-                f"Processando item {i + 1}/{len(self.processes_to_monitor)}: Processo {num_processo} no sistema {system_identifier}.")
-
-            if not all([adv_wpp, system_identifier, num_processo]):
-                logger.warning(f"Dados incompletos encontrados para o processo: {process_data}. Pulando este item.")
-                continue
+        pass_id = self.checkpoint_store.start_pass(self.node_id)
+        # Os movimentos de cada processo raspado na passagem são acumulados em colunas para a análise do lote
+        self._pass_columns = MovementColumns()
+        stop_renewal = threading.Event()
+        renewer = threading.Thread(target=self._renew_leases, args=(pass_id, stop_renewal),
+                                   name="monitor-lease-renewal", daemon=True)
+        renewer.start()
+
+        feeders = [
+            threading.Thread(target=self._run_lane, name=f"monitor-lane-{system}", daemon=True,
+                             args=(pass_id, system, pass_started_at, lane_stats[system], analyzed_results))
+            for system in due_by_system
+        ]
+        for feeder in feeders:
+            feeder.start()
+        for feeder in feeders:
+            feeder.join()
+        stop_renewal.set()
+        self.checkpoint_store.finish_pass(pass_id)
+
+        duration = time.time() - pass_started_at
+        for stats in lane_stats.values():
+            stats.pop("in_flight", None)
+        self.last_pass_stats = {
+            "node_id": self.node_id,
+            "pass_id": pass_id,
+            "resumed": len(resumed),
+            "started_at": pass_started_at,
+            "duration_seconds": round(duration, 3),
+            "due": total_due,
+            "processed": sum(stats["processed"] for stats in lane_stats.values()),
+            "failed": sum(stats["failed"] for stats in lane_stats.values()),
+            "lanes": lane_stats,
+            "recency": analyze_recency(self._pass_columns).summary(),
+        }
 
-            # Etapa 1: Realizar o scraping para o processo atual
-            scraped_dto = self._perform_scraping(num_processo, system_identifier, adv_wpp)
+        for system, stats in lane_stats.items():
+            logger.info("Raia '%s': %s/%s processos analisados, %s falhas, fila máxima %s, %.1fs.",
+                        system, stats['processed'], stats['due'], stats['failed'], stats['max_queue_depth'],
+                        stats['duration_seconds'])
+        for tribunal, percentiles in self.last_pass_stats["recency"]["staleness_by_tribunal"].items():
+            logger.info("Defasagem do último movimento em '%s' (horas): %s.", tribunal, percentiles)
+        logger.info("--- Orquestração da Consulta Ativa de Processos Concluída em %.1fs: "
+                    "%s/%s processos analisados. ---",
+                    duration, self.last_pass_stats['processed'], total_due)
 
-            # Etapa 2: Se o scraping foi bem-sucedido, proceed to analysis
-            if scraped_dto:  # Verifica se não é None (se houve erro no scraping, será None)
-                try:
-                    analise_dto = self._analyze_last_movement(scraped_dto)
-                    analyzed_results.append(analise_dto)  # Adiciona a análise à lista de resultados
+        return analyzed_results
 
-                    # Imprimir o resultado da análise (fora do logger para visualização clara)
-                    print("\n" + "#" * 50)
-                    print(f"RESULTADO DA ANÁLISE DO ÚLTIMO MOVIMENTO PARA O PROCESSO {analise_dto.numeroProcesso}:")
-                    print(analise_dto.model_dump_json(indent=4))
-                    print("#" * 50 + "\n")
+    def _run_lane(self, pass_id: str, system_identifier: str, pass_started_at: float, stats: dict,
+                  analyzed_results: List[AnaliseUltimoMovimentoDTO]):
+        """Alimenta a raia do sistema com os processos vencidos reivindicados por este nó e espera todos terminarem."""
+        executor = self._lane_executor(system_identifier)
+        # Limita os itens submetidos e ainda não concluídos: a leitura do store acompanha o ritmo dos workers
+        slots = threading.BoundedSemaphore(MONITOR_LANE_WORKERS + MONITOR_LANE_QUEUE_SIZE)
+        lane_started_at = time.time()
+        futures = []
+
+        def run(process: dict):
+            analise_dto = None
+            key = (process['system_identifier'], process['num_processo'])
+            try:
+                with log_context(system=key[0], num_processo=key[1]):
+                    analise_dto = self._process_group(process)
+                self.checkpoint_store.mark_finished(pass_id, *key, STATUS_DONE if analise_dto else STATUS_FAILED)
+                # Só libera o lease de processos já reagendados; os demais esperam a expiração
+                self.watch_list_store.release_lease(self.node_id, *key)
+            except Exception as e:
+                self.checkpoint_store.mark_finished(pass_id, *key, STATUS_FAILED, error=str(e))
+                raise
+            finally:
+                with self._stats_lock:
+                    stats["in_flight"] -= 1
+                    if analise_dto is None:
+                        stats["failed"] += 1
+                    else:
+                        stats["processed"] += 1
+                        analyzed_results.append(analise_dto)
+                slots.release()
+
+        # Os processos são reivindicados em lotes pequenos, nunca a lista inteira: os demais nós dividem o restante.
+        # Um processo não é reivindicado duas vezes na mesma passagem, mesmo que volte vencido (ex: falhou e o
+        # lease expirou); a exclusão fica na própria consulta, para não prender leases de processos descartados.
+        seen = set()
+        while True:
+            batch = self.watch_list_store.claim_due_processes(
+                self.node_id, due_before=pass_started_at, batch_size=MONITOR_CLAIM_BATCH_SIZE,
+                lease_seconds=MONITOR_LEASE_SECONDS, system_identifier=system_identifier, exclude=seen
+            )
+            if not batch:
+                break
+            self.checkpoint_store.mark_pending(
+                pass_id, [(process['system_identifier'], process['num_processo']) for process in batch]
+            )
+            for process in batch:
+                seen.add(process['num_processo'])
+                slots.acquire()
+                with self._stats_lock:
+                    stats["in_flight"] += 1
+                    stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["in_flight"] - MONITOR_LANE_WORKERS)
+                futures.append(executor.submit(run, process))
+
+        wait(futures)
+        stats["duration_seconds"] = round(time.time() - lane_started_at, 3)
+
+    def _renew_leases(self, pass_id: str, stop: threading.Event):
+        """Renova os leases do nó e o heartbeat da passagem até `stop` ser sinalizado."""
+        while not stop.wait(MONITOR_LEASE_SECONDS / 3):
+            try:
+                self.checkpoint_store.heartbeat(pass_id)
+                renewed = self.watch_list_store.renew_leases(self.node_id, MONITOR_LEASE_SECONDS)
+                logger.debug("Nó %s: %s leases renovados.", self.node_id, renewed)
+            except Exception as e:
+                logger.error("Erro ao renovar os leases do nó %s: %s", self.node_id, e, exc_info=True)
+
+    def _lane_executor(self, system_identifier: str) -> ThreadPoolExecutor:
+        with self._stats_lock:
+            if system_identifier not in self._lanes:
+                self._lanes[system_identifier] = ThreadPoolExecutor(
+                    max_workers=MONITOR_LANE_WORKERS, thread_name_prefix=f"monitor-{system_identifier}"
+                )
+            return self._lanes[system_identifier]
+
+    def _process_group(self, process: dict) -> Optional[AnaliseUltimoMovimentoDTO]:
+        """
+        Consulta, analisa e reagenda um processo da lista de monitoramento com todos os seus
+        assinantes (roda na thread do worker).
+        """
+        num_processo = process.get('num_processo')
+        system_identifier = process.get('system_identifier')
+        subscribers = process['subscribers']
+        entry_ids = [entry_id for entry_id, _ in subscribers]
+
+        logger.info("Processando processo %s no sistema %s (%s assinante(s)).",
+                    num_processo, system_identifier, len(subscribers))
+
+        # Reagenda antes do scraping com o intervalo atual: mesmo se falhar, o processo só volta na próxima janela
+        current_interval = self.polling_scheduler.current_interval(process)
+        self.watch_list_store.reschedule(
+            entry_ids, self.polling_scheduler.next_due_at(current_interval, time.time())
+        )
 
-                except Exception as e:
-                    logger.error(f"Erro ao analisar o processo '{num_processo}': {e}", exc_info=True)
-            else:
-                logger.warning(f"Scraping falhou ou retornou vazio para o processo {num_processo}. Análise pulada.")
+        # Etapa 1: Realizar o scraping para o processo atual (uma vez para todos os assinantes)
+        scraped_dto = self._perform_scraping(num_processo, system_identifier, len(subscribers))
 
-            logger.info(f"Finalizado processamento para o processo: {num_processo}.")
+        # Etapa 2: Se o scraping foi bem-sucedido, proceed to analysis
+        if not scraped_dto:  # Se houve erro no scraping, será None
+            logger.warning("Scraping falhou ou retornou vazio para o processo %s. Análise pulada.", num_processo)
+            return None
 
-        logger.info("--- Orquestração da Consulta Ativa de Processos Concluída. ---")
-        logger.info(analyzed_results)
+        try:
+            times = movement_times(scraped_dto.movimentos)
+            analise_dto = self._analyze_last_movement(scraped_dto, system_identifier, num_processo, times)
+            # As estatísticas da passagem usam as mesmas colunas e o mesmo sinal de mudança (o diff) da análise
+            self._pass_columns.append(scraped_dto, changed=bool(analise_dto.novosMovimentos), times=times)
+            self._schedule_next_poll(process, analise_dto)
+        except Exception as e:
+            logger.error("Erro ao analisar o processo '%s': %s", num_processo, e, exc_info=True)
+            return None
 
+        # Notificações e o trabalho a jusante só rodam quando há movimentos novos
+        if analise_dto.novosMovimentos:
+            logger.info("Processo %s com %d movimento(s) novo(s); último: %s.", num_processo,
+                        len(analise_dto.novosMovimentos), analise_dto.novosMovimentos[0].nome)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Análise do processo %s: %s", num_processo, analise_dto.model_dump_json(indent=4))
+            # Só com todos os consumidores confirmando os movimentos passam a contar como vistos;
+            # senão voltam como novos na próxima consulta (entrega pelo menos uma vez)
+            if self._publish(subscribers, analise_dto):
+                self.fingerprint_store.record(system_identifier, num_processo, analise_dto.novosMovimentos)
+            else:
+                logger.warning("Movimentos novos do processo %s não confirmados pelos consumidores; "
+                               "serão notificados de novo na próxima consulta.", num_processo)
+        logger.info("Finalizado processamento para o processo: %s.", num_processo)
+        return analise_dto
 
-        return analyzed_results
+    def _publish(self, subscribers: list, analise_dto: AnaliseUltimoMovimentoDTO) -> bool:
+        """Entrega a análise a todos os consumidores, para cada assinante. False se algum deles falhou."""
+        delivered = True
+        for _, adv_wpp in subscribers:
+            for consumer in self.result_consumers:
+                try:
+                    consumer(adv_wpp, analise_dto)
+                except Exception as e:
+                    delivered = False
+                    logger.error("Erro no consumidor de resultados ao receber o processo '%s' para %s: %s",
+                                 analise_dto.numeroProcesso, adv_wpp, e, exc_info=True)
+        return delivered
 
+    def _schedule_next_poll(self, process: dict, analise_dto: AnaliseUltimoMovimentoDTO):
+        """
+        Ajusta o intervalo de consulta do processo conforme ele se movimentou ou não desde a
+        consulta anterior, e grava o próximo vencimento em todas as entradas dos assinantes.
+        """
+        now = time.time()
+        last_movement_at = None
+        if analise_dto.ultimoMovimento:
+            last_movement_at = analise_dto.ultimoMovimento.dataHora.timestamp()
+
+        changed = bool(analise_dto.novosMovimentos)
+        if changed:
+            self.movement_histogram.record(m.dataHora for m in analise_dto.novosMovimentos)
+
+        interval = self.polling_scheduler.next_interval(process.get('poll_interval_seconds'), changed)
+        self.watch_list_store.record_poll(
+            [entry_id for entry_id, _ in process['subscribers']],
+            poll_interval_seconds=interval,
+            next_due_at=self.polling_scheduler.next_due_at(interval, now),
+            last_movement_at=last_movement_at,
+            polled_at=now
+        )
+        logger.info("Processo %s: movimento novo=%s. Próxima consulta em %.1fh.",
+                    process['num_processo'], changed, interval / 3600)
 
     def start_service(self):
         """
         Creates and starts the APScheduler to execute the scheduled scraping task.
+
+        A cada MONITOR_TICK_SECONDS uma passagem consome as entradas vencidas da lista de monitoramento.
+        Se a passagem anterior ainda estiver rodando, a nova é descartada (max_instances=1 + coalesce)
+        em vez de ficar enfileirada atrás dela.
         """
         self.scheduler.add_job(
-            id='initial_process_scraping',
+            id='active_monitoring_pass',
             func=self.orchestrate_active_consultant,
-            trigger=DateTrigger(run_date=datetime.now() + timedelta(seconds=5)),
-            seconds=10,
-            name='Consulta Ativa Inicial de Processos',
+            trigger=IntervalTrigger(seconds=MONITOR_TICK_SECONDS),
+            next_run_time=datetime.now() + timedelta(seconds=5),
+            name='Consulta Ativa de Processos',
             replace_existing=True,
             max_instances=1,  # Permite apenas 1 instância da tarefa rodando
             coalesce=True,  # Principal para "só iniciar a próxima quando a anterior acabar"
             misfire_grace_time=15  # Tempo em segundos para descartar execuções perdidas (ajuste conforme necessidade)
         )
 
+        if self.digest_service is not None:
+            self.scheduler.add_job(
+                id='notification_digest_flush',
+                func=self.digest_service.flush,
+                trigger=IntervalTrigger(seconds=DIGEST_FLUSH_SECONDS),
+                name='Envio dos Resumos de Movimentações',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+
         logger.info("Serviço de consulta ativa iniciado. Agendador configurado.")
         self.scheduler.start()
 
@@ -182,31 +459,19 @@ class ActiveConsultantService :
                 time.sleep(2)
         except (KeyboardInterrupt, SystemExit):
             self.scheduler.shutdown()
+            for executor in self._lanes.values():
+                executor.shutdown(wait=False, cancel_futures=True)
             logger.info("Serviço de consulta ativa encerrado.")
 
 
-PROCESSES_TO_MONITOR_LIST = [
-        {
-            "adv_wpp": "+5521996800927",
-            "system_identifier": "2",
-            "num_processo": "0809129-51.2024.8.19.0001"
-        },
-        {
-            "adv_wpp": "+5521996800927",
-            "system_identifier": "1",
-            "num_processo": "3002543-43.2025.8.19.0001"
-        }
-    ]
-
-
-
-
-
 # --- Main Entry Point ---
 if __name__ == '__main__':
+    configure_logging()
 
-
-    active_consultant = ActiveConsultantService()
+    outbound_queue = OutboundWhatsappQueue(WhatsappService())
+    # Retoma o envio do que ficou na fila de saída antes do reinício, sem esperar por uma mensagem nova
+    outbound_queue.start()
+    active_consultant = ActiveConsultantService(digest_service=NotificationDigestService(outbound_queue))
     # Start the service
     active_consultant.start_service()
 
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COURT_CALENDAR_FILE = os.getenv("COURT_CALENDAR_FILE")
+
+# Janelas (hora inicial, hora final) por dia da semana (0 = segunda). Fora delas os sistemas do TJRJ
+# raramente publicam movimentos.
+DEFAULT_ACTIVE_WINDOWS: Dict[int, List[Tuple[int, int]]] = {
+    0: [(8, 20)],
+    1: [(8, 20)],
+    2: [(8, 20)],
+    3: [(8, 20)],
+    4: [(8, 20)],
+}
+
+# Recesso forense: de 20/12 a 06/01 (inclusive)
+DEFAULT_RECESS = ((12, 20), (1, 6))
+
+
+class CourtCalendar:
+    """
+    Calendário do tribunal usado pelo agendador da consulta ativa: janelas de expediente por
+    dia da semana, feriados e recesso forense.
+
+    Pode ser carregado de um JSON (COURT_CALENDAR_FILE) no formato:
+        {
+            "active_windows": {"0": [[8, 20]], ..., "4": [[8, 20]]},
+            "holidays": ["2025-04-21", "2025-11-20"],
+            "recess": [[12, 20], [1, 6]]
+        }
+    """
+
+    def __init__(self,
+                 active_windows: Optional[Dict[int, List[Tuple[int, int]]]] = None,
+                 holidays: Optional[set] = None,
+                 recess: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = DEFAULT_RECESS):
+        self.active_windows = active_windows if active_windows is not None else DEFAULT_ACTIVE_WINDOWS
+        self.holidays = holidays or set()
+        self.recess = recess
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = COURT_CALENDAR_FILE) -> "CourtCalendar":
+        """Carrega o calendário de `path`; sem arquivo configurado, usa o calendário padrão."""
+        if not path:
+            return cls()
+
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        windows = config.get("active_windows")
+        recess = config.get("recess", DEFAULT_RECESS)
+        calendar = cls(
+            active_windows={int(day): [tuple(w) for w in ws] for day, ws in windows.items()} if windows else None,
+            holidays={date.fromisoformat(d) for d in config.get("holidays", [])},
+            recess=(tuple(recess[0]), tuple(recess[1])) if recess else None
+        )
+        logger.info("Calendário do tribunal carregado de '%s': %s feriados.", path, len(calendar.holidays))
+        return calendar
+
+    def is_working_day(self, day: date) -> bool:
+        return day not in self.holidays and not self._in_recess(day) and bool(self.active_windows.get(day.weekday()))
+
+    def is_active(self, moment: datetime) -> bool:
+        """True se `moment` cai dentro de uma janela de expediente de um dia útil."""
+        if not self.is_working_day(moment.date()):
+            return False
+        return any(start <= moment.hour < end for start, end in self.active_windows[moment.weekday()])
+
+    def next_active_start(self, moment: datetime, horizon_days: int = 45) -> Optional[datetime]:
+        """Início da próxima janela de expediente a partir de `moment` (ou o próprio `moment`, se já estiver ativo)."""
+        if self.is_active(moment):
+            return moment
+
+        day = moment.date()
+        for _ in range(horizon_days):
+            if self.is_working_day(day):
+                for start, _end in sorted(self.active_windows[day.weekday()]):
+                    window_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=start)
+                    if window_start >= moment:
+                        return window_start
+            day += timedelta(days=1)
+        return None
+
+    def _in_recess(self, day: date) -> bool:
+        if not self.recess:
+            return False
+        (start_month, start_day), (end_month, end_day) = self.recess
+        current = (day.month, day.day)
+        if (start_month, start_day) <= (end_month, end_day):
+            return (start_month, start_day) <= current <= (end_month, end_day)
+        # Recesso que atravessa a virada do ano
+        return current >= (start_month, start_day) or current <= (end_month, end_day)
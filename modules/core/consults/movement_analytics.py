@@ -0,0 +1,168 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from modules.models.process_dtos import MovimentoDTO, ProcessoScrapedDTO
+
+logger = logging.getLogger(__name__)
+
+STALENESS_PERCENTILES = (50, 90, 99)
+
+
+def movement_times(movimentos: List[MovimentoDTO]) -> np.ndarray:
+    """dataHora dos movimentos em segundos desde a época (float64), na ordem da lista."""
+    # datetime.timestamp() é bem mais barato que a conversão de datetime para datetime64 feita pelo NumPy
+    return np.fromiter((m.dataHora.timestamp() for m in movimentos), dtype=np.float64, count=len(movimentos))
+
+
+def last_movement(movimentos: List[MovimentoDTO], times: Optional[np.ndarray] = None) -> Optional[MovimentoDTO]:
+    """Movimento com a dataHora mais recente (o primeiro, em caso de empate), ou None se não houver movimentos."""
+    if not movimentos:
+        return None
+    if times is None:
+        times = movement_times(movimentos)
+    return movimentos[int(times.argmax())]
+
+
+class MovementColumns:
+    """
+    Movimentos de vários processos em colunas NumPy: a dataHora de todos os movimentos (segundos desde a
+    época), agrupada por processo com `offsets`, mais número, tribunal e se o processo teve movimentos
+    novos na consulta (`changed`, o diff das impressões digitais). O último movimento de cada processo sai
+    de uma redução agrupada (`np.maximum.reduceat`) sobre a coluna inteira, não de um max() por DTO.
+
+    Pode ser montada de uma vez (`from_scraped`) ou incrementalmente pelos workers de uma passagem
+    (`append`, thread-safe).
+    """
+
+    def __init__(self):
+        self.numeros: List[str] = []
+        self.tribunais: List[str] = []
+        self._changed: List[bool] = []
+        self._time_chunks: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_scraped(cls, scraped_dtos: Iterable[ProcessoScrapedDTO],
+                     changed: Optional[Iterable[bool]] = None) -> "MovementColumns":
+        """
+        Colunas de um lote de DTOs. `changed` vem do diff das impressões digitais de cada processo;
+        sem ele, nenhum processo conta como alterado.
+        """
+        scraped_dtos = list(scraped_dtos)
+        columns = cls()
+        columns.numeros = [dto.numeroProcesso for dto in scraped_dtos]
+        columns.tribunais = [dto.tribunal for dto in scraped_dtos]
+        columns._changed = list(changed) if changed is not None else [False] * len(scraped_dtos)
+        columns._time_chunks = [movement_times(dto.movimentos) for dto in scraped_dtos]
+        return columns
+
+    def append(self, scraped_dto: ProcessoScrapedDTO, changed: bool, times: Optional[np.ndarray] = None):
+        """Acrescenta um processo; `times` são as dataHora já convertidas por `movement_times`, se houver."""
+        if times is None:
+            times = movement_times(scraped_dto.movimentos)
+        with self._lock:
+            self.numeros.append(scraped_dto.numeroProcesso)
+            self.tribunais.append(scraped_dto.tribunal)
+            self._changed.append(changed)
+            self._time_chunks.append(times)
+
+    def __len__(self) -> int:
+        return len(self.numeros)
+
+    def arrays(self):
+        """
+        Retorna (numeros, tribunais, times, offsets, changed), consistentes entre si: todas as dataHora,
+        o início de cada processo em `times` (mais o fim do último) e o diff de cada processo.
+        """
+        with self._lock:
+            numeros, tribunais = list(self.numeros), list(self.tribunais)
+            counts = np.fromiter((len(chunk) for chunk in self._time_chunks), dtype=np.int64,
+                                 count=len(self._time_chunks))
+            times = np.concatenate(self._time_chunks) if self._time_chunks else np.empty(0, dtype=np.float64)
+            changed = np.array(self._changed, dtype=bool)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return numeros, tribunais, times, offsets, changed
+
+    def last_rows(self):
+        """
+        Retorna (last_at, last_index): dataHora do último movimento de cada processo (NaN se não houver)
+        e a posição dele na lista de movimentos do processo (-1 se não houver), alinhadas com `numeros`.
+        """
+        _, _, times, offsets, _ = self.arrays()
+        return _grouped_last(times, offsets)
+
+
+def _grouped_last(times: np.ndarray, offsets: np.ndarray):
+    counts = np.diff(offsets)
+    last_at = np.full(len(counts), np.nan)
+    last_index = np.full(len(counts), -1, dtype=np.int64)
+    non_empty = np.flatnonzero(counts)
+    if not non_empty.size:
+        return last_at, last_index
+
+    # Processos sem movimentos não ocupam linhas: os inícios dos demais particionam `times`
+    last_at[non_empty] = np.maximum.reduceat(times, offsets[non_empty])
+    # argmax agrupado: a primeira linha de cada processo igual ao máximo do processo
+    process_of_row = np.repeat(np.arange(len(counts)), counts)
+    rows = np.flatnonzero(times == last_at[process_of_row])
+    groups = process_of_row[rows]
+    first = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    last_index[groups[first]] = rows[first] - offsets[groups[first]]
+    return last_at, last_index
+
+
+class RecencyAnalysis:
+    """
+    Resultado da análise de recência de um lote, em arrays alinhados com `numeros`:
+    `last_at` (segundos desde a época, NaN se não houver movimento), `last_index` (posição do último
+    movimento na lista do processo, -1 se não houver), `delta_hours` (NaN se não houver movimento) e
+    `changed` (movimentos novos desde a consulta anterior, o mesmo sinal das notificações).
+    """
+
+    def __init__(self, numeros: List[str], tribunais: List[str], last_at: np.ndarray, last_index: np.ndarray,
+                 delta_hours: np.ndarray, changed: np.ndarray):
+        self.numeros = numeros
+        self.tribunais = tribunais
+        self.last_at = last_at
+        self.last_index = last_index
+        self.delta_hours = delta_hours
+        self.has_movement = last_index >= 0
+        self.changed = changed
+
+    def staleness_by_tribunal(self, percentiles=STALENESS_PERCENTILES) -> Dict[str, Dict[str, float]]:
+        """Percentis (em horas) do tempo desde o último movimento, por tribunal."""
+        if not self.numeros:
+            return {}
+        tribunais, codes = np.unique(np.array(self.tribunais), return_inverse=True)
+        result = {}
+        for code, tribunal in enumerate(tribunais):
+            values = self.delta_hours[(codes == code) & self.has_movement]
+            if values.size:
+                result[str(tribunal)] = {
+                    f"p{p}": round(float(v), 2) for p, v in zip(percentiles, np.percentile(values, percentiles))
+                }
+        return result
+
+    def summary(self) -> dict:
+        return {
+            "processes": len(self.numeros),
+            "with_movements": int(self.has_movement.sum()),
+            "changed": int(self.changed.sum()),
+            "staleness_by_tribunal": self.staleness_by_tribunal(),
+        }
+
+
+def analyze_recency(columns: MovementColumns, now: Optional[datetime] = None) -> RecencyAnalysis:
+    """
+    Último movimento, delta em horas e percentis de defasagem de todos os processos de `columns`
+    num único passo vetorizado sobre as colunas.
+    """
+    numeros, tribunais, times, offsets, changed = columns.arrays()
+    last_at, last_index = _grouped_last(times, offsets)
+    delta_hours = ((now or datetime.now()).timestamp() - last_at) / 3600  # NaN sem movimento
+    return RecencyAnalysis(numeros, tribunais, last_at, last_index, delta_hours, changed)
@@ -19,27 +19,30 @@ class PassiveConsultantService:
         Recebe o identificador do sistema (numérico), o número do processo e o WhatsApp do advogado.
         Retorna o ProcessoScrapedDTO ou levanta uma exceção.
         """
-        logger.info(f"Iniciando processamento passivo para {adv_wpp}: sistema_id='{system_identifier}', processo='{num_processo}'")
+        logger.info("Iniciando processamento passivo para %s: sistema_id='%s', processo='%s'",
+                    adv_wpp, system_identifier, num_processo)
 
         try:
             # 1. Obter o nome do sistema a partir do identificador numérico
             system_type = get_system_name_from_identifier(system_identifier)
-            logger.debug(f"Identificador '{system_identifier}' mapeado para tipo de sistema: '{system_type}'")
+            logger.debug("Identificador '%s' mapeado para tipo de sistema: '%s'", system_identifier, system_type)
 
             # 2. Chamar o ProcessConsultant para obter os detalhes do processo
             process_data_dto = self.process_consultant.get_process_details(num_processo, system_type)
-            logger.info(f"Dados do processo '{num_processo}' ({system_type}) obtidos com sucesso.")
+            logger.info("Dados do processo '%s' (%s) obtidos com sucesso.", num_processo, system_type)
 
             return process_data_dto
 
         except ValueError as e:
-            logger.warning(f"Erro de validação na consulta passiva para {adv_wpp}: {e}")
+            logger.warning("Erro de validação na consulta passiva para %s: %s", adv_wpp, e)
             raise # Re-lança para o controller lidar
         except (ProcessNotFoundException, ScraperTechnicalException, ScraperBusinessException) as e:
-            logger.error(f"Erro específico de scraping/negócio na consulta passiva para {adv_wpp}, processo {num_processo}: {e}", exc_info=True)
+            logger.error("Erro específico de scraping/negócio na consulta passiva para %s, processo %s: %s",
+                         adv_wpp, num_processo, e, exc_info=True)
             raise # Re-lança para o controller lidar
         except Exception as e:
-            logger.critical(f"Erro inesperado na consulta passiva para {adv_wpp}, processo {num_processo}: {e}", exc_info=True)
+            logger.critical("Erro inesperado na consulta passiva para %s, processo %s: %s",
+                            adv_wpp, num_processo, e, exc_info=True)
             raise # Re-lança para o controller lidar
 
 
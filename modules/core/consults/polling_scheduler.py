@@ -0,0 +1,89 @@
+import logging
+import os
+import random
+from datetime import datetime
+from typing import Optional
+
+from modules.core.consults.court_calendar import CourtCalendar
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePollingScheduler:
+    """
+    Calcula quando cada entrada da lista de monitoramento deve ser consultada de novo.
+
+    A fila de prioridade é a própria WatchListStore, ordenada pelo índice em `next_due_at`:
+    cada passagem consome as entradas vencidas em ordem de vencimento e este agendador
+    decide o próximo vencimento de cada uma, de acordo com o quanto o processo se movimenta:
+
+    - processo que teve movimento novo: intervalo multiplicado por `speedup_factor` (consulta mais frequente);
+    - processo parado: intervalo multiplicado por `backoff_factor`, até `max_interval` (um dia, por padrão).
+
+    Um jitter de ±`jitter_ratio` espalha os vencimentos para que processos adicionados juntos
+    não voltem todos na mesma passagem.
+
+    Com um `calendar` (CourtCalendar), vencimentos que cairiam fora do expediente, em feriados ou no
+    recesso são adiados para o início da próxima janela ativa (espalhados na primeira hora dela), mas
+    nunca além de `max_interval`: no recesso o processo continua sendo consultado uma vez por dia.
+    Com um `histogram` (MovementHistogramStore), o intervalo é dividido pelo peso da hora do vencimento
+    (limitado entre `min_hour_weight` e `max_hour_weight`): horas de pico são consultadas com mais frequência.
+    """
+
+    def __init__(self,
+                 min_interval: float = float(os.getenv("MONITOR_MIN_INTERVAL_SECONDS", "900")),
+                 max_interval: float = float(os.getenv("MONITOR_MAX_INTERVAL_SECONDS", "86400")),
+                 initial_interval: float = float(os.getenv("MONITOR_INITIAL_INTERVAL_SECONDS", "3600")),
+                 speedup_factor: float = 0.5,
+                 backoff_factor: float = 1.5,
+                 jitter_ratio: float = 0.1,
+                 calendar: Optional[CourtCalendar] = None,
+                 histogram=None,
+                 min_hour_weight: float = 0.5,
+                 max_hour_weight: float = 2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.speedup_factor = speedup_factor
+        self.backoff_factor = backoff_factor
+        self.jitter_ratio = jitter_ratio
+        self.calendar = calendar
+        self.histogram = histogram
+        self.min_hour_weight = min_hour_weight
+        self.max_hour_weight = max_hour_weight
+
+    def current_interval(self, entry: dict) -> float:
+        return entry.get("poll_interval_seconds") or self.initial_interval
+
+    def next_interval(self, current_interval: Optional[float], changed: bool) -> float:
+        """Novo intervalo de consulta após uma consulta com (`changed=True`) ou sem movimento novo."""
+        interval = current_interval or self.initial_interval
+        interval *= self.speedup_factor if changed else self.backoff_factor
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def next_due_at(self, interval: float, now: float) -> float:
+        jitter = random.uniform(-self.jitter_ratio, self.jitter_ratio)
+        due_at = now + interval * (1 + jitter)
+
+        if self.histogram is not None:
+            weight = self.histogram.weight(datetime.fromtimestamp(due_at))
+            weight = min(max(weight, self.min_hour_weight), self.max_hour_weight)
+            due_at = now + max((due_at - now) / weight, self.min_interval)
+
+        if self.calendar is not None:
+            due_at = self._defer_to_active_window(due_at, now)
+        return due_at
+
+    def _defer_to_active_window(self, due_at: float, now: float) -> float:
+        due = datetime.fromtimestamp(due_at)
+        if self.calendar.is_active(due):
+            return due_at
+
+        window_start = self.calendar.next_active_start(due)
+        latest = now + self.max_interval
+        if window_start is None:
+            return max(due_at, latest)
+
+        # Espalha na primeira hora da janela para não acumular todas as entradas adiadas no mesmo instante
+        deferred = window_start.timestamp() + random.uniform(0, min(3600.0, self.min_interval))
+        return min(deferred, max(due_at, latest))
@@ -0,0 +1,67 @@
+import math
+import os
+import time
+from typing import Optional
+
+from modules.models.exception.exceptions import DeadlineExceededException
+
+# Orçamento padrão de uma requisição HTTP, do handler Flask até o fim do scraping.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "90"))
+# Nenhuma espera é criada com menos que isso: abaixo desse valor o Selenium não tem chance real de achar o elemento.
+MIN_STAGE_TIMEOUT = 0.5
+
+
+class Deadline:
+    """
+    Prazo absoluto de uma requisição, propagado por todas as camadas do scraping
+    (handler -> ProcessConsultant -> scraper -> esperas do Selenium -> resolução do CAPTCHA).
+
+    Cada etapa dimensiona sua espera com `timeout()` a partir do tempo restante, em vez de usar
+    apenas seu timeout fixo, e chama `check()` antes de começar trabalho novo.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str):
+        """Lança DeadlineExceededException se não houver mais tempo para começar a etapa `stage`."""
+        if self.remaining() < MIN_STAGE_TIMEOUT:
+            raise DeadlineExceededException(stage=stage, budget=self.budget)
+
+    def timeout(self, desired: float) -> float:
+        """Timeout da etapa: o timeout desejado, limitado ao tempo restante."""
+        return max(min(desired, self.remaining()), MIN_STAGE_TIMEOUT)
+
+    @staticmethod
+    def earliest(*deadlines: Optional["Deadline"]) -> Optional["Deadline"]:
+        """Retorna o prazo que vence primeiro, ignorando os None."""
+        candidates = [d for d in deadlines if d is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda d: d.expires_at)
+
+
+def deadline_from_request(header_value: Optional[str]) -> Deadline:
+    """
+    Cria o prazo de uma requisição HTTP. O cliente pode pedir um prazo menor pelo header
+    `X-Request-Timeout` (em segundos), mas nunca maior que REQUEST_DEADLINE_SECONDS. Valores inválidos,
+    não finitos ou não positivos são ignorados.
+    """
+    seconds = REQUEST_DEADLINE_SECONDS
+    if header_value:
+        try:
+            requested = float(header_value)
+        except ValueError:
+            requested = None
+        # NaN passaria por min() e daria um prazo que nunca vence; zero ou negativo, um prazo já vencido
+        if requested is not None and math.isfinite(requested) and requested > 0:
+            seconds = min(requested, REQUEST_DEADLINE_SECONDS)
+    return Deadline(seconds)
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from modules.core.deadline import REQUEST_DEADLINE_SECONDS
+from modules.core.storage.idempotency_store import (
+    IdempotencyStore,
+    STATE_COMPLETED,
+    STATE_IN_PROGRESS,
+    STATE_MISMATCH,
+)
+from modules.models.exception.response_error import ResponseError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Quanto uma repetição espera pela requisição original ainda em andamento
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", str(REQUEST_DEADLINE_SECONDS)))
+# Idade a partir da qual uma reserva in_progress é considerada de uma requisição que morreu e pode ser
+# assumida por uma repetição. Precisa passar com folga do prazo máximo da requisição (o envio e a gravação
+# da resposta acontecem depois da consulta), senão a repetição refaz o trabalho com a original ainda rodando.
+IDEMPOTENCY_STALE_AFTER_SECONDS = float(
+    os.getenv("IDEMPOTENCY_STALE_AFTER_SECONDS", str(REQUEST_DEADLINE_SECONDS * 2 + 60))
+)
+IDEMPOTENCY_POLL_SECONDS = 0.5
+# Respostas 4xx que dependem do momento (conflito, limite de requisições) e não são guardadas
+TRANSIENT_STATUS_CODES = (408, 409, 425, 429)
+# Cabeçalhos da resposta original reproduzidos nas repetições
+REPLAYED_HEADERS = ("Content-Type", "Location", "ETag", "Last-Modified")
+
+_store = None
+
+
+def _get_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = IdempotencyStore()
+    return _store
+
+
+def idempotent(view):
+    """
+    Decorator de rota: com o header Idempotency-Key, a primeira resposta (status < 500, inclusive as de
+    exceções tratadas pelos error handlers, como o 404 de processo não encontrado) é guardada por
+    IDEMPOTENCY_TTL_SECONDS e as repetições com a mesma chave recebem a resposta guardada
+    (com o header Idempotent-Replayed: true) em vez de refazer o scraping e o envio.
+    Uma repetição que chega com a original ainda rodando espera por ela até IDEMPOTENCY_WAIT_SECONDS.
+    Reusar a chave com outro corpo de requisição retorna 422.
+    Deve ficar entre @route e @validate, para que a chave seja conferida antes da validação do corpo.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        store = _get_store()
+        scope = f"{request.method} {request.path}"
+        # A query string (ex: max_age, depth) também muda a resposta, então entra no hash junto com o corpo
+        request_hash = hashlib.sha256(request.query_string + b"\n" + request.get_data()).hexdigest()
+        waited_until = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            state, record = store.begin(scope, key, request_hash, IDEMPOTENCY_TTL_SECONDS,
+                                        stale_after=max(IDEMPOTENCY_STALE_AFTER_SECONDS, IDEMPOTENCY_WAIT_SECONDS))
+            if state == STATE_MISMATCH:
+                response_error = ResponseError(
+                    message=f"A chave de idempotência '{key}' já foi usada com outro corpo de requisição.",
+                    code="IDEMPOTENCY_KEY_MISMATCH"
+                )
+                return jsonify(response_error.model_dump()), 422
+            if state == STATE_COMPLETED:
+                logger.info("Repetindo a resposta guardada para a chave de idempotência '%s'.", key)
+                headers = dict(record["response_headers"], **{"Idempotent-Replayed": "true"})
+                return record["response_body"], record["status_code"], headers
+            if state != STATE_IN_PROGRESS:
+                break
+
+            if time.monotonic() >= waited_until:
+                response_error = ResponseError(
+                    message=f"A requisição original com a chave de idempotência '{key}' ainda está em andamento.",
+                    code="IDEMPOTENCY_KEY_IN_PROGRESS"
+                )
+                return jsonify(response_error.model_dump()), 409, {"Retry-After": "1"}
+            time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+        try:
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception as e:
+                # Erros de negócio viram 4xx nos error handlers: a resposta é a mesma em toda repetição
+                response = current_app.make_response(current_app.handle_user_exception(e))
+        except Exception:
+            store.abandon(scope, key)
+            raise
+
+        # 304 depende dos cabeçalhos condicionais (If-None-Match etc.) desta requisição, não só do corpo
+        if (response.status_code >= 500 or response.status_code == 304 or response.is_streamed
+                or response.status_code in TRANSIENT_STATUS_CODES):
+            store.abandon(scope, key)
+        else:
+            headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+            store.complete(scope, key, response.status_code, response.get_data(), headers, IDEMPOTENCY_TTL_SECONDS)
+        return response
+
+    return wrapper
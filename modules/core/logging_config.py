@@ -0,0 +1,161 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (padrão) ou "json" (uma linha JSON por registro, para agregadores de log)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Amostragem de mensagens repetitivas: cada linha de código que loga em DEBUG/INFO emite no máximo
+# LOG_SAMPLE_BURST registros por janela de LOG_SAMPLE_WINDOW_SECONDS. WARNING e acima nunca são descartados.
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "50"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "60"))
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - [%(request_id)s %(system)s %(num_processo)s] %(message)s"
+
+# Campos de contexto anexados a todo registro de log (ver log_context)
+CONTEXT_FIELDS = ("request_id", "system", "num_processo")
+
+_log_context = contextvars.ContextVar("log_context", default={})
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Dentro do contexto, todo log da thread (ou da task) atual carrega `fields` (request_id, system, num_processo).
+    Contextos aninhados herdam os campos do contexto externo.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields) -> contextvars.Token:
+    """Como `log_context`, para quem não pode usar `with` (ex: before_request do Flask). Desfazer com `reset_log_context`."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: contextvars.Token):
+    _log_context.reset(token)
+
+
+class LogContextFilter(logging.Filter):
+    """Copia os campos do log_context atual para o registro, ainda na thread que gerou o log."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, context.get(field, "-"))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Limita registros DEBUG/INFO repetitivos por linha de código (`pathname:lineno`), ex: o log de cada espera
+    ou de cada processo de uma passagem. O primeiro registro após uma janela com descartes informa quantos foram.
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window_seconds: float = LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started_at, emitted, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started_at >= self.window_seconds:
+                started_at, emitted = now, 0
+            if emitted >= self.burst:
+                self._windows[key] = (started_at, emitted, dropped + 1)
+                return False
+            self._windows[key] = (started_at, emitted + 1, 0)
+
+        if dropped:
+            record.msg = f"{record.msg} [+{dropped} registros semelhantes suprimidos]"
+        return True
+
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler que só junta mensagem e argumentos na thread de origem; a formatação do registro
+    (data, contexto, JSON) e a escrita ficam para a thread do QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # O traceback precisa ser formatado aqui: ele referencia frames que não devem sobreviver ao log
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, "-")
+            if value != "-":
+                payload[field] = value
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """
+    Configura o logging do processo: os registros vão para uma fila em memória e uma thread
+    (QueueListener) formata e escreve no stderr, tirando a E/S de log do caminho das raspagens.
+    Chamadas repetidas não têm efeito.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredFormatQueueHandler(log_queue)
+        queue_handler.addFilter(LogContextFilter())
+        queue_handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
@@ -1,39 +1,64 @@
 import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
 
+from cachetools import LRUCache
+
+from modules.core.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from modules.core.deadline import Deadline
+from modules.core.logging_config import log_context
+from modules.core.retry_policy import RetryPolicy
 from modules.core.scrapers_map import SCRAPER_CLASSES, SYSTEM_IDENTIFIER_MAP, get_system_name_from_identifier
 
+from modules.debug.profiler import scrape_profiler
+from modules.metrics.metrics import SCRAPE_STAGE_SECONDS, SCRAPING_EXCEPTIONS
+from modules.models.exception.exceptions import BaseScrapingException, CircuitOpenException, DeadlineExceededException
 from modules.models.process_dtos import ProcessoScrapedDTO
 
 logger = logging.getLogger(__name__)
 
+# Último resultado bem-sucedido por (sistema, processo), com o horário da raspagem, compartilhado entre
+# todas as instâncias. Usado como fallback quando o circuit breaker do sistema está aberto e para
+# atender consultas com `max_age` sem abrir o navegador.
+_last_results = LRUCache(maxsize=int(os.getenv("SCRAPE_RESULT_CACHE_SIZE", "5000")))
+_last_results_lock = threading.Lock()
+
+# Raspagens em andamento por (sistema, processo): consultas simultâneas ao mesmo processo esperam a mesma
+# raspagem em vez de abrir um navegador cada (single-flight).
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
 class ProcessConsultant:
     def __init__(self):
         # Referencia o dicionário de classes importado
         self.scraper_classes = SCRAPER_CLASSES
         self._scraper_instances = {}  # Cache para instâncias de scraper
+        self.retry_policy = RetryPolicy()
 
-    def _get_scraper_instance(self, system_input: str): # Renomeei para system_input para clareza
+    def resolve_system_type(self, system_input: str) -> str:
         """
-        Retorna uma instância do scraper para o tipo de sistema especificado.
+        Resolve o nome interno do sistema (ex: "eproc_rj").
         Aceita tanto o identificador numérico (ex: "1") quanto o nome do sistema (ex: "eproc_rj").
-        Cria a instância se ela ainda não existir no cache.
         """
         system_input = system_input.strip().lower()
 
         # 1. Tenta resolver o input como um identificador numérico
         system_name = get_system_name_from_identifier(system_input)
-        logger.info(f"System_name = {system_name}")
+        logger.debug("System_name = %s", system_name)
 
-        # Se encontrou um mapeamento numérico, usa o nome do sistema correspondente
-        if system_name is None:
-            final_system_type = system_name
-            logger.info(f"System_name é None")
         # Se não encontrou um mapeamento numérico, assume que o input já é o nome do sistema
+        if system_name is None and system_input in self.scraper_classes:
+            final_system_type = system_input
+            logger.debug("System_name é None, usando o nome de sistema direto '%s'", system_input)
+        # Se encontrou um mapeamento numérico, usa o nome do sistema correspondente
         elif system_name in self.scraper_classes:
             final_system_type = system_name
-            logger.info(f"System_name {system_name} foi achado nas scrapper classes")
+            logger.debug("System_name %s foi achado nas scrapper classes", system_name)
         else:
-            logger.warning(f"Não foi possível converter o tipo do sistema - parou tudo")
+            logger.warning("Não foi possível converter o tipo do sistema - parou tudo")
             # Se não é nem numérico válido nem nome de sistema direto, lança erro
             raise ValueError(
                 f"Entrada de sistema '{system_input}' inválida. "
@@ -41,6 +66,13 @@ class ProcessConsultant:
                 f"ou um nome de sistema direto: {list(self.scraper_classes.keys())}."
             )
 
+        return final_system_type
+
+    def _get_scraper_instance(self, final_system_type: str):
+        """
+        Retorna uma instância do scraper para o sistema já resolvido por `resolve_system_type`.
+        Cria a instância se ela ainda não existir no cache.
+        """
         # Agora, com o final_system_type definido, o restante da lógica é a mesma
         scraper_class = self.scraper_classes.get(final_system_type)
 
@@ -51,15 +83,28 @@ class ProcessConsultant:
             )
 
         if final_system_type not in self._scraper_instances:
-            print(f"Core: Criando nova instância do scraper para '{final_system_type}'.")
+            logger.info("Criando nova instância do scraper para '%s'.", final_system_type)
             self._scraper_instances[final_system_type] = scraper_class()
 
         return self._scraper_instances[final_system_type]
 
-    def get_process_details(self, process_number: str, system_type: str) -> ProcessoScrapedDTO:
+    def get_process_details(self, process_number: str, system_type: str,
+                            use_fallback: bool = False, deadline: Optional[Deadline] = None,
+                            max_age: Optional[float] = None) -> ProcessoScrapedDTO:
         """
         Consulta os detalhes de um processo usando o scraper apropriado
         com base no `system_type`.
+
+        Erros transitórios são repetidos conforme a `RetryPolicy`, reaproveitando o navegador entre
+        tentativas quando possível. Cada tentativa passa pelo circuit breaker do sistema: enquanto ele
+        estiver aberto a chamada falha imediatamente com CircuitOpenException. Com `use_fallback=True`,
+        o último resultado bem-sucedido do processo (se houver) é retornado no lugar desse erro.
+
+        O `deadline` (normalmente criado no handler HTTP) limita o tempo total, incluindo as novas
+        tentativas: cada espera dos scrapers é dimensionada pelo tempo restante.
+
+        Com `max_age` (segundos), um resultado raspado há menos tempo que isso é devolvido direto do cache.
+        Consultas simultâneas ao mesmo processo compartilham uma única raspagem.
         """
         if not process_number:
             raise ValueError("O número do processo não pode ser vazio.")
@@ -67,13 +112,132 @@ class ProcessConsultant:
             raise ValueError("O tipo de sistema (eproc_rj, pje_rj, etc.) é obrigatório.")
 
         try:
-            scraper_instance = self._get_scraper_instance(system_type)
-
-            print(f"Core: Solicitando dados do processo {process_number} do sistema {system_type} ao scraping.")
-            process_data = scraper_instance.scrape_processo(process_number)
-            print(f"Core: Dados do processo {process_number} obtidos com sucesso do sistema {system_type}.")
-            return process_data
+            final_system_type = self.resolve_system_type(system_type)
+            # Logs do scraper, do retry e do circuit breaker desta consulta carregam o sistema e o processo
+            with log_context(system=final_system_type, num_processo=process_number):
+                return self._fetch_process(final_system_type, process_number, use_fallback, deadline, max_age)
         except Exception as e:
-            print(f"Erro ao consultar processo {process_number} via scraper de {system_type}: {e}")
+            logger.warning("Erro ao consultar processo %s via scraper de %s: %s", process_number, system_type, e)
             raise  # Re-lança a exceção para que a camada superior possa tratá-la
 
+    def _fetch_process(self, final_system_type: str, process_number: str, use_fallback: bool,
+                       deadline: Optional[Deadline], max_age: Optional[float]) -> ProcessoScrapedDTO:
+        if max_age is not None:
+            cached = self._get_last_result(final_system_type, process_number, max_age=max_age)
+            if cached is not None:
+                logger.info("Processo %s atendido pelo cache (max_age=%ss).", process_number, max_age)
+                return cached
+
+        logger.info("Solicitando dados do processo %s do sistema %s ao scraping.", process_number, final_system_type)
+        deadline = self.retry_policy.budget_deadline(deadline)
+        try:
+            process_data = self._single_flight(
+                (final_system_type, process_number),
+                lambda: self._scrape_with_retries(final_system_type, process_number, deadline),
+                deadline
+            )
+        except CircuitOpenException:
+            cached = self._get_last_result(final_system_type, process_number) if use_fallback else None
+            if cached is None:
+                raise
+            logger.warning("Circuit breaker de '%s' aberto. Retornando último resultado conhecido do processo %s.",
+                           final_system_type, process_number)
+            return cached
+
+        logger.info("Dados do processo %s obtidos com sucesso do sistema %s.", process_number, final_system_type)
+        return process_data
+
+    def _scrape_with_retries(self, final_system_type: str, process_number: str,
+                             deadline: Deadline) -> ProcessoScrapedDTO:
+        scraper_instance = self._get_scraper_instance(final_system_type)
+        circuit_breaker = get_circuit_breaker(final_system_type)
+        with scraper_instance.warm_session():
+            process_data = self.retry_policy.execute(
+                self._scrape_once, scraper_instance, circuit_breaker, process_number, deadline,
+                description=f"{final_system_type}:{process_number}",
+                deadline=deadline
+            )
+        self._store_last_result(final_system_type, process_number, process_data)
+        return process_data
+
+    @staticmethod
+    def _single_flight(key: tuple, func, deadline: Deadline):
+        """
+        Executa `func` para `key`, ou espera e compartilha o resultado de uma execução já em andamento.
+        Quem espera não passa do próprio `deadline`: a execução em andamento pode ter um prazo maior.
+        """
+        with _in_flight_lock:
+            future = _in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = _in_flight[key] = Future()
+
+        if not leader:
+            logger.info("Aguardando raspagem já em andamento de %s:%s.", key[0], key[1])
+            try:
+                return future.result(timeout=deadline.remaining())
+            except FutureTimeoutError:
+                raise DeadlineExceededException(stage="aguardando_raspagem_em_andamento", budget=deadline.budget)
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(key, None)
+
+    @classmethod
+    def _scrape_once(cls, scraper_instance, circuit_breaker: CircuitBreaker, process_number: str,
+                     deadline: Deadline) -> ProcessoScrapedDTO:
+        """Uma tentativa de scraping, protegida pelo circuit breaker do sistema e medida em /metrics."""
+        system = scraper_instance.SYSTEM_NAME
+        try:
+            with scrape_profiler.scrape(), SCRAPE_STAGE_SECONDS.time(system=system, stage="scrape"):
+                return cls._scrape_attempt(scraper_instance, circuit_breaker, process_number, deadline)
+        except Exception as e:
+            code = e.code if isinstance(e, BaseScrapingException) else type(e).__name__
+            SCRAPING_EXCEPTIONS.inc(system=system, code=code)
+            raise
+
+    @staticmethod
+    def _scrape_attempt(scraper_instance, circuit_breaker: CircuitBreaker, process_number: str,
+                        deadline: Deadline) -> ProcessoScrapedDTO:
+        deadline.check("inicio_tentativa")
+        circuit_breaker.before_call()
+        try:
+            process_data = scraper_instance.scrape_processo(process_number, deadline=deadline)
+        except DeadlineExceededException as e:
+            circuit_breaker.record_failure(e)
+            raise
+        except Exception as e:
+            # Uma espera encurtada pelo prazo estoura como erro do Selenium: reporta como prazo esgotado,
+            # para não contar como falha do sistema nem disparar nova tentativa.
+            if deadline.expired:
+                deadline_error = DeadlineExceededException(stage="scraping", budget=deadline.budget, original_exception=e)
+                circuit_breaker.record_failure(deadline_error)
+                raise deadline_error from e
+            circuit_breaker.record_failure(e)
+            raise
+        circuit_breaker.record_success()
+        return process_data
+
+    @staticmethod
+    def _get_last_result(system_type: str, process_number: str,
+                         max_age: Optional[float] = None) -> ProcessoScrapedDTO | None:
+        with _last_results_lock:
+            entry = _last_results.get((system_type, process_number))
+        if entry is None:
+            return None
+        process_data, fetched_at = entry
+        if max_age is not None and time.time() - fetched_at > max_age:
+            return None
+        return process_data
+
+    @staticmethod
+    def _store_last_result(system_type: str, process_number: str, process_data: ProcessoScrapedDTO):
+        with _last_results_lock:
+            _last_results[(system_type, process_number)] = (process_data, time.time())
@@ -0,0 +1,109 @@
+import logging
+import os
+import random
+import time
+from typing import Callable, TypeVar, Optional
+
+from modules.core.deadline import Deadline
+from modules.models.exception.exceptions import BaseScrapingException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Erros que tendem a se resolver sozinhos (instabilidade do navegador, página lenta, CAPTCHA mal lido).
+TRANSIENT_ERROR_CODES = {
+    "PJE_WEBDRIVER_ERROR",
+    "PJE_UNEXPECTED_ERROR",
+    "PJE_SEARCH_FIELD_UNAVAILABLE",
+    "PJE_SEARCH_FIELD_RETRY_FAILED",
+    "PJE_PARTIES_ELEMENT_MISSING",
+    "EPROC_WEBDRIVER_ERROR",
+    "EPROC_UNEXPECTED_ERROR",
+    "EPROC_SEARCH_FIELD_UNAVAILABLE",
+    "EPROC_DATA_EXTRACTION_FAILURE",
+    "CAPTCHA_RESOLUTION_FAILED",
+}
+
+# Erros que uma nova tentativa não resolve: nunca são repetidos.
+PERMANENT_ERROR_CODES = {
+    "PROCESS_NOT_FOUND",
+    "CIRCUIT_OPEN",
+    "DEADLINE_EXCEEDED",
+    "API_KEY_MISSING",
+    "CAPTCHA_BASE64_DECODE_ERROR",
+    "EPROC_AUTUACAO_DATE_PARSE_ERROR",
+    "PJE_MOVIMENTATION_PARSING_ERROR",
+}
+
+
+class RetryPolicy:
+    """
+    Política de novas tentativas para o scraping, guiada pelo `code` das BaseScrapingException.
+
+    Apenas códigos em `transient_codes` são repetidos, com backoff exponencial e jitter ("full jitter").
+    Qualquer outro erro (códigos permanentes, códigos desconhecidos ou exceções fora da hierarquia
+    de scraping) é relançado imediatamente. Nenhuma nova tentativa começa se o tempo total da
+    requisição (`total_budget`, ou o `deadline` recebido, o que vencer primeiro) já tiver sido,
+    ou vier a ser, ultrapassado durante a espera.
+    """
+
+    def __init__(self,
+                 max_attempts: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+                 base_delay: float = float(os.getenv("RETRY_BASE_DELAY", "2")),
+                 max_delay: float = float(os.getenv("RETRY_MAX_DELAY", "20")),
+                 total_budget: float = float(os.getenv("RETRY_TOTAL_BUDGET", "180")),
+                 transient_codes: set = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_budget = total_budget
+        self.transient_codes = transient_codes if transient_codes is not None else TRANSIENT_ERROR_CODES
+
+    def is_transient(self, exception: Exception) -> bool:
+        if not isinstance(exception, BaseScrapingException):
+            return False
+        if exception.code not in self.transient_codes and exception.code not in PERMANENT_ERROR_CODES:
+            logger.warning("Código de erro '%s' não classificado. Tratando como permanente.", exception.code)
+        return exception.code in self.transient_codes
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Atraso antes da tentativa `attempt + 1`: uniforme entre 0 e base_delay * 2^(attempt-1), limitado a max_delay."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def budget_deadline(self, deadline: Optional[Deadline] = None) -> Deadline:
+        """Prazo efetivo de uma execução: o `total_budget` da política ou o `deadline` recebido, o que vencer primeiro."""
+        return Deadline.earliest(deadline, Deadline(self.total_budget))
+
+    def execute(self, func: Callable[..., T], *args, description: str = "",
+                deadline: Optional[Deadline] = None, **kwargs) -> T:
+        """
+        Executa `func(*args, **kwargs)` aplicando a política. Relança a última exceção quando
+        o erro é permanente, as tentativas acabam ou o tempo total se esgota.
+        """
+        deadline = self.budget_deadline(deadline)
+        attempt = 1
+
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self.is_transient(e):
+                    raise
+
+                if attempt >= self.max_attempts:
+                    logger.warning("[%s] Erro transitório '%s' na tentativa %s/%s. Tentativas esgotadas.",
+                                   description, e.code, attempt, self.max_attempts)
+                    raise
+
+                delay = self.backoff_delay(attempt)
+                if delay >= deadline.remaining():
+                    logger.warning("[%s] Erro transitório '%s', mas o tempo total da requisição (%.0fs) se "
+                                   "esgotaria. Não haverá nova tentativa.",
+                                   description, e.code, deadline.budget)
+                    raise
+
+                logger.info("[%s] Erro transitório '%s' na tentativa %s/%s. Nova tentativa em %.1fs.",
+                            description, e.code, attempt, self.max_attempts, delay)
+                time.sleep(delay)
+                attempt += 1
@@ -0,0 +1,86 @@
+import json
+import logging
+import time
+from typing import Optional, Tuple
+
+from modules.core.storage.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+STATE_NEW = "new"
+STATE_IN_PROGRESS = "in_progress"
+STATE_COMPLETED = "completed"
+STATE_MISMATCH = "mismatch"
+
+
+class IdempotencyStore(SQLiteStore):
+    """
+    Respostas já produzidas por chave de idempotência (header Idempotency-Key), por escopo (método + rota).
+    Uma chave fica 'in_progress' enquanto a requisição original roda e 'completed' com a resposta guardada
+    até expirar.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        scope TEXT NOT NULL,
+        idempotency_key TEXT NOT NULL,
+        request_hash TEXT NOT NULL,
+        status TEXT NOT NULL,
+        status_code INTEGER,
+        response_body BLOB,
+        response_headers TEXT,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (scope, idempotency_key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+    """
+
+    def begin(self, scope: str, key: str, request_hash: str, ttl_seconds: float,
+              stale_after: float) -> Tuple[str, Optional[dict]]:
+        """
+        Tenta reservar a chave. Retorna (estado, registro):
+        - new: reservada para esta requisição, que deve executar e chamar `complete` ou `abandon`;
+        - in_progress: outra requisição com a mesma chave ainda está rodando;
+        - completed: já existe resposta guardada;
+        - mismatch: a chave já foi usada com outro corpo de requisição.
+        Uma reserva in_progress mais velha que `stale_after` (a original morreu) é assumida por esta requisição.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+            row = conn.execute(
+                "SELECT * FROM idempotency_keys WHERE scope = ? AND idempotency_key = ?", (scope, key)
+            ).fetchone()
+
+            if row is not None:
+                record = dict(row)
+                if record["request_hash"] != request_hash:
+                    return STATE_MISMATCH, record
+                if record["status"] == STATE_COMPLETED:
+                    record["response_headers"] = json.loads(record["response_headers"] or "{}")
+                    return STATE_COMPLETED, record
+                if record["created_at"] >= now - stale_after:
+                    return STATE_IN_PROGRESS, record
+                logger.warning("Reserva da chave de idempotência '%s' abandonada; assumindo a execução.", key)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys "
+                "(scope, idempotency_key, request_hash, status, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, key, request_hash, STATE_IN_PROGRESS, now, now + ttl_seconds)
+            )
+        return STATE_NEW, None
+
+    def complete(self, scope: str, key: str, status_code: int, body: bytes, headers: dict, ttl_seconds: float):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE idempotency_keys SET status = ?, status_code = ?, response_body = ?, response_headers = ?, "
+                "expires_at = ? WHERE scope = ? AND idempotency_key = ?",
+                (STATE_COMPLETED, status_code, body, json.dumps(headers), time.time() + ttl_seconds, scope, key)
+            )
+
+    def abandon(self, scope: str, key: str):
+        """Libera a chave de uma execução que falhou, para que uma nova tentativa execute de novo."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE scope = ? AND idempotency_key = ? AND status = ?",
+                         (scope, key, STATE_IN_PROGRESS))
@@ -0,0 +1,86 @@
+import json
+import logging
+import time
+from typing import Optional
+
+from modules.core.storage.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+# Erro gravado nos jobs que nunca terminaram (o worker que os executava caiu ou reiniciou)
+ABANDONED_ERROR = {"message": "O job foi interrompido antes de terminar.", "code": "JOB_ABANDONED", "details": None}
+
+
+class JobStore(SQLiteStore):
+    """
+    Estado dos jobs assíncronos (ver JobManager), compartilhado por todos os workers do servidor:
+    o job roda no worker que o aceitou, mas GET /api/v1/jobs/<id> pode cair em qualquer um.
+    `result` e `error` são guardados em JSON.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        description TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        result TEXT,
+        error TEXT
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+    """
+
+    def create(self, job_id: str, description: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, description, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, description, STATUS_QUEUED, time.time())
+            )
+
+    def mark_running(self, job_id: str):
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?",
+                         (STATUS_RUNNING, time.time(), job_id))
+
+    def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[dict] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE job_id = ?",
+                (status, time.time(), self._dumps(result), self._dumps(error), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        return job
+
+    def purge_expired(self, ttl_seconds: float):
+        """
+        Remove os jobs finalizados há mais de `ttl_seconds` e marca como falhos os que não terminaram
+        nesse tempo desde a criação (o worker que os executava não existe mais).
+        """
+        now = time.time()
+        limit = now - ttl_seconds
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (limit,))
+            abandoned = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE finished_at IS NULL AND created_at < ?",
+                (STATUS_FAILED, now, self._dumps(ABANDONED_ERROR), limit)
+            ).rowcount
+        if abandoned:
+            logger.warning("%s job(s) abandonado(s) marcado(s) como falho(s).", abandoned)
+
+    @staticmethod
+    def _dumps(value: Optional[dict]) -> Optional[str]:
+        return json.dumps(value, ensure_ascii=False, default=str) if value is not None else None
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import time
+from typing import List, Tuple
+
+from modules.core.storage.sqlite_store import SQLiteStore
+from modules.models.process_dtos import MovimentoDTO
+
+logger = logging.getLogger(__name__)
+
+
+class MovementFingerprintStore(SQLiteStore):
+    """
+    Impressões digitais (hash de dataHora + nome) dos movimentos já vistos de cada processo.
+    Permite separar, em cada consulta, os movimentos realmente novos dos que já foram notificados.
+
+    Movimentos cuja data não pôde ser lida (`dataHoraEstimada`) entram só pelo nome: a data deles é a
+    hora da raspagem e mudaria a cada consulta. A linha de base de cada processo fica registrada em
+    `fingerprint_baselines`, e não é deduzida da contagem de impressões digitais (um processo sem
+    movimentos na primeira consulta também tem linha de base).
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS movement_fingerprints (
+        system_identifier TEXT NOT NULL,
+        num_processo TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        data_hora REAL NOT NULL,
+        nome TEXT NOT NULL,
+        first_seen_at REAL NOT NULL,
+        PRIMARY KEY (system_identifier, num_processo, fingerprint)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS fingerprint_baselines (
+        system_identifier TEXT NOT NULL,
+        num_processo TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (system_identifier, num_processo)
+    ) WITHOUT ROWID;
+    """
+
+    def _migrate(self):
+        # Bancos anteriores à tabela de linhas de base: todo processo com impressões digitais já tem linha de base
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR IGNORE INTO fingerprint_baselines (system_identifier, num_processo, created_at) "
+            "SELECT system_identifier, num_processo, MIN(first_seen_at) FROM movement_fingerprints "
+            "GROUP BY system_identifier, num_processo"
+        )
+
+    @staticmethod
+    def fingerprint(movimento: MovimentoDTO) -> str:
+        if movimento.dataHoraEstimada:
+            raw = f"sem-data|{movimento.nome.strip()}"
+        else:
+            raw = f"{movimento.dataHora.isoformat()}|{movimento.nome.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def diff(self, system_identifier: str, num_processo: str,
+             movimentos: List[MovimentoDTO]) -> Tuple[List[MovimentoDTO], bool]:
+        """
+        Compara os movimentos de uma consulta com os já vistos e retorna (movimentos novos, linha_de_base).
+
+        Os movimentos novos não são registrados aqui: quem os notifica chama `record` depois que os
+        consumidores confirmarem, para que uma falha na notificação não os dê como vistos (eles voltam
+        como novos na consulta seguinte). Na primeira consulta de um processo (`linha_de_base` True) todos
+        os movimentos são registrados na hora e a lista de novos volta vazia: o histórico existente não é
+        notificado. Os movimentos novos vêm do mais recente para o mais antigo.
+        """
+        by_fingerprint = {self.fingerprint(m): m for m in movimentos}
+        now = time.time()
+
+        with self._transaction() as conn:
+            baseline = conn.execute(
+                "INSERT OR IGNORE INTO fingerprint_baselines (system_identifier, num_processo, created_at) "
+                "VALUES (?, ?, ?)",
+                (system_identifier, num_processo, now)
+            ).rowcount == 1
+            known = {
+                row["fingerprint"] for row in conn.execute(
+                    "SELECT fingerprint FROM movement_fingerprints WHERE system_identifier = ? AND num_processo = ?",
+                    (system_identifier, num_processo)
+                )
+            }
+            unseen = {fp: m for fp, m in by_fingerprint.items() if fp not in known}
+            if baseline:
+                self._insert(conn, system_identifier, num_processo, unseen, now)
+
+        if baseline:
+            logger.info("Linha de base registrada para o processo %s (%s movimentos).", num_processo, len(unseen))
+            return [], True
+        return sorted(unseen.values(), key=lambda m: m.dataHora, reverse=True), False
+
+    def record(self, system_identifier: str, num_processo: str, movimentos: List[MovimentoDTO]):
+        """Registra `movimentos` como vistos (os novos de `diff`, depois de notificados)."""
+        with self._transaction() as conn:
+            self._insert(conn, system_identifier, num_processo, {self.fingerprint(m): m for m in movimentos},
+                         time.time())
+
+    @staticmethod
+    def _insert(conn, system_identifier: str, num_processo: str, by_fingerprint: dict, now: float):
+        conn.executemany(
+            "INSERT OR IGNORE INTO movement_fingerprints "
+            "(system_identifier, num_processo, fingerprint, data_hora, nome, first_seen_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(system_identifier, num_processo, fp, m.dataHora.timestamp(), m.nome, now)
+             for fp, m in by_fingerprint.items()]
+        )
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime
+from typing import Iterable
+
+from modules.core.storage.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class MovementHistogramStore(SQLiteStore):
+    """
+    Histograma de movimentos por (dia da semana, hora), aprendido com os movimentos já observados
+    pela consulta ativa. Serve para estimar em que horas os tribunais costumam publicar.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS movement_hour_histogram (
+        weekday INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (weekday, hour)
+    );
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache = None
+
+    def record(self, moments: Iterable[datetime]) -> int:
+        rows = [(m.weekday(), m.hour) for m in moments]
+        if not rows:
+            return 0
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO movement_hour_histogram (weekday, hour, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (weekday, hour) DO UPDATE SET count = count + 1",
+                rows
+            )
+        self._cache = None
+        return len(rows)
+
+    def total(self) -> int:
+        return sum(self._counts().values())
+
+    def weight(self, moment: datetime, smoothing: float = 1.0) -> float:
+        """
+        Probabilidade relativa de movimento na hora de `moment`: 1.0 é a média de todas as horas da
+        semana, valores maiores indicam horas de pico. Usa suavização de Laplace para horas sem registro.
+        """
+        counts = self._counts()
+        total = sum(counts.values())
+        if not total:
+            return 1.0
+        mean = (total + smoothing * 168) / 168
+        return (counts.get((moment.weekday(), moment.hour), 0) + smoothing) / mean
+
+    def _counts(self) -> dict:
+        # O histograma muda pouco durante uma passagem: evita uma consulta ao banco por entrada agendada
+        if self._cache is None:
+            rows = self._connection().execute("SELECT weekday, hour, count FROM movement_hour_histogram").fetchall()
+            self._cache = {(row["weekday"], row["hour"]): row["count"] for row in rows}
+        return self._cache
@@ -0,0 +1,123 @@
+import logging
+import time
+import uuid
+from typing import Iterable, List, Optional, Tuple
+
+from modules.core.storage.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class PassCheckpointStore(SQLiteStore):
+    """
+    Checkpoints das passagens da consulta ativa: cada processo reivindicado numa passagem fica
+    registrado como pending e passa a done ou failed quando termina, com os horários de cada etapa.
+
+    A passagem grava um heartbeat enquanto roda. Uma passagem sem heartbeat recente e não finalizada
+    foi interrompida (o nó caiu ou reiniciou): seus itens ainda pending são retomados pela próxima
+    passagem de qualquer nó, exceto os que foram concluídos dentro da janela de frescor.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS monitor_passes (
+        pass_id TEXT PRIMARY KEY,
+        node_id TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        heartbeat_at REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_monitor_passes_open ON monitor_passes (finished_at, heartbeat_at);
+
+    CREATE TABLE IF NOT EXISTS pass_checkpoints (
+        pass_id TEXT NOT NULL,
+        system_identifier TEXT NOT NULL,
+        num_processo TEXT NOT NULL,
+        status TEXT NOT NULL,
+        claimed_at REAL NOT NULL,
+        finished_at REAL,
+        error TEXT,
+        PRIMARY KEY (pass_id, system_identifier, num_processo)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_pass_checkpoints_process
+        ON pass_checkpoints (system_identifier, num_processo, status, finished_at);
+    """
+
+    def start_pass(self, node_id: str) -> str:
+        pass_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO monitor_passes (pass_id, node_id, started_at, heartbeat_at) VALUES (?, ?, ?, ?)",
+                (pass_id, node_id, now, now)
+            )
+        return pass_id
+
+    def heartbeat(self, pass_id: str):
+        with self._transaction() as conn:
+            conn.execute("UPDATE monitor_passes SET heartbeat_at = ? WHERE pass_id = ?", (time.time(), pass_id))
+
+    def finish_pass(self, pass_id: str, retention_seconds: float = 7 * 86400):
+        """Finaliza a passagem e apaga os checkpoints de passagens finalizadas há mais de `retention_seconds`."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE monitor_passes SET finished_at = ? WHERE pass_id = ?", (now, pass_id))
+            old_passes = "SELECT pass_id FROM monitor_passes WHERE finished_at < ?"
+            conn.execute(f"DELETE FROM pass_checkpoints WHERE pass_id IN ({old_passes})", (now - retention_seconds,))
+            conn.execute("DELETE FROM monitor_passes WHERE finished_at < ?", (now - retention_seconds,))
+
+    def mark_pending(self, pass_id: str, keys: Iterable[Tuple[str, str]]):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pass_checkpoints (pass_id, system_identifier, num_processo, status, claimed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(pass_id, system_identifier, num_processo, STATUS_PENDING, now) for system_identifier, num_processo in keys]
+            )
+
+    def mark_finished(self, pass_id: str, system_identifier: str, num_processo: str, status: str,
+                      error: Optional[str] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE pass_checkpoints SET status = ?, finished_at = ?, error = ? "
+                "WHERE pass_id = ? AND system_identifier = ? AND num_processo = ?",
+                (status, time.time(), error, pass_id, system_identifier, num_processo)
+            )
+
+    def adopt_abandoned(self, node_id: str, stale_after: float, freshness_seconds: float) -> List[Tuple[str, str]]:
+        """
+        Encerra as passagens interrompidas (sem heartbeat há mais de `stale_after` segundos) e retorna os
+        processos que ficaram pending nelas e não foram concluídos por nenhuma passagem nos últimos
+        `freshness_seconds`. O chamador deve torná-los vencidos para que a passagem atual os retome.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            abandoned = [row["pass_id"] for row in conn.execute(
+                "SELECT pass_id FROM monitor_passes WHERE finished_at IS NULL AND heartbeat_at < ?",
+                (now - stale_after,)
+            )]
+            if not abandoned:
+                return []
+
+            placeholders = ", ".join("?" for _ in abandoned)
+            rows = conn.execute(
+                "SELECT DISTINCT c.system_identifier, c.num_processo FROM pass_checkpoints c "
+                f"WHERE c.pass_id IN ({placeholders}) AND c.status = ? AND NOT EXISTS ("
+                "SELECT 1 FROM pass_checkpoints d WHERE d.system_identifier = c.system_identifier "
+                "AND d.num_processo = c.num_processo AND d.status = ? AND d.finished_at >= ?)",
+                (*abandoned, STATUS_PENDING, STATUS_DONE, now - freshness_seconds)
+            ).fetchall()
+            conn.execute(
+                f"UPDATE pass_checkpoints SET status = ?, finished_at = ?, error = ? "
+                f"WHERE pass_id IN ({placeholders}) AND status = ?",
+                (STATUS_FAILED, now, f"passagem interrompida; retomada por {node_id}", *abandoned, STATUS_PENDING)
+            )
+            conn.execute(f"UPDATE monitor_passes SET finished_at = ? WHERE pass_id IN ({placeholders})",
+                         (now, *abandoned))
+
+        logger.info("%s passagem(ns) interrompida(s) encontrada(s); %s processo(s) a retomar.",
+                    len(abandoned), len(rows))
+        return [(row["system_identifier"], row["num_processo"]) for row in rows]
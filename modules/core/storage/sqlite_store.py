@@ -0,0 +1,70 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Banco local compartilhado pelos stores da consulta ativa.
+MONITOR_DB_PATH = os.getenv("MONITOR_DB_PATH", "data/monitor.db")
+
+
+class SQLiteStore:
+    """
+    Base dos stores em SQLite. Cada thread usa sua própria conexão (sqlite3 não compartilha
+    conexões entre threads com segurança) e o banco roda em modo WAL, para que leituras em
+    páginas não bloqueiem as escritas dos workers.
+
+    As subclasses definem o DDL em `SCHEMA` (apenas comandos idempotentes, "IF NOT EXISTS").
+    """
+
+    SCHEMA: str = ""
+
+    def __init__(self, db_path: str = MONITOR_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.SCHEMA:
+            self._connection().executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Ponto de extensão para migrar bancos criados por versões anteriores do `SCHEMA`."""
+        pass
+
+    def _ensure_columns(self, table: str, columns: dict):
+        """Adiciona à `table` as colunas de `columns` ({nome: definição}) que ainda não existirem."""
+        conn = self._connection()
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                logger.info("Migrando tabela '%s': adicionando coluna '%s'.", table, name)
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit; transações são abertas explicitamente em `_transaction`
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Transação de escrita (BEGIN IMMEDIATE: pega o lock de escrita já no início)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
@@ -0,0 +1,345 @@
+import csv
+import json
+import logging
+import sys
+import time
+from typing import Iterable, Iterator, Optional
+
+from modules.core.logging_config import configure_logging
+from modules.core.storage.sqlite_store import SQLiteStore
+from modules.models.process_dtos import ProcessNumberValidator
+
+logger = logging.getLogger(__name__)
+
+WATCH_LIST_FIELDS = ("adv_wpp", "system_identifier", "num_processo")
+
+
+class WatchListStore(SQLiteStore):
+    """
+    Lista de processos monitorados pela consulta ativa: uma linha por (advogado, sistema, processo).
+
+    `next_due_at` (epoch em segundos) indica quando a entrada deve ser consultada novamente;
+    o índice nele permite buscar o trabalho pendente em páginas, sem carregar a lista inteira.
+    As colunas `poll_interval_seconds`, `last_movement_at` e `last_polled_at` guardam o estado
+    do agendamento adaptativo (ver AdaptivePollingScheduler).
+
+    Com vários nós monitorando a mesma lista, cada nó reivindica lotes de processos vencidos com
+    um lease (`lease_owner`, `lease_expires_at`), renova enquanto trabalha e libera ao terminar.
+    Se o nó morrer, o lease expira e outro nó pode assumir o processo. A reivindicação é atômica
+    porque roda numa transação BEGIN IMMEDIATE, que serializa os nós que compartilham o arquivo
+    (em modo WAL). Só há a implementação SQLite; num backend Postgres o equivalente seria
+    SELECT ... FOR UPDATE SKIP LOCKED seguido do mesmo UPDATE.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS watch_list (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        adv_wpp TEXT NOT NULL,
+        system_identifier TEXT NOT NULL,
+        num_processo TEXT NOT NULL,
+        next_due_at REAL NOT NULL DEFAULT 0,
+        poll_interval_seconds REAL,
+        last_movement_at REAL,
+        last_polled_at REAL,
+        lease_owner TEXT,
+        lease_expires_at REAL,
+        created_at REAL NOT NULL,
+        UNIQUE (adv_wpp, system_identifier, num_processo)
+    );
+    CREATE INDEX IF NOT EXISTS idx_watch_list_next_due ON watch_list (next_due_at, id);
+    CREATE INDEX IF NOT EXISTS idx_watch_list_system_due ON watch_list (system_identifier, next_due_at);
+    CREATE INDEX IF NOT EXISTS idx_watch_list_process ON watch_list (system_identifier, num_processo);
+    """
+
+    SCHEDULING_COLUMNS = {
+        "poll_interval_seconds": "REAL",
+        "last_movement_at": "REAL",
+        "last_polled_at": "REAL",
+    }
+
+    LEASE_COLUMNS = {
+        "lease_owner": "TEXT",
+        "lease_expires_at": "REAL",
+    }
+
+    def _migrate(self):
+        self._ensure_columns("watch_list", self.SCHEDULING_COLUMNS)
+        self._ensure_columns("watch_list", self.LEASE_COLUMNS)
+        self._connection().execute("CREATE INDEX IF NOT EXISTS idx_watch_list_lease ON watch_list (lease_owner)")
+
+    def add(self, adv_wpp: str, system_identifier: str, num_processo: str, next_due_at: float = 0) -> bool:
+        """Adiciona uma entrada. Retorna False se ela já existir."""
+        return self.bulk_import([{
+            "adv_wpp": adv_wpp,
+            "system_identifier": system_identifier,
+            "num_processo": num_processo,
+            "next_due_at": next_due_at,
+        }]) == 1
+
+    def remove(self, adv_wpp: str, system_identifier: str, num_processo: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM watch_list WHERE adv_wpp = ? AND system_identifier = ? AND num_processo = ?",
+                (adv_wpp, system_identifier.strip(), ProcessNumberValidator.format_process_number(num_processo))
+            )
+        return cursor.rowcount > 0
+
+    def bulk_import(self, entries: Iterable[dict], batch_size: int = 1000) -> int:
+        """
+        Importa entradas (dicts com adv_wpp, system_identifier e num_processo) em lotes.
+        Entradas inválidas são ignoradas com aviso e entradas já existentes são mantidas como estão.
+        Retorna quantas entradas novas foram inseridas.
+        """
+        inserted = 0
+        batch = []
+        now = time.time()
+
+        for entry in entries:
+            adv_wpp = (entry.get("adv_wpp") or "").strip()
+            system_identifier = (entry.get("system_identifier") or "").strip()
+            num_processo = ProcessNumberValidator.format_process_number((entry.get("num_processo") or "").strip())
+
+            if not all([adv_wpp, system_identifier, num_processo]) or not ProcessNumberValidator.is_valid(num_processo):
+                logger.warning("Entrada inválida ignorada na importação da lista de monitoramento: %s", entry)
+                continue
+
+            batch.append((adv_wpp, system_identifier, num_processo, float(entry.get("next_due_at") or 0), now))
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(batch)
+                batch = []
+
+        if batch:
+            inserted += self._insert_batch(batch)
+
+        logger.info("Importação da lista de monitoramento concluída: %s entradas novas.", inserted)
+        return inserted
+
+    def _insert_batch(self, batch: list) -> int:
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO watch_list (adv_wpp, system_identifier, num_processo, next_due_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+            return conn.total_changes - before
+
+    def export(self, page_size: int = 1000) -> Iterator[dict]:
+        """Percorre a lista inteira em páginas (paginação por id)."""
+        last_id = 0
+        while True:
+            rows = self._connection().execute(
+                "SELECT * FROM watch_list WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]["id"]
+
+    def iter_due(self, now: Optional[float] = None, page_size: int = 500,
+                 system_identifier: Optional[str] = None) -> Iterator[dict]:
+        """
+        Percorre, em páginas e em ordem de vencimento, as entradas com next_due_at <= now.
+        A paginação é por (next_due_at, id), então entradas reagendadas durante a iteração não reaparecem.
+        """
+        now = now if now is not None else time.time()
+        last_due, last_id = -1.0, 0
+
+        while True:
+            query = ("SELECT * FROM watch_list WHERE next_due_at <= ? "
+                     "AND (next_due_at > ? OR (next_due_at = ? AND id > ?))")
+            params = [now, last_due, last_due, last_id]
+            if system_identifier is not None:
+                query += " AND system_identifier = ?"
+                params.append(system_identifier)
+            query += " ORDER BY next_due_at, id LIMIT ?"
+            params.append(page_size)
+
+            rows = self._connection().execute(query, params).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_due, last_id = rows[-1]["next_due_at"], rows[-1]["id"]
+
+    def count_by_system(self, due_before: float) -> dict:
+        """Quantidade de processos distintos com entradas vencidas em `due_before`, por sistema."""
+        rows = self._connection().execute(
+            "SELECT system_identifier, COUNT(DISTINCT num_processo) AS total FROM watch_list WHERE next_due_at <= ? "
+            "GROUP BY system_identifier", (due_before,)
+        ).fetchall()
+        return {row["system_identifier"]: row["total"] for row in rows}
+
+    def iter_due_processes(self, now: Optional[float] = None, page_size: int = 500,
+                           system_identifier: Optional[str] = None) -> Iterator[dict]:
+        """
+        Percorre, em páginas, os processos (sistema, número) com ao menos uma entrada vencida, cada um com
+        todos os seus assinantes: {system_identifier, num_processo, subscribers: [(id, adv_wpp), ...],
+        poll_interval_seconds, last_movement_at}. O estado de agendamento do grupo é o da entrada mais
+        frequente (menor intervalo) e o movimento mais recente já visto por qualquer assinante.
+        A paginação é por (sistema, número), então processos reagendados durante a iteração não reaparecem.
+        """
+        now = now if now is not None else time.time()
+        last_key = ("", "")
+
+        while True:
+            due_query = ("SELECT DISTINCT system_identifier, num_processo FROM watch_list "
+                         "WHERE next_due_at <= ? AND (system_identifier, num_processo) > (?, ?)")
+            params = [now, *last_key]
+            if system_identifier is not None:
+                due_query += " AND system_identifier = ?"
+                params.append(system_identifier)
+            due_query += " ORDER BY system_identifier, num_processo LIMIT ?"
+            params.append(page_size)
+
+            rows = self._connection().execute(
+                "SELECT w.system_identifier, w.num_processo, "
+                "GROUP_CONCAT(w.id || char(30) || w.adv_wpp, char(31)) AS subscribers, "
+                "MIN(w.poll_interval_seconds) AS poll_interval_seconds, MAX(w.last_movement_at) AS last_movement_at "
+                f"FROM watch_list w JOIN ({due_query}) d "
+                "ON w.system_identifier = d.system_identifier AND w.num_processo = d.num_processo "
+                "GROUP BY w.system_identifier, w.num_processo ORDER BY w.system_identifier, w.num_processo",
+                params
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_process(row)
+            last_key = (rows[-1]["system_identifier"], rows[-1]["num_processo"])
+
+    def claim_due_processes(self, node_id: str, due_before: float, batch_size: int, lease_seconds: float,
+                            system_identifier: Optional[str] = None, exclude: Iterable[str] = ()) -> list:
+        """
+        Reivindica para `node_id` até `batch_size` processos com entradas vencidas em `due_before` que
+        não estejam sob lease válido de nenhum nó, em ordem de vencimento. Todas as entradas do processo
+        recebem o lease. Retorna os processos no formato de `iter_due_processes`.
+
+        Processos cujo número está em `exclude` (ex: já tratados nesta passagem) não são reivindicados.
+        """
+        now = time.time()
+        query = ("SELECT w.system_identifier, w.num_processo FROM watch_list w "
+                 "WHERE w.next_due_at <= ? AND NOT EXISTS ("
+                 "SELECT 1 FROM watch_list l WHERE l.system_identifier = w.system_identifier "
+                 "AND l.num_processo = w.num_processo AND l.lease_expires_at > ?)")
+        params = [due_before, now]
+        if system_identifier is not None:
+            query += " AND w.system_identifier = ?"
+            params.append(system_identifier)
+        exclude = list(exclude)
+        if exclude:
+            query += " AND w.num_processo NOT IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(exclude))
+        query += " GROUP BY w.system_identifier, w.num_processo ORDER BY MIN(w.next_due_at) LIMIT ?"
+        params.append(batch_size)
+
+        with self._transaction() as conn:
+            keys = [(row["system_identifier"], row["num_processo"]) for row in conn.execute(query, params)]
+            conn.executemany(
+                "UPDATE watch_list SET lease_owner = ?, lease_expires_at = ? "
+                "WHERE system_identifier = ? AND num_processo = ?",
+                [(node_id, now + lease_seconds, *key) for key in keys]
+            )
+            return [self._load_process(conn, *key) for key in keys]
+
+    def renew_leases(self, node_id: str, lease_seconds: float) -> int:
+        """Estende todos os leases ainda válidos de `node_id`. Retorna quantas entradas foram renovadas."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE watch_list SET lease_expires_at = ? WHERE lease_owner = ? AND lease_expires_at > ?",
+                (now + lease_seconds, node_id, now)
+            )
+        return cursor.rowcount
+
+    def release_lease(self, node_id: str, system_identifier: str, num_processo: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE watch_list SET lease_owner = NULL, lease_expires_at = NULL "
+                "WHERE lease_owner = ? AND system_identifier = ? AND num_processo = ?",
+                (node_id, system_identifier, num_processo)
+            )
+
+    def make_due(self, keys: Iterable[tuple], next_due_at: float = 0):
+        """Torna vencidos (e sem lease) todos os assinantes dos processos (sistema, número) em `keys`."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE watch_list SET next_due_at = ?, lease_owner = NULL, lease_expires_at = NULL "
+                "WHERE system_identifier = ? AND num_processo = ?",
+                [(next_due_at, system_identifier, num_processo) for system_identifier, num_processo in keys]
+            )
+
+    @staticmethod
+    def _load_process(conn, system_identifier: str, num_processo: str) -> dict:
+        row = conn.execute(
+            "SELECT system_identifier, num_processo, "
+            "GROUP_CONCAT(id || char(30) || adv_wpp, char(31)) AS subscribers, "
+            "MIN(poll_interval_seconds) AS poll_interval_seconds, MAX(last_movement_at) AS last_movement_at "
+            "FROM watch_list WHERE system_identifier = ? AND num_processo = ? GROUP BY system_identifier, num_processo",
+            (system_identifier, num_processo)
+        ).fetchone()
+        return WatchListStore._to_process(row)
+
+    @staticmethod
+    def _to_process(row) -> dict:
+        process = dict(row)
+        process["subscribers"] = [
+            (int(entry_id), adv_wpp)
+            for entry_id, adv_wpp in (item.split("\x1e", 1) for item in row["subscribers"].split("\x1f"))
+        ]
+        return process
+
+    def reschedule(self, entry_ids: Iterable[int], next_due_at: float):
+        with self._transaction() as conn:
+            conn.executemany("UPDATE watch_list SET next_due_at = ? WHERE id = ?",
+                             [(next_due_at, entry_id) for entry_id in entry_ids])
+
+    def record_poll(self, entry_ids: Iterable[int], poll_interval_seconds: float, next_due_at: float,
+                    last_movement_at: Optional[float], polled_at: float):
+        """Grava o resultado de uma consulta e o próximo vencimento calculado pelo agendador em todas as `entry_ids`."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE watch_list SET poll_interval_seconds = ?, next_due_at = ?, "
+                "last_movement_at = COALESCE(?, last_movement_at), last_polled_at = ? WHERE id = ?",
+                [(poll_interval_seconds, next_due_at, last_movement_at, polled_at, entry_id) for entry_id in entry_ids]
+            )
+
+    def count(self, due_before: Optional[float] = None) -> int:
+        if due_before is None:
+            return self._connection().execute("SELECT COUNT(*) FROM watch_list").fetchone()[0]
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM watch_list WHERE next_due_at <= ?", (due_before,)
+        ).fetchone()[0]
+
+    def import_csv(self, path: str) -> int:
+        """Importa um CSV com cabeçalho adv_wpp,system_identifier,num_processo."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return self.bulk_import(csv.DictReader(f))
+
+    def export_csv(self, path: str) -> int:
+        exported = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=WATCH_LIST_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for entry in self.export():
+                writer.writerow(entry)
+                exported += 1
+        return exported
+
+
+# --- Importação/exportação via linha de comando ---
+# python -m modules.core.storage.watch_list_store import processos.csv
+# python -m modules.core.storage.watch_list_store export processos.csv
+if __name__ == '__main__':
+    configure_logging()
+
+    if len(sys.argv) != 3 or sys.argv[1] not in ("import", "export"):
+        print("Uso: python -m modules.core.storage.watch_list_store [import|export] arquivo.csv")
+        sys.exit(1)
+
+    store = WatchListStore()
+    if sys.argv[1] == "import":
+        print(f"{store.import_csv(sys.argv[2])} entradas importadas.")
+    else:
+        print(f"{store.export_csv(sys.argv[2])} entradas exportadas.")
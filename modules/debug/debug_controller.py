@@ -0,0 +1,101 @@
+import hmac
+import logging
+import os
+
+from flask import Blueprint, Response, jsonify, request
+
+from modules.debug.profiler import ProfilerBusyException, scrape_profiler
+from modules.models.exception.response_error import ResponseError
+from modules.models.exception.validations_exceptions import InvalidQueryParameterException
+
+logger = logging.getLogger(__name__)
+
+# Desligado por padrão: o blueprint só é registrado (ver app.py) com DEBUG_PROFILING_ENABLED=true e um token
+DEBUG_PROFILING_ENABLED = os.getenv("DEBUG_PROFILING_ENABLED", "false").lower() == "true"
+DEBUG_PROFILING_TOKEN = os.getenv("DEBUG_PROFILING_TOKEN", "")
+DEBUG_TOKEN_HEADER = "X-Debug-Token"
+
+# Limites para que uma chamada esquecida não prenda um worker do servidor por muito tempo
+DEBUG_PROFILE_MAX_SECONDS = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "300"))
+DEBUG_PROFILE_MAX_SCRAPES = int(os.getenv("DEBUG_PROFILE_MAX_SCRAPES", "50"))
+
+# O prefixo base será /debug
+debug_bp = Blueprint('debug_api', __name__, url_prefix='/debug')
+
+
+def is_debug_profiling_available() -> bool:
+    if DEBUG_PROFILING_ENABLED and not DEBUG_PROFILING_TOKEN:
+        logger.warning("DEBUG_PROFILING_ENABLED sem DEBUG_PROFILING_TOKEN: endpoints de profiling não serão registrados.")
+    return DEBUG_PROFILING_ENABLED and bool(DEBUG_PROFILING_TOKEN)
+
+
+@debug_bp.before_request
+def check_debug_token():
+    token = request.headers.get(DEBUG_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode("utf-8"), DEBUG_PROFILING_TOKEN.encode("utf-8")):
+        response_error = ResponseError(message="Token de depuração ausente ou inválido.", code="DEBUG_FORBIDDEN")
+        return jsonify(response_error.model_dump()), 403
+
+
+@debug_bp.route('/profile', methods=['POST'])
+def profile():
+    """
+    Perfila o processo sob demanda e retorna o relatório em texto.
+
+    - mode=scrapes (padrão): cProfile das próximas `scrapes` raspagens (padrão 1), esperando até `timeout`
+      segundos (padrão 120); `sort` e `limit` controlam o relatório do pstats;
+    - mode=sampling: amostra as pilhas de todas as threads durante `seconds` segundos (padrão 30) e retorna
+      as pilhas agregadas ("collapsed stacks", para flamegraph.pl ou speedscope).
+    """
+    mode = request.args.get("mode", "scrapes")
+    try:
+        if mode == "scrapes":
+            scrapes = _bounded_arg("scrapes", int, 1, DEBUG_PROFILE_MAX_SCRAPES)
+            timeout = _bounded_arg("timeout", float, 120, DEBUG_PROFILE_MAX_SECONDS)
+            sort = request.args.get("sort", "cumulative")
+            if sort not in ("cumulative", "tottime", "calls", "ncalls", "time"):
+                raise InvalidQueryParameterException("sort", sort, "cumulative, tottime, calls, ncalls ou time")
+            report = scrape_profiler.profile_scrapes(scrapes, timeout, sort=sort,
+                                                     limit=_bounded_arg("limit", int, 50, 500))
+        elif mode == "sampling":
+            report = scrape_profiler.sample(_bounded_arg("seconds", float, 30, DEBUG_PROFILE_MAX_SECONDS))
+        else:
+            raise InvalidQueryParameterException("mode", mode, "scrapes ou sampling")
+    except ProfilerBusyException:
+        response_error = ResponseError(message="Já existe uma sessão de profiling em andamento.",
+                                       code="PROFILER_BUSY")
+        return jsonify(response_error.model_dump()), 409
+    return Response(report, mimetype="text/plain; charset=utf-8")
+
+
+@debug_bp.route('/tracemalloc', methods=['POST'])
+def tracemalloc_snapshot():
+    """
+    Primeira chamada: inicia o tracemalloc. Seguintes: diferença de alocações (top `limit`, agrupadas por
+    `group_by` = lineno, filename ou traceback) desde a chamada anterior.
+    """
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise InvalidQueryParameterException("group_by", group_by, "lineno, filename ou traceback")
+    report = scrape_profiler.tracemalloc_diff(limit=_bounded_arg("limit", int, 25, 500), key_type=group_by)
+    return Response(report, mimetype="text/plain; charset=utf-8")
+
+
+@debug_bp.route('/tracemalloc', methods=['DELETE'])
+def tracemalloc_stop():
+    """Encerra o tracemalloc (que tem custo de memória e CPU enquanto ativo)."""
+    scrape_profiler.stop_tracemalloc()
+    return "", 204
+
+
+def _bounded_arg(name: str, cast, default, maximum):
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        value = 0
+    if not 0 < value <= maximum:
+        raise InvalidQueryParameterException(name, raw, f"número maior que zero e até {maximum}")
+    return value
@@ -0,0 +1,182 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre amostras do profiler por amostragem (segundos)
+SAMPLING_INTERVAL_SECONDS = float(os.getenv("DEBUG_SAMPLING_INTERVAL_SECONDS", "0.005"))
+
+
+class ProfilerBusyException(Exception):
+    """Já existe uma sessão de profiling em andamento."""
+
+
+class _ScrapeProfileSession:
+    def __init__(self, scrapes: int):
+        self.scrapes = scrapes
+        self.claimed = 0
+        self.finished = 0
+        self.stats: Optional[pstats.Stats] = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def claim(self) -> bool:
+        with self.lock:
+            if self.claimed >= self.scrapes:
+                return False
+            self.claimed += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.claimed -= 1
+
+    def add(self, profile: cProfile.Profile):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.finished += 1
+            if self.finished >= self.scrapes:
+                self.done.set()
+
+
+class ScrapeProfiler:
+    """
+    Profiling sob demanda do processo Flask, para investigar lentidões intermitentes.
+
+    - `profile_scrapes`: cProfile das próximas N raspagens (em qualquer thread), com as estatísticas somadas;
+    - `sample`: profiler por amostragem de todas as threads durante uma janela de tempo, em formato
+      "collapsed stacks" (entrada do flamegraph.pl / speedscope);
+    - `tracemalloc_diff`: diferença de alocações desde o snapshot anterior.
+
+    Sem sessão ativa, `scrape()` custa só uma leitura de atributo por raspagem.
+    """
+
+    def __init__(self):
+        self._session: Optional[_ScrapeProfileSession] = None
+        self._busy = threading.Lock()
+        self._tracemalloc_baseline: Optional[tracemalloc.Snapshot] = None
+        self._tracemalloc_lock = threading.Lock()
+
+    @contextmanager
+    def scrape(self):
+        """Envolve uma raspagem: se houver sessão ativa com vagas, executa-a sob cProfile."""
+        session = self._session
+        if session is None or not session.claim():
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # A partir do Python 3.12 só um cProfile pode estar ativo por vez no processo:
+            # raspagens simultâneas à que está sendo perfilada ficam de fora
+            session.release()
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            session.add(profile)
+
+    def profile_scrapes(self, scrapes: int, timeout: float, sort: str = "cumulative", limit: int = 50) -> str:
+        """Perfila as próximas `scrapes` raspagens (ou as que terminarem em `timeout` segundos) e retorna o relatório."""
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusyException()
+        session = _ScrapeProfileSession(scrapes)
+        try:
+            logger.info("Profiling das próximas %s raspagens (timeout de %.0fs).", scrapes, timeout)
+            self._session = session
+            session.done.wait(timeout)
+        finally:
+            self._session = None
+            self._busy.release()
+
+        with session.lock:
+            if session.stats is None:
+                return f"Nenhuma raspagem terminou em {timeout:.0f}s.\n"
+            out = io.StringIO()
+            out.write(f"Raspagens perfiladas: {session.finished}/{scrapes}\n\n")
+            session.stats.stream = out
+            session.stats.sort_stats(sort).print_stats(limit)
+            return out.getvalue()
+
+    def sample(self, seconds: float, interval: float = SAMPLING_INTERVAL_SECONDS) -> str:
+        """Amostra as pilhas de todas as threads por `seconds` segundos e retorna as pilhas agregadas."""
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusyException()
+        stacks = Counter()
+        samples = 0
+        own_thread = threading.get_ident()
+        try:
+            logger.info("Profiling por amostragem durante %.0fs.", seconds)
+            until = time.monotonic() + seconds
+            while time.monotonic() < until:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        stacks[self._collapse(frame)] += 1
+                samples += 1
+                time.sleep(interval)
+        finally:
+            self._busy.release()
+
+        lines = [f"# {samples} amostras em {seconds:.1f}s (intervalo de {interval * 1000:.0f}ms)"]
+        lines.extend(f"{stack} {count}" for stack, count in stacks.most_common())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def tracemalloc_diff(self, limit: int = 25, key_type: str = "lineno") -> str:
+        """
+        Na primeira chamada inicia o tracemalloc e guarda o snapshot base. Nas seguintes, retorna as
+        `limit` maiores diferenças de memória desde o snapshot anterior, que passa a ser o novo base.
+        """
+        with self._tracemalloc_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(int(os.getenv("DEBUG_TRACEMALLOC_FRAMES", "10")))
+                self._tracemalloc_baseline = tracemalloc.take_snapshot()
+                logger.info("tracemalloc iniciado.")
+                return "tracemalloc iniciado; chame de novo para ver a diferença de alocações.\n"
+
+            snapshot = tracemalloc.take_snapshot()
+            ignored = (tracemalloc.Filter(False, tracemalloc.__file__),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+            snapshot = snapshot.filter_traces(ignored)
+            differences = snapshot.compare_to(self._tracemalloc_baseline.filter_traces(ignored), key_type)
+            self._tracemalloc_baseline = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# memória rastreada: atual {current / 1024:.1f} KiB, pico {peak / 1024:.1f} KiB"]
+        lines.extend(str(stat) for stat in differences[:limit])
+        return "\n".join(lines) + "\n"
+
+    def stop_tracemalloc(self):
+        with self._tracemalloc_lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc encerrado.")
+            self._tracemalloc_baseline = None
+
+
+scrape_profiler = ScrapeProfiler()
@@ -0,0 +1,51 @@
+import ipaddress
+import os
+import socket
+from urllib.parse import urlsplit
+
+from modules.models.exception.validations_exceptions import InvalidCallbackUrlException
+
+# Hosts aceitos em callback_url, separados por vírgula (ex: "hooks.escritorio.com.br,api.parceiro.com").
+# Vazio: qualquer host público. Em qualquer caso, endereços privados, loopback, link-local e reservados são recusados.
+JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+JOB_CALLBACK_ALLOWED_SCHEMES = ("http", "https")
+
+
+def validate_callback_url(url: str, allowed_hosts: set = JOB_CALLBACK_ALLOWED_HOSTS) -> str:
+    """
+    Confere se `url` pode receber o callback de um job sem expor a rede interna do servidor (SSRF):
+    esquema http(s), host na lista de permitidos (se configurada) e todos os endereços para os quais
+    o host resolve públicos. Lança InvalidCallbackUrlException; retorna a própria URL se for válida.
+
+    A resolução é refeita antes de cada envio, então um host que passe a apontar para um endereço
+    interno depois da criação do job também é recusado.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise InvalidCallbackUrlException(url, "URL malformada")
+
+    if parts.scheme not in JOB_CALLBACK_ALLOWED_SCHEMES:
+        raise InvalidCallbackUrlException(url, "o esquema deve ser http ou https")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise InvalidCallbackUrlException(url, "host ausente")
+    if parts.username or parts.password:
+        raise InvalidCallbackUrlException(url, "credenciais na URL não são aceitas")
+    if allowed_hosts and host not in allowed_hosts:
+        raise InvalidCallbackUrlException(url, "host fora da lista de permitidos")
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        raise InvalidCallbackUrlException(url, "host não resolvido")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise InvalidCallbackUrlException(url, "o host aponta para um endereço interno")
+    return url
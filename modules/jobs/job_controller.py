@@ -0,0 +1,26 @@
+import logging
+
+from flask import Blueprint, jsonify
+
+from modules.jobs.job_manager import job_manager
+from modules.models.exception.response_error import ResponseError
+
+logger = logging.getLogger(__name__)
+
+# O prefixo base será /api/v1/jobs
+jobs_bp = Blueprint('jobs_api', __name__, url_prefix='/api/v1/jobs')
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Endpoint para consultar o estado de um job assíncrono (queued, running, succeeded ou failed).
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        response_error = ResponseError(
+            message=f"Job '{job_id}' não encontrado ou expirado.",
+            code="JOB_NOT_FOUND"
+        )
+        return jsonify(response_error.model_dump()), 404
+    return jsonify(job), 200
@@ -0,0 +1,123 @@
+import contextvars
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import requests
+
+from modules.core.storage.job_store import JobStore, STATUS_FAILED, STATUS_SUCCEEDED
+from modules.jobs.callback_url import validate_callback_url
+from modules.models.exception.exceptions import BaseScrapingException
+from modules.models.exception.validations_exceptions import InvalidCallbackUrlException
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs aceitos por este worker e ainda não concluídos (na fila ou rodando); acima disso submit é recusado
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", str(JOB_WORKERS * 10)))
+# Por quanto tempo um job finalizado continua consultável
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_CALLBACK_TIMEOUT_SECONDS = float(os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", "10"))
+# Sugestão de espera (header Retry-After) quando a fila de jobs está cheia
+JOB_RETRY_AFTER_SECONDS = 30
+
+
+class JobQueueFullException(Exception):
+    """A fila de jobs deste worker atingiu JOB_MAX_PENDING."""
+
+
+class JobManager:
+    """
+    Executa consultas demoradas fora da thread da requisição Flask.
+
+    `submit` devolve um id na hora; o trabalho roda num pool de JOB_WORKERS threads e o estado
+    (queued → running → succeeded/failed, com resultado ou erro) fica no JobStore (SQLite), consultável
+    por `get` em qualquer worker do servidor até JOB_TTL_SECONDS depois de finalizado. No máximo
+    JOB_MAX_PENDING jobs aguardam ou rodam por worker; além disso `submit` lança JobQueueFullException.
+    Se houver `callback_url`, o estado final é enviado por POST para ela (ver validate_callback_url).
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl_seconds: float = JOB_TTL_SECONDS,
+                 max_pending: int = JOB_MAX_PENDING, store: Optional[JobStore] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def submit(self, func: Callable[[], dict], description: str = "", callback_url: Optional[str] = None) -> str:
+        if callback_url:
+            validate_callback_url(callback_url)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullException()
+            self._pending += 1
+
+        try:
+            self.store.purge_expired(self.ttl_seconds)
+            job_id = uuid.uuid4().hex
+            self.store.create(job_id, description)
+            # Os logs do job carregam o contexto (request_id) da requisição que o criou
+            self._executor.submit(contextvars.copy_context().run, self._run, job_id, func, callback_url)
+        except Exception:
+            self._release()
+            raise
+        logger.info("Job %s enfileirado: %s", job_id, description)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        self.store.purge_expired(self.ttl_seconds)
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str, func: Callable[[], dict], callback_url: Optional[str]):
+        try:
+            self.store.mark_running(job_id)
+            try:
+                result = func()
+                self.store.finish(job_id, STATUS_SUCCEEDED, result=result)
+                logger.info("Job %s concluído.", job_id)
+            except BaseScrapingException as e:
+                logger.error("Job %s falhou (Code: %s, Message: %s)", job_id, e.code, e.message, exc_info=True)
+                self.store.finish(job_id, STATUS_FAILED,
+                                  error={"message": e.message, "code": e.code, "details": e.details})
+            except Exception as e:
+                logger.critical("Erro inesperado no job %s: %s", job_id, e, exc_info=True)
+                self.store.finish(job_id, STATUS_FAILED,
+                                  error={"message": "Um erro interno inesperado ocorreu.",
+                                         "code": "INTERNAL_SERVER_ERROR", "details": None})
+        finally:
+            self._release()
+
+        if callback_url:
+            self._send_callback(job_id, callback_url)
+
+    def _send_callback(self, job_id: str, callback_url: str):
+        try:
+            # Resolvido de novo no envio: o host pode ter passado a apontar para um endereço interno
+            validate_callback_url(callback_url)
+            # Sem seguir redirecionamentos, que poderiam levar a um endereço interno
+            response = requests.post(callback_url, json=self.store.get(job_id), timeout=JOB_CALLBACK_TIMEOUT_SECONDS,
+                                     allow_redirects=False)
+            response.raise_for_status()
+            logger.info("Callback do job %s enviado para %s.", job_id, callback_url)
+        except InvalidCallbackUrlException as e:
+            logger.warning("Callback do job %s não enviado: %s", job_id, e.message)
+        except requests.RequestException as e:
+            logger.warning("Falha ao enviar o callback do job %s para %s: %s", job_id, callback_url, e)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+
+job_manager = JobManager()
@@ -1,13 +1,18 @@
 import logging
 import os
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, url_for
 from flask_pydantic import validate
 
 
+from modules.core.deadline import Deadline, deadline_from_request
+from modules.core.idempotency import idempotent
 from modules.core.process_consultant import ProcessConsultant
+from modules.jobs.job_manager import JOB_RETRY_AFTER_SECONDS, JobQueueFullException, job_manager
+from modules.message.whatsapp.outbound_queue import OutboundWhatsappQueue
 from modules.message.whatsapp.templates.message_formatter import format_passive_generic_message
 from modules.message.whatsapp.whatsapp_service import WhatsappService
+from modules.models.exception.response_error import ResponseError
 from modules.models.process_dtos import WppRequest
 
 logger = logging.getLogger(__name__)
@@ -18,83 +23,85 @@ message_bp = Blueprint('message_api', __name__, url_prefix='/api/v1/whatsapp')
 
 process_consultant = ProcessConsultant()
 whatsapp_service = WhatsappService()
+outbound_queue = OutboundWhatsappQueue(whatsapp_service)
 
 @message_bp.route('/', strict_slashes=False, methods=['POST'])
+@idempotent
 @validate()
 def consulta_passiva_handle(body:WppRequest):
     """
     Endpoint para realizar o scraping de um processo no PJE-RJ.
     Recebe apenas o número do processo no corpo da requisição.
     """
-    # 1. Realizar o scraping
-    logger.info("Iniciar busca pelo processo")
-    processo = process_consultant.get_process_details(body.num_processo,body.system_identifier)
-    logger.info("Processo encontrado, iniciar a formatação da mensagem")
-
-    # 2. Formatar a mensagem usando o MessageFormatter
-    mensagem_formatada = format_passive_generic_message(processo)
-    logger.info("Mensagem formatada!")
-
-    # # 3. Enviar a mensagem formatada via WhatsappService
-    logger.info(f"Enviando mensagem para o WhatsApp do destinatário: {body.adv_wpp}")
-    whatsapp_service.send_whatsapp_message(
-        recipient_wpp=body.adv_wpp,
-        message_body=mensagem_formatada
-    )
-    logger.info("Mensagem enviada com sucesso para o WhatsApp.")
-
-    twilio_response_data = whatsapp_service.send_whatsapp_message(
-        recipient_wpp=body.adv_wpp,
-        message_body=mensagem_formatada
-    )
-    logger.info("Mensagem enviada com sucesso para o WhatsApp.")
-
-    return jsonify({
-        "status": "success",
-        "message": "Processo raspado e mensagem enviada com sucesso para o WhatsApp.",
-        "process_number": body.num_processo,
-        "recipient": body.adv_wpp,
-        "whatsapp_preview_message": mensagem_formatada,
-        "twilio_message_sid": twilio_response_data.get("message_sid"),
-        "twilio_message_status": twilio_response_data.get("message_status")
-    }), 200
+    return _dispatch(body)
 
 @message_bp.route('/active', strict_slashes=False, methods=['POST'])
+@idempotent
 @validate()
 def consulta_ativa_handle(body:WppRequest):
     """
     Endpoint para realizar o scraping de um processo no PJE-RJ.
     Recebe apenas o número do processo no corpo da requisição.
     """
+    return _dispatch(body)
+
+
+def _dispatch(body: WppRequest):
+    """
+    Modo síncrono: consulta e envia dentro da requisição.
+    Modo job (async_job ou callback_url): responde 202 com o id do job na hora; a consulta e o envio
+    rodam no JobManager e o prazo (X-Request-Timeout) passa a contar quando o job começa. Com a fila
+    de jobs cheia responde 503 com Retry-After; uma callback_url interna ou fora da lista de hosts responde 400.
+    """
+    timeout_header = request.headers.get("X-Request-Timeout")
+
+    if body.async_job or body.callback_url:
+        try:
+            job_id = job_manager.submit(
+                lambda: _consult_and_send(body, deadline_from_request(timeout_header)),
+                description=f"Consulta do processo {body.num_processo} para {body.adv_wpp}",
+                callback_url=body.callback_url
+            )
+        except JobQueueFullException:
+            response_error = ResponseError(message="A fila de jobs está cheia. Tente novamente mais tarde.",
+                                           code="JOB_QUEUE_FULL")
+            return jsonify(response_error.model_dump()), 503, {"Retry-After": str(JOB_RETRY_AFTER_SECONDS)}
+        status_url = url_for('jobs_api.get_job', job_id=job_id)
+        return jsonify({
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": status_url
+        }), 202, {"Location": status_url}
+
+    return jsonify(_consult_and_send(body, deadline_from_request(timeout_header))), 200
+
+
+def _consult_and_send(body: WppRequest, deadline: Deadline) -> dict:
     # 1. Realizar o scraping
     logger.info("Iniciar busca pelo processo")
-    processo = process_consultant.get_process_details(body.num_processo,body.system_identifier)
+    processo = process_consultant.get_process_details(body.num_processo,body.system_identifier,
+                                                      use_fallback=body.use_cached_fallback,
+                                                      deadline=deadline)
     logger.info("Processo encontrado, iniciar a formatação da mensagem")
 
     # 2. Formatar a mensagem usando o MessageFormatter
     mensagem_formatada = format_passive_generic_message(processo)
     logger.info("Mensagem formatada!")
 
-    # # 3. Enviar a mensagem formatada via WhatsappService
-    logger.info(f"Enviando mensagem para o WhatsApp do destinatário: {body.adv_wpp}")
-    whatsapp_service.send_whatsapp_message(
-        recipient_wpp=body.adv_wpp,
-        message_body=mensagem_formatada
-    )
-    logger.info("Mensagem enviada com sucesso para o WhatsApp.")
-
-    twilio_response_data = whatsapp_service.send_whatsapp_message(
+    # 3. Enfileirar a mensagem formatada: o envio pela Twilio é feito pelo dispatcher da fila de saída
+    logger.info("Enfileirando mensagem para o WhatsApp do destinatário: %s", body.adv_wpp)
+    outbound = outbound_queue.enqueue(
         recipient_wpp=body.adv_wpp,
         message_body=mensagem_formatada
     )
-    logger.info("Mensagem enviada com sucesso para o WhatsApp.")
 
-    return jsonify({
+    return {
         "status": "success",
-        "message": "Processo raspado e mensagem enviada com sucesso para o WhatsApp.",
+        "message": "Processo raspado e mensagem enfileirada para envio pelo WhatsApp.",
         "process_number": body.num_processo,
         "recipient": body.adv_wpp,
         "whatsapp_preview_message": mensagem_formatada,
-        "twilio_message_sid": twilio_response_data.get("message_sid"),
-        "twilio_message_status": twilio_response_data.get("message_status")
-    }), 200
+        "outbound_message_id": outbound["id"],
+        "outbound_message_status": outbound["status"],
+        "duplicate": outbound["duplicate"]
+    }
@@ -0,0 +1,201 @@
+import logging
+import os
+import socket
+import time
+import uuid
+import unicodedata
+from datetime import datetime
+from typing import List, Optional
+
+from modules.core.storage.sqlite_store import MONITOR_DB_PATH, SQLiteStore
+from modules.message.whatsapp.templates.message_formatter import (
+    format_digest_messages,
+    format_urgent_movement_message,
+)
+from modules.models.process_dtos import AnaliseUltimoMovimentoDTO
+
+logger = logging.getLogger(__name__)
+
+# Janela de agrupamento: o resumo de um destinatário sai quando o movimento mais antigo pendente tem essa idade
+DIGEST_WINDOW_SECONDS = float(os.getenv("DIGEST_WINDOW_SECONDS", "3600"))
+# De quanto em quanto tempo o agendador procura resumos prontos para envio
+DIGEST_FLUSH_SECONDS = float(os.getenv("DIGEST_FLUSH_SECONDS", "300"))
+# Por quanto tempo os itens de um resumo ficam reservados para quem os pegou; se o envio não for
+# confirmado nesse prazo (o processo caiu no meio), voltam a ser pendentes
+DIGEST_CLAIM_SECONDS = float(os.getenv("DIGEST_CLAIM_SECONDS", "300"))
+# Movimentos cujo nome contém algum destes termos são enviados na hora (sem acento, separados por vírgula)
+DIGEST_URGENT_KEYWORDS = os.getenv(
+    "DIGEST_URGENT_KEYWORDS",
+    "liminar,tutela de urgencia,tutela antecipada,sentenca,citacao,intimacao,audiencia,penhora,bloqueio"
+)
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class DigestStore(SQLiteStore):
+    """
+    Movimentos novos aguardando o próximo resumo de cada destinatário. Quem envia um resumo reserva
+    os itens (`claim`), enfileira as mensagens e só então os remove (`confirm`); uma falha no meio
+    devolve os itens (`release`) ou deixa a reserva expirar, e o resumo sai no próximo flush.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS digest_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        numero_processo TEXT NOT NULL,
+        tribunal TEXT NOT NULL,
+        sistema TEXT NOT NULL,
+        partes TEXT NOT NULL,
+        nome TEXT NOT NULL,
+        data_hora REAL NOT NULL,
+        created_at REAL NOT NULL,
+        claimed_by TEXT,
+        claimed_until REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_digest_items_recipient ON digest_items (recipient, created_at);
+    """
+
+    CLAIM_COLUMNS = {
+        "claimed_by": "TEXT",
+        "claimed_until": "REAL",
+    }
+
+    def _migrate(self):
+        self._ensure_columns("digest_items", self.CLAIM_COLUMNS)
+
+    def add(self, items: List[tuple]):
+        """
+        Adiciona itens (recipient, numero_processo, tribunal, sistema, partes, nome, data_hora). Um item igual
+        a outro ainda pendente (mesmo destinatário, processo, nome e data) é ignorado: a consulta ativa
+        reentrega os movimentos cuja notificação falhou.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO digest_items (recipient, numero_processo, tribunal, sistema, partes, nome, data_hora, "
+                "created_at) SELECT ?, ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM digest_items "
+                "WHERE recipient = ? AND numero_processo = ? AND nome = ? AND data_hora = ?)",
+                [(*item, now, item[0], item[1], item[5], item[6]) for item in items]
+            )
+
+    def due_recipients(self, created_before: float) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT recipient FROM digest_items WHERE claimed_until IS NULL OR claimed_until <= ? "
+            "GROUP BY recipient HAVING MIN(created_at) <= ?", (time.time(), created_before)
+        ).fetchall()
+        return [row["recipient"] for row in rows]
+
+    def claim(self, recipient: str, owner: str, lease_seconds: float) -> List[dict]:
+        """Reserva para `owner` e retorna os itens do destinatário sem reserva (ou com a reserva expirada)."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE digest_items SET claimed_by = ?, claimed_until = ? "
+                "WHERE recipient = ? AND (claimed_until IS NULL OR claimed_until <= ?)",
+                (owner, now + lease_seconds, recipient, now)
+            )
+            rows = conn.execute("SELECT * FROM digest_items WHERE recipient = ? AND claimed_by = ? ORDER BY id",
+                                (recipient, owner)).fetchall()
+        return [dict(row) for row in rows]
+
+    def confirm(self, recipient: str, owner: str) -> int:
+        """Remove os itens do destinatário reservados por `owner` (o resumo já foi enfileirado)."""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM digest_items WHERE recipient = ? AND claimed_by = ?",
+                                (recipient, owner)).rowcount
+
+    def release(self, recipient: str, owner: str):
+        """Devolve os itens reservados por `owner` para o próximo resumo."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE digest_items SET claimed_by = NULL, claimed_until = NULL "
+                         "WHERE recipient = ? AND claimed_by = ?", (recipient, owner))
+
+
+class NotificationDigestService:
+    """
+    Etapa de resumo depois da consulta ativa: em vez de uma mensagem por atualização de processo,
+    os movimentos novos são acumulados por destinatário e enviados num único resumo quando o mais
+    antigo completa `window_seconds`. Movimentos urgentes (ver DIGEST_URGENT_KEYWORDS) saem na hora.
+    O envio é sempre pela fila de saída (OutboundWhatsappQueue); os itens só saem do DigestStore
+    depois que todas as mensagens do resumo foram enfileiradas.
+
+    `consume` tem a assinatura dos consumidores de resultado do ActiveConsultantService.
+    """
+
+    def __init__(self, outbound_queue, store: Optional[DigestStore] = None,
+                 window_seconds: float = DIGEST_WINDOW_SECONDS,
+                 urgent_keywords: str = DIGEST_URGENT_KEYWORDS, claim_seconds: float = DIGEST_CLAIM_SECONDS):
+        self.outbound_queue = outbound_queue
+        self.claim_seconds = claim_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.store = store or DigestStore(MONITOR_DB_PATH)
+        self.window_seconds = window_seconds
+        self.urgent_keywords = [_normalize(k.strip()) for k in urgent_keywords.split(",") if k.strip()]
+
+    def is_urgent(self, nome_movimento: str) -> bool:
+        nome = _normalize(nome_movimento)
+        return any(keyword in nome for keyword in self.urgent_keywords)
+
+    def consume(self, adv_wpp: str, analise_dto: AnaliseUltimoMovimentoDTO):
+        """
+        Enfileira na hora os movimentos urgentes e guarda os demais para o resumo. Um urgente que não pôde
+        ser enfileirado vai para o resumo, e o que já foi separado para o resumo é gravado mesmo que algo
+        falhe no meio do lote (a exceção segue para quem chamou).
+        """
+        pending = []
+        try:
+            for movimento in analise_dto.novosMovimentos:
+                item = (adv_wpp, analise_dto.numeroProcesso, analise_dto.tribunal, analise_dto.sistema,
+                        analise_dto.partesEnvolvidas, movimento.nome, movimento.dataHora.timestamp())
+                if not self.is_urgent(movimento.nome):
+                    pending.append(item)
+                    continue
+
+                logger.info("Movimento urgente '%s' no processo %s: enviando para %s sem esperar o resumo.",
+                            movimento.nome, analise_dto.numeroProcesso, adv_wpp)
+                try:
+                    self.outbound_queue.enqueue(
+                        recipient_wpp=adv_wpp,
+                        message_body=format_urgent_movement_message(
+                            analise_dto.numeroProcesso, analise_dto.tribunal, analise_dto.sistema,
+                            analise_dto.partesEnvolvidas, movimento.nome, movimento.dataHora
+                        )
+                    )
+                except Exception as e:
+                    logger.error("Falha ao enfileirar o movimento urgente '%s' do processo %s para %s; "
+                                 "ele vai no próximo resumo: %s", movimento.nome, analise_dto.numeroProcesso,
+                                 adv_wpp, e, exc_info=True)
+                    pending.append(item)
+        finally:
+            if pending:
+                self.store.add(pending)
+
+    def flush(self, force: bool = False) -> int:
+        """Envia os resumos cuja janela já fechou (todos, com `force`). Retorna quantas mensagens foram enfileiradas."""
+        created_before = float("inf") if force else time.time() - self.window_seconds
+        sent = 0
+        for recipient in self.store.due_recipients(created_before):
+            items = self.store.claim(recipient, self.owner, self.claim_seconds)
+            if not items:
+                continue
+            try:
+                for item in items:
+                    item["data_hora"] = datetime.fromtimestamp(item["data_hora"])
+                messages = format_digest_messages(items)
+                for message in messages:
+                    self.outbound_queue.enqueue(recipient_wpp=recipient, message_body=message)
+            except Exception as e:
+                # Reenviar as mensagens já enfileiradas no próximo flush é seguro: a fila descarta duplicadas
+                logger.error("Falha ao enfileirar o resumo de %s; os itens voltam para o próximo envio: %s",
+                             recipient, e, exc_info=True)
+                self.store.release(recipient, self.owner)
+                continue
+            self.store.confirm(recipient, self.owner)
+            sent += len(messages)
+            logger.info("Resumo de %s movimento(s) enviado para %s em %s mensagem(ns).",
+                        len(items), recipient, len(messages))
+        return sent
@@ -0,0 +1,352 @@
+import hashlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from twilio.base.exceptions import TwilioRestException
+
+from modules.core.storage.sqlite_store import MONITOR_DB_PATH, SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_QUEUE_DB_PATH = os.getenv("OUTBOUND_QUEUE_DB_PATH", MONITOR_DB_PATH)
+# Limite por remetente (token bucket): taxa sustentada e rajada máxima. O estado do bucket fica no banco,
+# então o limite vale para todos os dispatchers (workers e processos) que usam a mesma fila.
+WHATSAPP_SEND_RATE_PER_SECOND = float(os.getenv("WHATSAPP_SEND_RATE_PER_SECOND", "1"))
+WHATSAPP_SEND_BURST = int(os.getenv("WHATSAPP_SEND_BURST", "5"))
+# Mensagens iguais para o mesmo destinatário dentro da janela são descartadas
+WHATSAPP_DEDUP_WINDOW_SECONDS = float(os.getenv("WHATSAPP_DEDUP_WINDOW_SECONDS", "600"))
+WHATSAPP_SEND_MAX_ATTEMPTS = int(os.getenv("WHATSAPP_SEND_MAX_ATTEMPTS", "6"))
+# Lease de uma mensagem reivindicada por um dispatcher; deve ser bem maior que o tempo de uma chamada à Twilio
+WHATSAPP_SEND_LEASE_SECONDS = float(os.getenv("WHATSAPP_SEND_LEASE_SECONDS", "120"))
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Erro gravado na mensagem cujo dispatcher parou no meio do envio (lease expirado) vezes demais
+LEASE_EXPIRED_ERROR = "O dispatcher parou durante o envio (lease expirado)."
+
+
+class OutboundMessageStore(SQLiteStore):
+    """
+    Fila persistente de mensagens de WhatsApp a enviar (sobrevive a reinícios do processo).
+
+    Vários dispatchers (workers do servidor, a consulta ativa) podem consumir a mesma fila: cada um
+    reivindica mensagens com um lease (`claimed_by`, `claimed_until`) e só envia enquanto o lease for
+    seu. Mensagens de um dispatcher que morreu voltam a ser reivindicáveis quando o lease expira.
+    O token bucket de cada remetente fica em `outbound_rate_limits`, compartilhado por todos.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS outbound_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sender TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        body TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        created_at REAL NOT NULL,
+        sent_at REAL,
+        message_sid TEXT,
+        last_error TEXT,
+        claimed_by TEXT,
+        claimed_until REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbound_ready ON outbound_messages (status, next_attempt_at, id);
+    CREATE INDEX IF NOT EXISTS idx_outbound_dedup ON outbound_messages (recipient, content_hash, created_at);
+
+    CREATE TABLE IF NOT EXISTS outbound_rate_limits (
+        sender TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    LEASE_COLUMNS = {
+        "claimed_by": "TEXT",
+        "claimed_until": "REAL",
+    }
+
+    def _migrate(self):
+        self._ensure_columns("outbound_messages", self.LEASE_COLUMNS)
+
+    def enqueue(self, sender: str, recipient: str, body: str, dedup_window: float) -> Dict:
+        """
+        Enfileira a mensagem, a menos que uma igual para o mesmo destinatário tenha sido enfileirada
+        nos últimos `dedup_window` segundos e não tenha falhado. Retorna {id, status, duplicate}.
+        """
+        content_hash = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._transaction() as conn:
+            existing = conn.execute(
+                "SELECT id, status FROM outbound_messages WHERE recipient = ? AND content_hash = ? "
+                "AND created_at >= ? AND status != ? ORDER BY id DESC LIMIT 1",
+                (recipient, content_hash, now - dedup_window, STATUS_FAILED)
+            ).fetchone()
+            if existing:
+                return {"id": existing["id"], "status": existing["status"], "duplicate": True}
+
+            cursor = conn.execute(
+                "INSERT INTO outbound_messages (sender, recipient, body, content_hash, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sender, recipient, body, content_hash, STATUS_PENDING, now, now)
+            )
+            return {"id": cursor.lastrowid, "status": STATUS_PENDING, "duplicate": False}
+
+    def claim_ready(self, owner: str, limit: int, lease_seconds: float, max_attempts: int) -> list:
+        """
+        Reivindica para `owner` até `limit` mensagens, na ordem de chegada: as prontas para envio e as
+        'sending' cujo lease expirou (o dispatcher que as tinha parou ou travou no meio). Retorna as mensagens.
+
+        Um lease expirado conta como tentativa: a mensagem que derruba ou trava o dispatcher a cada envio
+        é marcada como falha ao chegar a `max_attempts`, em vez de ser reivindicada para sempre.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT * FROM outbound_messages WHERE (status = ? AND next_attempt_at <= ?) "
+                "OR (status = ? AND (claimed_until IS NULL OR claimed_until < ?)) ORDER BY id LIMIT ?",
+                (STATUS_PENDING, now, STATUS_SENDING, now, limit)
+            ).fetchall()
+            claimed, abandoned = [], []
+            for row in rows:
+                message = dict(row)
+                if message["status"] == STATUS_SENDING:
+                    message["attempts"] += 1
+                    if message["attempts"] >= max_attempts:
+                        abandoned.append(message)
+                        continue
+                claimed.append(message)
+            conn.executemany(
+                "UPDATE outbound_messages SET status = ?, last_error = ?, attempts = ?, claimed_by = NULL, "
+                "claimed_until = NULL WHERE id = ?",
+                [(STATUS_FAILED, LEASE_EXPIRED_ERROR, m["attempts"], m["id"]) for m in abandoned]
+            )
+            conn.executemany(
+                "UPDATE outbound_messages SET status = ?, attempts = ?, claimed_by = ?, claimed_until = ? WHERE id = ?",
+                [(STATUS_SENDING, m["attempts"], owner, now + lease_seconds, m["id"]) for m in claimed]
+            )
+        for message in abandoned:
+            logger.error("Mensagem #%s para %s descartada após %s tentativa(s): %s",
+                         message["id"], message["recipient"], message["attempts"], LEASE_EXPIRED_ERROR)
+        return claimed
+
+    def renew_claim(self, owner: str, message_id: int, lease_seconds: float) -> bool:
+        """Estende o lease de `owner` sobre a mensagem. False se ele expirou ou outro dispatcher a reivindicou."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE outbound_messages SET claimed_until = ? "
+                "WHERE id = ? AND status = ? AND claimed_by = ? AND claimed_until >= ?",
+                (now + lease_seconds, message_id, STATUS_SENDING, owner, now)
+            )
+        return cursor.rowcount == 1
+
+    def release_claims(self, owner: str) -> int:
+        """Devolve à fila as mensagens reivindicadas por `owner` e não enviadas (o dispatcher está parando)."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE outbound_messages SET status = ?, claimed_by = NULL, claimed_until = NULL "
+                "WHERE status = ? AND claimed_by = ?",
+                (STATUS_PENDING, STATUS_SENDING, owner)
+            )
+        return cursor.rowcount
+
+    def take_send_token(self, sender: str, rate: float, capacity: int) -> float:
+        """
+        Token bucket compartilhado do remetente: consome um token se houver e retorna 0; senão, retorna
+        quantos segundos faltam para o próximo. `rate` envios por segundo, com rajadas de até `capacity`.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated_at FROM outbound_rate_limits WHERE sender = ?",
+                               (sender,)).fetchone()
+            tokens = float(capacity) if row is None else min(
+                capacity, row["tokens"] + max(now - row["updated_at"], 0.0) * rate
+            )
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("INSERT OR REPLACE INTO outbound_rate_limits (sender, tokens, updated_at) VALUES (?, ?, ?)",
+                         (sender, tokens, now))
+        return wait
+
+    def next_attempt_at(self) -> Optional[float]:
+        """Próximo momento em que haverá mensagem a reivindicar: retentativa agendada ou lease que expira."""
+        row = self._connection().execute(
+            "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE COALESCE(claimed_until, 0) END) "
+            "FROM outbound_messages WHERE status IN (?, ?)", (STATUS_PENDING, STATUS_PENDING, STATUS_SENDING)
+        ).fetchone()
+        return row[0]
+
+    def mark_sent(self, message_id: int, message_sid: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE outbound_messages SET status = ?, sent_at = ?, message_sid = ?, attempts = attempts + 1, "
+                "claimed_by = NULL, claimed_until = NULL WHERE id = ?",
+                (STATUS_SENT, time.time(), message_sid, message_id)
+            )
+
+    def mark_retry(self, owner: str, message_id: int, next_attempt_at: float, error: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE outbound_messages SET status = ?, next_attempt_at = ?, last_error = ?, attempts = attempts + 1, "
+                "claimed_by = NULL, claimed_until = NULL WHERE id = ? AND claimed_by = ?",
+                (STATUS_PENDING, next_attempt_at, error, message_id, owner)
+            )
+
+    def mark_failed(self, owner: str, message_id: int, error: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE outbound_messages SET status = ?, last_error = ?, attempts = attempts + 1, "
+                "claimed_by = NULL, claimed_until = NULL WHERE id = ? AND claimed_by = ?",
+                (STATUS_FAILED, error, message_id, owner)
+            )
+
+    def get(self, message_id: int) -> Optional[dict]:
+        row = self._connection().execute("SELECT * FROM outbound_messages WHERE id = ?", (message_id,)).fetchone()
+        return dict(row) if row else None
+
+
+class OutboundWhatsappQueue:
+    """
+    Fila de saída do WhatsApp: os controllers e a consulta ativa só enfileiram (`enqueue`) e um
+    dispatcher em segundo plano envia pelo WhatsappService, em lotes, respeitando o limite por
+    remetente (token bucket). Erros 429/5xx da Twilio e falhas de rede são repetidos com backoff
+    exponencial com jitter, até WHATSAPP_SEND_MAX_ATTEMPTS; os demais erros falham na hora.
+    A mesma mensagem para o mesmo destinatário dentro de WHATSAPP_DEDUP_WINDOW_SECONDS é descartada.
+
+    Cada instância é um dispatcher com id próprio (`owner`); várias instâncias, em threads ou processos,
+    podem consumir a mesma fila: as mensagens são reivindicadas com lease de WHATSAPP_SEND_LEASE_SECONDS
+    (renovado imediatamente antes de cada envio) e o token bucket é o do banco, comum a todas.
+    """
+
+    def __init__(self, whatsapp_service, store: Optional[OutboundMessageStore] = None,
+                 rate_per_second: float = WHATSAPP_SEND_RATE_PER_SECOND,
+                 burst: int = WHATSAPP_SEND_BURST,
+                 dedup_window: float = WHATSAPP_DEDUP_WINDOW_SECONDS,
+                 max_attempts: int = WHATSAPP_SEND_MAX_ATTEMPTS,
+                 lease_seconds: float = WHATSAPP_SEND_LEASE_SECONDS,
+                 batch_size: int = 20,
+                 base_delay: float = 2.0,
+                 max_delay: float = 300.0):
+        self.whatsapp_service = whatsapp_service
+        self.store = store or OutboundMessageStore(OUTBOUND_QUEUE_DB_PATH)
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.dedup_window = dedup_window
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Identifica os leases deste dispatcher (único mesmo entre instâncias do mesmo processo)
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, recipient_wpp: str, message_body: str) -> Dict:
+        result = self.store.enqueue(self.whatsapp_service.twilio_phone_number, recipient_wpp, message_body,
+                                    self.dedup_window)
+        if result["duplicate"]:
+            logger.info("Mensagem duplicada para %s descartada (já enfileirada como #%s).",
+                        recipient_wpp, result["id"])
+        else:
+            logger.info("Mensagem #%s enfileirada para %s.", result["id"], recipient_wpp)
+            self.start()
+            self._wakeup.set()
+        return result
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="whatsapp-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self.store.claim_ready(self.owner, self.batch_size, self.lease_seconds,
+                                                 self.max_attempts)
+                for message in batch:
+                    if self._stop.is_set():
+                        break
+                    self._dispatch(message)
+
+                timeout = 0 if batch else self._idle_timeout()
+            except Exception as e:
+                logger.error("Erro no dispatcher da fila de saída do WhatsApp: %s", e, exc_info=True)
+                timeout = self.base_delay
+
+            if timeout != 0:
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+
+        # Só as mensagens reivindicadas por este dispatcher e não enviadas voltam à fila
+        released = self.store.release_claims(self.owner)
+        if released:
+            logger.info("%s mensagem(ns) não enviada(s) devolvida(s) à fila de saída.", released)
+
+    def _idle_timeout(self) -> Optional[float]:
+        """Quanto esperar pela próxima mensagem agendada (None: até um novo enqueue)."""
+        next_attempt_at = self.store.next_attempt_at()
+        return None if next_attempt_at is None else max(next_attempt_at - time.time(), 0.05)
+
+    def _dispatch(self, message: dict):
+        wait = self.store.take_send_token(message["sender"], self.rate_per_second, self.burst)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.store.take_send_token(message["sender"], self.rate_per_second, self.burst)
+
+        # A espera pelo token pode ter passado do lease: sem ele, outro dispatcher pode já ter a mensagem
+        if not self.store.renew_claim(self.owner, message["id"], self.lease_seconds):
+            logger.warning("Lease da mensagem #%s perdido antes do envio; ela fica com outro dispatcher.",
+                           message["id"])
+            return
+
+        try:
+            response = self.whatsapp_service.send_whatsapp_message(
+                recipient_wpp=message["recipient"],
+                message_body=message["body"]
+            )
+            self.store.mark_sent(message["id"], response.get("message_sid"))
+        except Exception as e:
+            attempt = message["attempts"] + 1
+            if self._is_transient(e) and attempt < self.max_attempts:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                logger.warning("Falha temporária ao enviar a mensagem #%s (tentativa %s/%s). "
+                               "Nova tentativa em %.1fs: %s", message["id"], attempt, self.max_attempts, delay, e)
+                self.store.mark_retry(self.owner, message["id"], time.time() + delay, str(e))
+            else:
+                logger.error("Mensagem #%s para %s descartada após %s tentativa(s): %s",
+                             message["id"], message["recipient"], attempt, e)
+                self.store.mark_failed(self.owner, message["id"], str(e))
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, TwilioRestException):
+            return error.status == 429 or error.status >= 500
+        # Falhas de rede e timeouts do cliente HTTP (requests.RequestException herda de OSError)
+        return isinstance(error, OSError)
@@ -33,8 +33,8 @@ def format_passive_generic_message(processo_dto: ProcessoScrapedDTO) -> str:
     # Pega o último movimento da lista.
     latest_movimento = processo_dto.movimentos[0]
 
-    logger.info(f"DEBUG: Tipo de latest_movimento.dataHora é: {type(latest_movimento.dataHora)}")
-    logger.info(f"DEBUG: Valor de latest_movimento.dataHora é: {latest_movimento.dataHora}")
+    logger.debug("Tipo de latest_movimento.dataHora é: %s", type(latest_movimento.dataHora))
+    logger.debug("Valor de latest_movimento.dataHora é: %s", latest_movimento.dataHora)
 
     # *** ESSA É A ÚNICA MUDANÇA NECESSÁRIA AQUI: ***
     # data_hora_movimento_obj JÁ É o objeto datetime!
@@ -66,3 +66,84 @@ def format_passive_generic_message(processo_dto: ProcessoScrapedDTO) -> str:
 
 
 
+
+
+# Limite de caracteres do corpo de uma mensagem de WhatsApp na Twilio
+WHATSAPP_MAX_MESSAGE_LENGTH = 1600
+
+
+def format_urgent_movement_message(numero_processo: str, tribunal: str, sistema: str, partes: str,
+                                   nome: str, data_hora: datetime) -> str:
+    """Mensagem enviada na hora para movimentos urgentes (fora do resumo)."""
+    return (
+        f"*🚨 Movimentação urgente em seu processo:*\n\n"
+        f"👥 *Partes:* {partes}\n"
+        f"📄 *Processo:* {numero_processo}\n"
+        f"🏛️ *Tribunal:* {tribunal}\n"
+        f"🖥️ *Sistema:* {sistema}\n\n"
+        f"🔍 *Tipo:* {nome}\n"
+        f"🕒 *Data e Hora:* {data_hora.strftime('%d/%m/%Y %H:%M:%S')}\n\n"
+        f"⚖️ Por favor, verifique os detalhes no sistema."
+    )
+
+
+def format_digest_messages(items: list, max_length: int = WHATSAPP_MAX_MESSAGE_LENGTH) -> list:
+    """
+    Monta o resumo das movimentações de um destinatário, dividido em mensagens de até `max_length` caracteres
+    (contando cabeçalho, numeração e separadores). Um processo que não cabe numa mensagem continua na seguinte,
+    com o título repetido e marcado "(continuação)"; linhas longas demais (ex: partes) são cortadas.
+
+    Args:
+        items (list): dicts com numero_processo, tribunal, sistema, partes, nome e data_hora (datetime).
+
+    Returns:
+        list: As mensagens do resumo, numeradas "(1/N)" quando houver mais de uma.
+    """
+    processos = {}
+    for item in sorted(items, key=lambda i: i["data_hora"], reverse=True):
+        processos.setdefault(item["numero_processo"], []).append(item)
+
+    header = f"*📬 Resumo de movimentações ({len(processos)} processo(s), {len(items)} movimento(s)):*\n\n"
+    blocks = []
+    for numero_processo, movimentos in processos.items():
+        first = movimentos[0]
+        title = f"📄 *{numero_processo}* ({first['tribunal']} - {first['sistema']})"
+        lines = [f"👥 {first['partes']}"]
+        lines += [f"• {m['data_hora'].strftime('%d/%m/%Y %H:%M')} - {m['nome']}" for m in movimentos]
+        blocks.append((title, lines))
+
+    # A numeração "(i/N) " tira espaço de todas as partes, e N só se sabe depois da divisão:
+    # divide de novo reservando o espaço até a quantidade de partes estabilizar
+    reserve = 0
+    while True:
+        messages = _split_digest(header, blocks, max_length - reserve)
+        numbering = len(f"({len(messages)}/{len(messages)}) ") if len(messages) > 1 else 0
+        if numbering <= reserve:
+            break
+        reserve = numbering
+
+    if len(messages) > 1:
+        messages = [f"({i}/{len(messages)}) {message}" for i, message in enumerate(messages, start=1)]
+    return messages
+
+
+def _split_digest(header: str, blocks: list, limit: int) -> list:
+    # Cada linha cabe em meia mensagem, então título de continuação + uma linha sempre cabem numa mensagem vazia
+    line_limit = max(limit // 2 - 1, 1)
+    messages, current = [], _truncate(header, limit)
+    for title, lines in blocks:
+        title = _truncate(title, line_limit)
+        continuation = _truncate(f"{title} (continuação)", line_limit) + "\n"
+        for index, line in enumerate([title] + lines):
+            piece = _truncate(line, line_limit) + "\n"
+            if len(current) + len(piece) > limit and current.strip():
+                messages.append(current)
+                current = continuation if index > 0 else ""
+            current += piece
+        current += "\n"
+    messages.append(current)
+    return [message.rstrip() for message in messages if message.strip()]
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
@@ -3,12 +3,18 @@ import os
 
 from twilio.rest import Client
 
+from modules.metrics.metrics import TWILIO_SEND_SECONDS
+
 
 logger = logging.getLogger(__name__)
 
 
+# Permite apontar o cliente para um dublê local da API da Twilio (ex: http://localhost:4010) em testes
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+
+
 class WhatsappService:
-    def __init__(self):
+    def __init__(self, client: Client = None):
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.twilio_phone_number = os.getenv("TWILIO_WHATSAPP_FROM")
@@ -17,24 +23,29 @@ class WhatsappService:
             logger.error("Credenciais Twilio (SID, Token, Phone) não configuradas nas variáveis de ambiente.")
             raise ValueError("Credenciais Twilio ausentes.")
 
-        self.client = Client(self.account_sid, self.auth_token)
+        self.client = client or Client(self.account_sid, self.auth_token)
+        if TWILIO_API_BASE_URL:
+            self.client.api.base_url = TWILIO_API_BASE_URL
+            logger.info("Cliente Twilio apontando para %s.", TWILIO_API_BASE_URL)
         logger.info("Cliente Twilio inicializado.")
 
     def send_whatsapp_message(self, recipient_wpp: str, message_body: str)-> dict:
         """
         Envia uma mensagem de WhatsApp para um destinatário usando a API da Twilio.
+        Chamada pelo dispatcher da OutboundWhatsappQueue; os controllers devem enfileirar em vez de chamar direto.
         """
         try:
 
             if not recipient_wpp.startswith("whatsapp:"):
                 recipient_wpp = "whatsapp:" + recipient_wpp
 
-            message = self.client.messages.create(
-                from_=self.twilio_phone_number,  # Seu número Twilio
-                to=recipient_wpp,  # Número do destinatário
-                body=message_body
-            )
-            logger.info(f"Mensagem enviada para {recipient_wpp}. SID: {message.sid}. Status: {message.status}")
+            with TWILIO_SEND_SECONDS.time():
+                message = self.client.messages.create(
+                    from_=self.twilio_phone_number,  # Seu número Twilio
+                    to=recipient_wpp,  # Número do destinatário
+                    body=message_body
+                )
+            logger.info("Mensagem enviada para %s. SID: %s. Status: %s", recipient_wpp, message.sid, message.status)
 
             return {
                 "message_sid": message.sid,
@@ -42,7 +53,7 @@ class WhatsappService:
             }
 
         except Exception as e:
-            logger.error(f"Falha ao enviar mensagem WhatsApp para {recipient_wpp}: {e}", exc_info=True)
+            logger.error("Falha ao enviar mensagem WhatsApp para %s: %s", recipient_wpp, e, exc_info=True)
             raise  # Re-lança a exceção para ser tratada pelo controller
 
 
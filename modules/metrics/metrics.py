@@ -0,0 +1,152 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Buckets (segundos) pensados para as etapas do scraping: de esperas curtas a subidas lentas do Chrome
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Métrica '{self.name}' espera os labels {self.labelnames}, recebeu {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for values, data in series:
+            lines.extend(self._render_series(values, data))
+        return "\n".join(lines)
+
+    def _render_series(self, values: Tuple[str, ...], data) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico por combinação de labels (formato Prometheus `counter`)."""
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, values, data) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(data)}"]
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo por combinação de labels (formato Prometheus `histogram`)."""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._series.get(key)
+            if data is None:
+                # [contagem por bucket (o último é +Inf), soma]
+                data = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            data[0][index] += 1
+            data[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Mede o bloco e registra com `outcome="success"`, ou `outcome="error"` se ele lançar exceção.
+        `labels` não deve incluir `outcome`; o histograma precisa declarar esse label.
+        """
+        started_at = time.monotonic()
+        outcome = "success"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.observe(time.monotonic() - started_at, outcome=outcome, **labels)
+
+    def _render_series(self, values, data) -> list:
+        counts, total = data
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            le_label = f'le="{le}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le_label)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expostas em GET /metrics, no formato de texto do Prometheus (0.0.4)."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Etapas do scraping: driver_start, navigation, captcha_solver, mapper e scrape (a tentativa inteira)
+SCRAPE_STAGE_SECONDS = registry.register(Histogram(
+    "scrape_stage_seconds", "Duração de cada etapa do scraping.", ("system", "stage", "outcome")))
+
+# Esperas nomeadas dos scrapers (campo_pesquisa, imagem_captcha, tabela_movimentos...); timeout = outcome error
+SCRAPE_WAIT_SECONDS = registry.register(Histogram(
+    "scrape_wait_seconds", "Duração das esperas nomeadas por elementos da página.", ("system", "wait", "outcome")))
+
+CAPTCHA_ATTEMPTS = registry.register(Counter(
+    "captcha_attempts_total", "Tentativas de resolução de CAPTCHA por resultado.", ("system", "outcome")))
+
+SCRAPING_EXCEPTIONS = registry.register(Counter(
+    "scraping_exceptions_total", "Exceções de scraping por código.", ("system", "code")))
+
+TWILIO_SEND_SECONDS = registry.register(Histogram(
+    "twilio_send_seconds", "Duração das chamadas de envio de WhatsApp à API da Twilio.", ("outcome",)))
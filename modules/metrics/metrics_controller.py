@@ -0,0 +1,18 @@
+import logging
+
+from flask import Blueprint, Response
+
+from modules.metrics.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+metrics_bp = Blueprint('metrics_api', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Endpoint de métricas no formato de texto do Prometheus: latência por etapa do scraping,
+    esperas nomeadas, tentativas de CAPTCHA, exceções por código e envios à Twilio.
+    """
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
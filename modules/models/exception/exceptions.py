@@ -33,3 +33,23 @@ class CaptchaResolutionFailedException(ScraperBusinessException):
         )
 
 
+class CircuitOpenException(ScraperTechnicalException):
+    """Exceção quando o circuit breaker do sistema está aberto e a consulta é recusada sem iniciar o navegador."""
+    def __init__(self, system_type: str, retry_after: float):
+        super().__init__(
+            message=(f"O sistema '{system_type}' está indisponível no momento (circuit breaker aberto). "
+                     f"Nova tentativa em {retry_after:.0f} segundos."),
+            code="CIRCUIT_OPEN"
+        )
+        self.details = {"system": system_type, "retry_after_seconds": round(retry_after, 1)}
+
+class DeadlineExceededException(ScraperTechnicalException):
+    """Exceção quando o prazo total da requisição se esgota antes de uma etapa do scraping."""
+    def __init__(self, stage: str, budget: float, original_exception: Exception = None):
+        super().__init__(
+            message=f"Prazo da requisição ({budget:.0f}s) esgotado na etapa '{stage}'.",
+            code="DEADLINE_EXCEEDED",
+            original_exception=original_exception
+        )
+        self.details = {"stage": stage, "budget_seconds": budget}
+
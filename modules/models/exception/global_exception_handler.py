@@ -7,7 +7,9 @@ from modules.models.exception.exceptions import ( # Ajuste o caminho conforme su
     BaseScrapingException,
     ScraperTechnicalException,
     ScraperBusinessException,
-    ProcessNotFoundException
+    ProcessNotFoundException,
+    CircuitOpenException,
+    DeadlineExceededException
 )
 
 # Importe o seu modelo de ResponseError (assumindo que está em modules.web_scraping.models)
@@ -31,7 +33,7 @@ def handle_input_validation_exception(e: InputValidationException):
     Handler para exceções de validação de entrada da API (InputValidationException e suas subclasses).
     Retorna uma resposta 400 Bad Request com detalhes dos erros de validação.
     """
-    logger.warning(f"Input Validation Error (Code: {e.code}, Message: {e.message})", exc_info=True)
+    logger.warning("Input Validation Error (Code: %s, Message: %s)", e.code, e.message, exc_info=True)
 
     response_error = ResponseError(
         message=e.message,
@@ -53,13 +55,17 @@ def handle_base_scraping_exception(e: BaseScrapingException):
     # Ajusta o status code baseado no tipo de exceção de negócio
     if isinstance(e, ProcessNotFoundException):
         status_code = 404 # Not Found
+    elif isinstance(e, DeadlineExceededException):
+        status_code = 504 # Gateway Timeout (prazo da requisição esgotado antes do sistema de origem responder)
+    elif isinstance(e, CircuitOpenException):
+        status_code = 503 # Service Unavailable (sistema de origem fora do ar, circuito aberto)
     elif isinstance(e, ScraperBusinessException):
         status_code = 422 # Unprocessable Entity (erros de lógica de negócio)
     elif isinstance(e, ScraperTechnicalException):
         status_code = 500 # Internal Server Error (erros técnicos)
 
 
-    logger.error(f"Scraping Exception (Code: {e.code}, Message: {e.message})", exc_info=True)
+    logger.error("Scraping Exception (Code: %s, Message: %s)", e.code, e.message, exc_info=True)
 
     response_error = ResponseError(
         message=e.message,
@@ -76,7 +82,7 @@ def handle_pydantic_validation_error(e: ValidationError):
     Handler para erros de validação de modelos Pydantic (ex: nos dados de entrada da API).
     Retorna uma resposta 400 Bad Request com detalhes dos erros de validação.
     """
-    logger.warning(f"Pydantic Validation Error: {e.errors()}", exc_info=True)
+    logger.warning("Pydantic Validation Error: %s", e.errors(), exc_info=True)
 
     # Constrói uma mensagem mais amigável
     error_details = []
@@ -99,7 +105,7 @@ def handle_generic_exception(e: Exception):
     Handler genérico para qualquer outra exceção não capturada.
     Retorna um erro 500 Internal Server Error.
     """
-    logger.critical(f"Unhandled internal server error: {e}", exc_info=True)
+    logger.critical("Unhandled internal server error: %s", e, exc_info=True)
 
     response_error = ResponseError(
         message="Um erro interno inesperado ocorreu.",
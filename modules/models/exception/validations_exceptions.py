@@ -22,4 +22,39 @@ class InvalidProcessNumberException(InputValidationException):
                      "Esperado 'xxxxxxx-xx.xxxx.x.xx.xxxx' ou 'xxxxxxxxxxxxxxxxxxxx'."),
             code="INVALID_PROCESS_NUMBER",
             details={"received_process_number": num_processo}
-        )
\ No newline at end of file
+        )
+
+class InvalidSystemException(InputValidationException):
+    """
+    Exceção levantada quando o sistema informado não corresponde a nenhum scraper conhecido.
+    """
+    def __init__(self, system: str, available: list):
+        super().__init__(
+            message=f"Sistema '{system}' inválido. Sistemas disponíveis: {', '.join(available)}.",
+            code="INVALID_SYSTEM",
+            details={"received_system": system, "available_systems": available}
+        )
+
+
+class InvalidQueryParameterException(InputValidationException):
+    """
+    Exceção levantada quando um parâmetro de query string tem valor inválido.
+    """
+    def __init__(self, parameter: str, value: str, expected: str):
+        super().__init__(
+            message=f"Valor '{value}' inválido para o parâmetro '{parameter}'. Esperado: {expected}.",
+            code="INVALID_QUERY_PARAMETER",
+            details={"parameter": parameter, "received_value": value}
+        )
+
+
+class InvalidCallbackUrlException(InputValidationException):
+    """
+    Exceção levantada quando a callback_url de um job não é aceita (esquema, host ou endereço interno).
+    """
+    def __init__(self, url: str, reason: str):
+        super().__init__(
+            message=f"callback_url '{url}' recusada: {reason}.",
+            code="INVALID_CALLBACK_URL",
+            details={"received_callback_url": url, "reason": reason}
+        )
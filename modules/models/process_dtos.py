@@ -49,10 +49,27 @@ class WSRequest(BaseModel):
             raise InvalidProcessNumberException(num_processo=v)
         return formatted_v
 
+class BatchScrapeItem(BaseModel):
+    system: str = Field(..., description="Sistema do processo: identificador numérico (ex: '1' para Eproc-RJ, '2' para PJE-RJ) ou nome (ex: 'pje_rj').")
+    numProcesso: str = Field(..., description="Número do processo a ser raspado.")
+
+    @field_validator('numProcesso', mode='before')
+    def validate_and_format_process_number(cls, v):
+        formatted_v = ProcessNumberValidator.format_process_number(v)
+        if not ProcessNumberValidator.is_valid(formatted_v):
+            raise InvalidProcessNumberException(num_processo=v)
+        return formatted_v
+
+class BatchScrapeRequest(BaseModel):
+    items: List[BatchScrapeItem] = Field(..., min_length=1, description="Processos a raspar.")
+
 class WppRequest(BaseModel):
     adv_wpp: str = Field(..., description="Número de WhatsApp do advogado (incluindo código do país, sem 'whatsapp:')")
     system_identifier: str = Field(..., description="Identificador numérico do sistema (ex: '1' para Eproc-RJ, '2' para PJE-RJ)")
     num_processo: str = Field(..., description="Número do processo a ser consultado.")
+    use_cached_fallback: bool = Field(False, description="Se True, retorna o último resultado conhecido do processo quando o sistema estiver indisponível (circuit breaker aberto).")
+    async_job: bool = Field(False, description="Se True, responde 202 com o id de um job e faz a consulta e o envio em segundo plano (ver GET /api/v1/jobs/{job_id}).")
+    callback_url: Optional[str] = Field(None, description="URL que recebe por POST o estado final do job. Implica async_job.")
 
     # # Opcional: Adicionar validação para adv_wpp para garantir formato.
     # @field_validator('adv_wpp')
@@ -80,6 +97,8 @@ class MovimentoDTO(BaseModel): # Renomeado de Movimento para MovimentoDTO
     ordem: Optional[int] = None
     nome: str
     dataHora: datetime
+    # True quando a data do site não pôde ser lida e dataHora é a hora da raspagem (não vai para o JSON)
+    dataHoraEstimada: bool = Field(default=False, exclude=True)
 
 class ParteDTO(BaseModel): # Adicionado, se você tiver uma estrutura de partes mais detalhada
     nome: str
@@ -109,7 +128,10 @@ class AnaliseUltimoMovimentoDTO(BaseModel):
     # Campo para o ÚLTIMO movimento (não mais uma lista)
     ultimoMovimento: Optional[MovimentoDTO] = None  # Pode ser None se não houver movimentos
 
-    # Novo campo booleano para indicar se o movimento é recente
+    # Indica se a consulta encontrou movimentos ainda não vistos (novosMovimentos não vazio)
     movimento_recente: bool
     ultima_atualizacao_delta_horas: float
 
+    # Movimentos que não constavam na consulta anterior, do mais recente para o mais antigo
+    novosMovimentos: List[MovimentoDTO] = Field(default_factory=list)
+
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 
@@ -10,6 +10,8 @@ class Movimento(BaseModel):
     ordem: Optional[int] = None
     nome: str
     dataHora: datetime
+    # True quando a data do site não pôde ser lida e dataHora é a hora da raspagem (não vai para o JSON)
+    dataHoraEstimada: bool = Field(default=False, exclude=True)
 
 # Modelo para o Processo capturado
 class Processo(BaseModel):
@@ -0,0 +1,32 @@
+import json
+import logging
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+from pydantic_core import to_json, to_jsonable_python
+
+logger = logging.getLogger(__name__)
+
+
+class PydanticJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON do Flask que serializa com o encoder em Rust do pydantic (`pydantic_core.to_json`).
+    `jsonify` passa a aceitar modelos pydantic diretamente, sem `model_dump()` intermediário, e datas
+    saem em ISO 8601, como em `model_dump_json`. Tipos que o pydantic não conhece caem no `default` do Flask.
+
+    Diferente do provider padrão do Flask, por padrão as chaves saem na ordem dos campos (`sort_keys = False`)
+    e o texto em UTF-8 sem escapes `\\uXXXX` (`ensure_ascii = False`). Quem precisar do comportamento antigo
+    liga esses atributos no provider ou passa `sort_keys`/`ensure_ascii` em `dumps`; nesse caso a
+    serialização passa pelo `json.dumps`, mais lento.
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        if kwargs["sort_keys"] or kwargs["ensure_ascii"]:
+            return json.dumps(to_jsonable_python(obj, fallback=kwargs.pop("default")), **kwargs)
+        return to_json(obj, indent=kwargs.get("indent"), fallback=kwargs["default"]).decode("utf-8")
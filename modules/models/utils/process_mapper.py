@@ -5,6 +5,10 @@ from modules.models.process_models import Movimento, Processo
 class ProcessMapper:
     """
     Classe utilitária para mapear objetos entre DTOs de scraping e entidades de domínio.
+
+    Os dois lados já são modelos pydantic validados (a validação acontece uma vez, quando o scraper
+    monta a entidade), então a conversão usa `model_construct`: copia os campos sem validar de novo,
+    o que importa em processos com milhares de movimentos.
     """
 
     @staticmethod
@@ -13,11 +17,12 @@ class ProcessMapper:
         Converte um ProcessoScrapedDTO em uma entidade Processo.
         """
         movimentos_entity = [
-            Movimento(ordem=m.ordem, nome=m.nome, dataHora=m.dataHora)
+            Movimento.model_construct(ordem=m.ordem, nome=m.nome, dataHora=m.dataHora,
+                                     dataHoraEstimada=m.dataHoraEstimada)
             for m in dto.movimentos
         ]
 
-        return Processo(
+        return Processo.model_construct(
             partesEnvolvidas=dto.partesEnvolvidas,
             numeroProcesso=dto.numeroProcesso,
             tribunal=dto.tribunal,
@@ -34,11 +39,12 @@ class ProcessMapper:
         (Útil se você precisar enviar o Processo do Core para um DTO de saída)
         """
         movimentos_dto = [
-            MovimentoDTO(ordem=m.ordem, nome=m.nome, dataHora=m.dataHora)
+            MovimentoDTO.model_construct(ordem=m.ordem, nome=m.nome, dataHora=m.dataHora,
+                                        dataHoraEstimada=m.dataHoraEstimada)
             for m in entity.movimentos
         ]
 
-        return ProcessoScrapedDTO(
+        return ProcessoScrapedDTO.model_construct(
             partesEnvolvidas=entity.partesEnvolvidas,
             numeroProcesso=entity.numeroProcesso,
             tribunal=entity.tribunal,
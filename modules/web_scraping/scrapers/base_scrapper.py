@@ -1,6 +1,42 @@
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.ui import WebDriverWait
+
+from modules.core.deadline import Deadline
+from modules.metrics.metrics import SCRAPE_STAGE_SECONDS, SCRAPE_WAIT_SECONDS
 from modules.models.process_dtos import ProcessoScrapedDTO
+from modules.web_scraping.selenium_utils import WebDriverFactory
+from modules.web_scraping.wait_timeouts import wait_timeouts
+
+logger = logging.getLogger(__name__)
+
+# Ouvintes das etapas de scraping: globais (ex: métricas) e da thread atual (ex: um stream SSE)
+_stage_listeners = []
+_stage_local = threading.local()
+
+
+def add_stage_listener(listener: Callable[[str, str, dict], None]):
+    """Registra `listener(sistema, etapa, dados)`, chamado em toda etapa de qualquer scraper."""
+    _stage_listeners.append(listener)
+
+
+@contextmanager
+def stage_listener(listener: Callable[[str, str, dict], None]):
+    """Dentro do contexto, `listener(sistema, etapa, dados)` recebe as etapas dos scrapers executados nesta thread."""
+    previous = getattr(_stage_local, "listener", None)
+    _stage_local.listener = listener
+    try:
+        yield
+    finally:
+        _stage_local.listener = previous
+
 
 class BaseScraper(ABC):
     """
@@ -8,13 +44,157 @@ class BaseScraper(ABC):
     Define o contrato que todas as implementações de scraper devem seguir.
     """
 
+    # Nome do sistema usado como chave dos timeouts aprendidos (ex: "pje_rj"). Definido pelas subclasses.
+    SYSTEM_NAME: str = ""
+
+    def __init__(self):
+        # Estado por thread: a mesma instância de scraper é compartilhada entre requisições concorrentes
+        self._local = threading.local()
+
     @abstractmethod
-    def scrape_processo(self, num_processo: str) -> ProcessoScrapedDTO:
+    def scrape_processo(self, num_processo: str, deadline: Optional[Deadline] = None) -> ProcessoScrapedDTO:
         """
         Método abstrato para realizar o scraping de um processo.
         Todas as subclasses devem implementar este método.
 
         :param num_processo: O número do processo a ser raspado.
+        :param deadline: Prazo da requisição. Se informado, todas as esperas são limitadas ao tempo restante
+                         e DeadlineExceededException é lançada quando ele se esgota.
         :return: Um objeto ProcessoScrapedDTO contendo os dados raspados, ou None se não encontrado.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def _emit_stage(self, stage: str, **data):
+        """
+        Informa o início de uma etapa do scraping (driver_ready, navigating, captcha_attempt, extracting)
+        aos ouvintes registrados. Falhas dos ouvintes nunca interrompem o scraping.
+        """
+        listeners = list(_stage_listeners)
+        local_listener = getattr(_stage_local, "listener", None)
+        if local_listener is not None:
+            listeners.append(local_listener)
+        for listener in listeners:
+            try:
+                listener(self.SYSTEM_NAME, stage, data)
+            except Exception as e:
+                logger.warning("Ouvinte de etapa '%s' falhou: %s", stage, e, exc_info=True)
+
+    @staticmethod
+    def _wait(driver: WebDriver, timeout: float, deadline: Optional[Deadline] = None,
+              stage: str = "espera") -> WebDriverWait:
+        """Cria o WebDriverWait de uma etapa, com o timeout limitado ao tempo restante do prazo."""
+        if deadline is not None:
+            deadline.check(stage)
+            timeout = deadline.timeout(timeout)
+        return WebDriverWait(driver, timeout)
+
+    def _wait_until(self, driver: WebDriver, wait_name: str, condition, default_timeout: float,
+                    deadline: Optional[Deadline] = None):
+        """
+        Espera nomeada: o timeout vem das latências já observadas para `wait_name` neste sistema
+        (ver AdaptiveWaitTimeouts). A latência desta espera é registrada quando o elemento aparece, e o
+        timeout usado quando ela estoura (exceto se foi o prazo da requisição que encurtou a espera).
+        Lança TimeoutException como um `WebDriverWait.until` comum.
+        """
+        timeout = wait_timeouts.timeout_for(self.SYSTEM_NAME, wait_name, default_timeout)
+        wait = self._wait(driver, timeout, deadline, wait_name)
+
+        started_at = time.monotonic()
+        try:
+            result = wait.until(condition)
+        except TimeoutException:
+            SCRAPE_WAIT_SECONDS.observe(time.monotonic() - started_at, system=self.SYSTEM_NAME,
+                                        wait=wait_name, outcome="error")
+            if deadline is None or not deadline.expired:
+                wait_timeouts.record_timeout(self.SYSTEM_NAME, wait_name, timeout)
+            raise
+        elapsed = time.monotonic() - started_at
+        wait_timeouts.record(self.SYSTEM_NAME, wait_name, elapsed)
+        SCRAPE_WAIT_SECONDS.observe(elapsed, system=self.SYSTEM_NAME, wait=wait_name, outcome="success")
+        return result
+
+    def _navigate(self, driver: WebDriver, url: str, deadline: Optional[Deadline] = None):
+        """`driver.get` com o carregamento da página limitado ao tempo restante do prazo."""
+        self._emit_stage("navigating", url=url)
+        if deadline is not None:
+            deadline.check("navegacao")
+            driver.set_page_load_timeout(deadline.remaining())
+        with SCRAPE_STAGE_SECONDS.time(system=self.SYSTEM_NAME, stage="navigation"):
+            driver.get(url)
+
+    @contextmanager
+    def warm_session(self):
+        """
+        Mantém o WebDriver aberto entre tentativas feitas na mesma thread.
+        Enquanto o contexto estiver ativo, um driver ainda saudável após uma falha é guardado
+        e reaproveitado pela próxima chamada de `scrape_processo`, evitando subir um novo Chrome.
+        Ao sair do contexto o driver guardado é encerrado.
+        """
+        self._local.keep_warm = True
+        try:
+            yield
+        finally:
+            self._local.keep_warm = False
+            driver = getattr(self._local, "warm_driver", None)
+            self._local.warm_driver = None
+            if driver:
+                self._quit_driver(driver)
+
+    @contextmanager
+    def _driver_session(self, deadline: Optional[Deadline] = None):
+        """
+        Fornece um WebDriver para uma execução de `scrape_processo` e cuida do encerramento
+        (ou de guardá-lo para reaproveitamento, dentro de `warm_session`).
+        """
+        if deadline is not None:
+            deadline.check("inicializacao_driver")
+        driver = self._acquire_driver()
+        self._emit_stage("driver_ready")
+        try:
+            yield driver
+        except Exception as e:
+            self._release_driver(driver, error=e)
+            raise
+        else:
+            self._release_driver(driver)
+
+    def _acquire_driver(self) -> WebDriver:
+        driver: Optional[WebDriver] = getattr(self._local, "warm_driver", None)
+        self._local.warm_driver = None
+
+        if driver is not None:
+            try:
+                _ = driver.current_url  # Verifica se a sessão do navegador ainda responde
+                logger.info("Reutilizando WebDriver aquecido da tentativa anterior.")
+                return driver
+            except WebDriverException:
+                logger.info("WebDriver aquecido não responde mais. Criando um novo.")
+                self._quit_driver(driver)
+
+        with SCRAPE_STAGE_SECONDS.time(system=self.SYSTEM_NAME, stage="driver_start"):
+            return WebDriverFactory.create_chrome_driver(headless=True)
+
+    def _release_driver(self, driver: WebDriver, error: Optional[Exception] = None):
+        if error is not None and getattr(self._local, "keep_warm", False) and self._is_driver_reusable(error):
+            logger.info("Mantendo WebDriver aberto para a próxima tentativa.")
+            self._local.warm_driver = driver
+            return
+        self._quit_driver(driver)
+
+    @staticmethod
+    def _is_driver_reusable(error: Exception) -> bool:
+        """
+        Timeouts e elementos ausentes são problemas da página, não do navegador: o driver pode ser reaproveitado.
+        Outras WebDriverException indicam que a sessão do navegador pode estar comprometida.
+        """
+        cause = getattr(error, "original_exception", None) or error
+        if isinstance(cause, (TimeoutException, NoSuchElementException)):
+            return True
+        return not isinstance(cause, WebDriverException)
+
+    def _quit_driver(self, driver: WebDriver):
+        try:
+            driver.quit()
+            logger.info("WebDriver do %s encerrado.", self.__class__.__name__)
+        except Exception as e:
+            logger.warning("Falha ao encerrar o WebDriver: %s", e, exc_info=True)
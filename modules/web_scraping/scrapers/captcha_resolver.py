@@ -15,6 +15,7 @@ from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from modules.core.deadline import Deadline
 from modules.models.exception.exceptions import  ScraperTechnicalException
 
 # Carrega as variáveis de ambiente do arquivo .env
@@ -31,7 +32,8 @@ class CaptchaResolvers:
             captcha_img_locator: tuple,
             captcha_input_locator: tuple,
             timeout: int = 15,
-            model_name: str = "gemini-1.5-flash"
+            model_name: str = "gemini-1.5-flash",
+            deadline: Deadline = None
     ) -> bool: # Retorna True para sucesso, False para falha na resolução
         """
         Resolve um CAPTCHA de texto usando a API Gemini.
@@ -43,6 +45,8 @@ class CaptchaResolvers:
             captcha_input_locator (tuple): Tupla (By.STRATEGY, locator) para localizar o campo de input do CAPTCHA.
             timeout (int): Tempo máximo de espera para o CAPTCHA aparecer e ser resolvido.
             model_name (str): Nome do modelo Gemini a ser usado.
+            deadline (Deadline): Prazo da requisição. Limita a espera pela imagem e a chamada à API Gemini
+                                 ao tempo restante.
 
         Returns:
             bool: Retorna True se o CAPTCHA foi resolvido e preenchido com sucesso, False caso contrário.
@@ -50,8 +54,9 @@ class CaptchaResolvers:
         Raises:
             ScraperTechnicalException: Se ocorrer um erro técnico crítico que impeça a tentativa de resolução
                                        (ex: API Key ausente, falha na decodificação Base64).
+            DeadlineExceededException: Se o prazo da requisição já tiver se esgotado.
         """
-        logger.info(f"Tentando resolver CAPTCHA com Gemini usando modelo: {model_name}")
+        logger.info("Tentando resolver CAPTCHA com Gemini usando modelo: %s", model_name)
 
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -61,8 +66,15 @@ class CaptchaResolvers:
                 code="API_KEY_MISSING"
             )
 
+        http_options = None
+        if deadline is not None:
+            deadline.check("captcha_resolver")
+            timeout = deadline.timeout(timeout)
+            # A chamada à API não pode passar do prazo (o SDK recebe o timeout em milissegundos)
+            http_options = types.HttpOptions(timeout=int(deadline.remaining() * 1000))
+
         try:
-            client = genai.Client(api_key=api_key)
+            client = genai.Client(api_key=api_key, http_options=http_options)
 
             wait = WebDriverWait(driver, timeout)
             # 2. Esperar e localizar a imagem do CAPTCHA
@@ -80,7 +92,7 @@ class CaptchaResolvers:
             mime_type_part = captcha_img_src.split(';')[0].split(':')[1]
             base64_data = captcha_img_src.split(',')[1]
 
-            logger.info(f"Tipo MIME da imagem do CAPTCHA: {mime_type_part}")
+            logger.info("Tipo MIME da imagem do CAPTCHA: %s", mime_type_part)
 
             # 5. Decodificar a string Base64 para bytes
             try:
@@ -113,7 +125,7 @@ class CaptchaResolvers:
                 logger.warning("A API Gemini não retornou texto para o CAPTCHA. Falha na tentativa de resolução.")
                 return False # Falha na resolução pela API, permite nova tentativa
 
-            logger.info(f"CAPTCHA resolvido: {resolved_text}")
+            logger.info("CAPTCHA resolvido: %s", resolved_text)
 
             # 9. Preencher o campo de input
             captcha_input_element = driver.find_element(*captcha_input_locator)
@@ -124,12 +136,14 @@ class CaptchaResolvers:
         except (TimeoutException, NoSuchElementException) as e:
             # Problema ao encontrar elementos do Selenium. Não é um erro "fatal" para a tentativa,
             # apenas indica que não foi possível tentar resolver o CAPTCHA nesta rodada.
-            logger.warning(f"Elemento da imagem ou input do CAPTCHA não encontrado dentro do tempo limite: {e}", exc_info=True)
+            logger.warning("Elemento da imagem ou input do CAPTCHA não encontrado dentro do tempo limite: %s",
+                           e, exc_info=True)
             return False
         except Exception as e:
             # Qualquer outra exceção inesperada durante o processo de resolução.
             # Loga como erro, mas retorna False para permitir novas tentativas se for um erro intermitente.
-            logger.error(f"Ocorreu um erro inesperado durante a resolução do CAPTCHA com a API Gemini: {e}", exc_info=True)
+            logger.error("Ocorreu um erro inesperado durante a resolução do CAPTCHA com a API Gemini: %s",
+                         e, exc_info=True)
             return False
 
 
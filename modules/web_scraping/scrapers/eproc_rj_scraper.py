@@ -1,26 +1,28 @@
 import logging
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import List, Optional
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, \
     UnexpectedAlertPresentException
 
+from modules.core.deadline import Deadline
+from modules.metrics.metrics import CAPTCHA_ATTEMPTS, SCRAPE_STAGE_SECONDS
 from modules.models.process_dtos import ProcessoScrapedDTO
 from modules.models.process_models import Processo, Movimento
 from modules.models.utils.process_mapper import ProcessMapper
 from modules.web_scraping.scrapers.base_scrapper import BaseScraper
 from modules.web_scraping.scrapers.captcha_resolver import CaptchaResolvers
-from modules.web_scraping.selenium_utils import WebDriverFactory
 from modules.models.exception.exceptions import (
     ScraperTechnicalException,
     ScraperBusinessException,
     ProcessNotFoundException,
-    CaptchaResolutionFailedException
+    CaptchaResolutionFailedException,
+    DeadlineExceededException
 )
 # Assumindo que Processo e Movimento estão definidos em process_models.py
 
@@ -31,77 +33,110 @@ class EprocRjScraper(BaseScraper):
     Scraper para processos no Eproc-RJ (TJRJ).
     Versão simplificada para focar na navegação e preenchimento.
     """
+
+    SYSTEM_NAME = "eproc_rj"
+
     def __init__(self):
+        super().__init__()
         self.DEFAULT_TIMEOUT = 10 # Aumentei um pouco para estabilidade
         self.EPROC_URL = "https://eproc1g-cp.tjrj.jus.br/eproc/externo_controlador.php?acao=processo_consulta_publica"
         self.MAX_CAPTCHA_ATTEMPTS = 5
 
-    def captcha_resolution_iteration(self, driver: WebDriver, wait: WebDriverWait, search_field_id: str) -> bool:
+    def captcha_resolution_iteration(self, driver: WebDriver, search_field_id: str,
+                                     deadline: Optional[Deadline] = None) -> bool:
         """
         Tenta resolver o CAPTCHA e submeter a busca.
         Retorna True se resolvido e submetido com sucesso, False caso contrário.
+        Lança DeadlineExceededException se o prazo acabar antes de uma nova tentativa.
         """
         for attempt in range(1, self.MAX_CAPTCHA_ATTEMPTS + 1):
-            logger.info(f"Tentativa de resolução de CAPTCHA {attempt}/{self.MAX_CAPTCHA_ATTEMPTS}...")
+            if deadline is not None:
+                deadline.check(f"captcha_tentativa_{attempt}")
+            logger.info("Tentativa de resolução de CAPTCHA %s/%s...", attempt, self.MAX_CAPTCHA_ATTEMPTS)
+            self._emit_stage("captcha_attempt", attempt=attempt, max_attempts=self.MAX_CAPTCHA_ATTEMPTS)
+
+            captcha_img_locator = (By.XPATH, "//div[@id='divInfraCaptcha']//img")
+            try:
+                self._wait_until(driver, "imagem_captcha", EC.presence_of_element_located(captcha_img_locator),
+                                 self.DEFAULT_TIMEOUT, deadline)
+            except TimeoutException:
+                logger.warning("Imagem do CAPTCHA não apareceu dentro do tempo limite.")
+                CAPTCHA_ATTEMPTS.inc(system=self.SYSTEM_NAME, outcome="no_image")
+                continue
 
+            solver_started_at = time.monotonic()
             captcha_response_text = CaptchaResolvers.gemini_captcha_text_resolver(
                 driver,
-                captcha_img_locator=(By.XPATH, "//div[@id='divInfraCaptcha']//img"),
+                captcha_img_locator=captcha_img_locator,
                 captcha_input_locator=(By.ID, "txtInfraCaptcha"),
-                timeout=self.DEFAULT_TIMEOUT
+                timeout=self.DEFAULT_TIMEOUT,
+                deadline=deadline
             )
+            SCRAPE_STAGE_SECONDS.observe(time.monotonic() - solver_started_at, system=self.SYSTEM_NAME,
+                                         stage="captcha_solver", outcome="success" if captcha_response_text else "error")
 
             if captcha_response_text:
                 logger.info("CAPTCHA resolvido pela API. Tentando submeter e verificar...")
                 try:
-                    search_field_after_captcha = wait.until(EC.element_to_be_clickable((By.ID, search_field_id)))
+                    search_field_after_captcha = self._wait(driver, self.DEFAULT_TIMEOUT, deadline, "captcha_submissao").until(
+                        EC.element_to_be_clickable((By.ID, search_field_id)))
                     search_field_after_captcha.send_keys(Keys.ENTER)
 
                     # Esperar 2 segundos para ver se o CAPTCHA desaparece
-                    WebDriverWait(driver, 2).until(EC.invisibility_of_element_located((By.ID, "divInfraCaptcha")))
+                    self._wait(driver, 2, deadline, "captcha_verificacao").until(
+                        EC.invisibility_of_element_located((By.ID, "divInfraCaptcha")))
                     logger.debug("CAPTCHA desapareceu. Resolução bem-sucedida.")
+                    CAPTCHA_ATTEMPTS.inc(system=self.SYSTEM_NAME, outcome="solved")
                     return True # CAPTCHA resolvido e submetido com sucesso
 
                 except UnexpectedAlertPresentException as e:
                     logger.info("Alert Identificado | Erro Ao Resolver Captcha")
+                    CAPTCHA_ATTEMPTS.inc(system=self.SYSTEM_NAME, outcome="rejected")
                     driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ENTER)
                     continue
 
 
                 except TimeoutException:
                     logger.warning("CAPTCHA não desapareceu após submissão. Resposta da API pode não ter sido aceita.", exc_info=True)
+                    CAPTCHA_ATTEMPTS.inc(system=self.SYSTEM_NAME, outcome="rejected")
             else:
                 logger.info("API do CAPTCHA não conseguiu resolver a imagem.")
+                CAPTCHA_ATTEMPTS.inc(system=self.SYSTEM_NAME, outcome="unsolved")
 
-        logger.info(f"Falha ao resolver o CAPTCHA após {self.MAX_CAPTCHA_ATTEMPTS} tentativas.")
+        logger.info("Falha ao resolver o CAPTCHA após %s tentativas.", self.MAX_CAPTCHA_ATTEMPTS)
         return False # Todas as tentativas falharam
 
-    def _scrape_acesso(self, driver: WebDriver, num_processo: str):
+    def _scrape_acesso(self, driver: WebDriver, num_processo: str, deadline: Optional[Deadline] = None):
         """
         Navega até a página do Eproc, insere o número do processo e tenta resolver o CAPTCHA.
         Lança exceções se o campo de busca não for encontrado ou se o CAPTCHA falhar.
         """
         logger.info("Acessando a página de consulta pública do Eproc-RJ...")
-        driver.get(self.EPROC_URL)
+        self._navigate(driver, self.EPROC_URL, deadline)
 
-        wait = WebDriverWait(driver, self.DEFAULT_TIMEOUT)
         search_field_id = "txtNumProcesso"
 
         try:
-            search_field = wait.until(EC.element_to_be_clickable((By.ID, search_field_id)))
+            search_field = self._wait_until(driver, "campo_pesquisa", EC.element_to_be_clickable((By.ID, search_field_id)),
+                                            self.DEFAULT_TIMEOUT, deadline)
             search_field.send_keys(num_processo)
-            logger.debug(f"Número do processo '{num_processo}' inserido no Eproc.")
+            logger.debug("Número do processo '%s' inserido no Eproc.", num_processo)
         except TimeoutException as e:
-            raise ProcessNotFoundException(
-                f"Campo de pesquisa '{search_field_id}' não encontrado ou não clicável na página do Eproc.")
+            # A página não carregou o formulário de busca: é um problema do sistema, não do processo.
+            raise ScraperTechnicalException(
+                f"Campo de pesquisa '{search_field_id}' não encontrado ou não clicável na página do Eproc.",
+                code="EPROC_SEARCH_FIELD_UNAVAILABLE",
+                original_exception=e
+            )
 
         # Verifica e tenta resolver CAPTCHA
         try:
             # Espera para detectar o elemento do CAPTCHA
-            wait.until(EC.presence_of_element_located((By.ID, "divInfraCaptcha")))
+            self._wait_until(driver, "deteccao_captcha", EC.presence_of_element_located((By.ID, "divInfraCaptcha")),
+                             self.DEFAULT_TIMEOUT, deadline)
             logger.info("CAPTCHA detectado. Iniciando a resolução...")
 
-            captcha_resolved = self.captcha_resolution_iteration(driver, wait, search_field_id)
+            captcha_resolved = self.captcha_resolution_iteration(driver, search_field_id, deadline)
 
             if not captcha_resolved:
                 raise CaptchaResolutionFailedException(
@@ -113,13 +148,13 @@ class EprocRjScraper(BaseScraper):
             logger.info("CAPTCHA element not detected within the timeout. Assuming no CAPTCHA is present.")
             pass
 
-    def _scrape_dados(self, driver: WebDriver, num_processo: str) -> Processo:
+    def _scrape_dados(self, driver: WebDriver, num_processo: str, deadline: Optional[Deadline] = None) -> Processo:
         """
         Extrai os dados do processo da página do Eproc-RJ após acesso bem-sucedido.
         Lança exceções se elementos de dados não forem encontrados ou se houver erros de parsing.
         """
         logger.info("Iniciando extração de dados do processo Eproc...")
-        wait = WebDriverWait(driver, self.DEFAULT_TIMEOUT)
+        wait = self._wait(driver, self.DEFAULT_TIMEOUT, deadline, "extracao_capa")
 
         try:
             # Tribunal e Sistema são fixos para este scraper
@@ -132,8 +167,11 @@ class EprocRjScraper(BaseScraper):
                  raise ProcessNotFoundException(num_processo=num_processo,
                                                 message=f"Processo '{num_processo}' não encontrado no Eproc-RJ.")
 
-            numero_processo_confirmado = wait.until(EC.presence_of_element_located((By.ID, "txtNumProcesso"))).text.strip()
-            logger.debug(f"Número do Processo na página: {numero_processo_confirmado}")
+            numero_processo_confirmado = self._wait_until(
+                driver, "capa_processo", EC.presence_of_element_located((By.ID, "txtNumProcesso")),
+                self.DEFAULT_TIMEOUT, deadline
+            ).text.strip()
+            logger.debug("Número do Processo na página: %s", numero_processo_confirmado)
 
             data_autuacao_str = wait.until(EC.presence_of_element_located((By.ID, "txtAutuacao"))).text.strip()
             try:
@@ -144,7 +182,7 @@ class EprocRjScraper(BaseScraper):
                     code="EPROC_AUTUACAO_DATE_PARSE_ERROR",
                     original_exception=e
                 )
-            logger.debug(f"Data de Autuação: {data_autuacao}")
+            logger.debug("Data de Autuação: %s", data_autuacao)
 
             situacao = wait.until(EC.presence_of_element_located((By.ID, "txtSituacao"))).text.strip()
             orgao_julgador = wait.until(EC.presence_of_element_located((By.ID, "txtOrgaoJulgador"))).text.strip()
@@ -153,6 +191,7 @@ class EprocRjScraper(BaseScraper):
 
             # --- 2. Extrair Partes Envolvidas ---
             partes_envolvidas_text = ""
+            wait = self._wait(driver, self.DEFAULT_TIMEOUT, deadline, "extracao_partes")
             try:
                 partes_table = wait.until(EC.presence_of_element_located((By.XPATH, "//fieldset[@id='fldPartes']/table")))
                 partes_tds = partes_table.find_elements(By.TAG_NAME, "td")
@@ -160,7 +199,7 @@ class EprocRjScraper(BaseScraper):
                     if td.text.strip():
                         partes_envolvidas_text += td.text.strip() + "; "
                 partes_envolvidas = partes_envolvidas_text.strip().replace(";;", ";")
-                logger.debug(f"Partes Envolvidas: {partes_envolvidas}")
+                logger.debug("Partes Envolvidas: %s", partes_envolvidas)
             except TimeoutException:
                 logger.warning("Tabela de Partes e Representantes não encontrada.")
                 partes_envolvidas = "Não informado"
@@ -170,15 +209,17 @@ class EprocRjScraper(BaseScraper):
             ultima_atualizacao: datetime = data_autuacao
 
             try:
-                movimentos_table = wait.until(
+                movimentos_table = self._wait_until(
+                    driver, "tabela_movimentos",
                     EC.presence_of_element_located(
                         (By.XPATH, "//table[contains(@class, 'infraTable') and .//th[text()='Data/Hora'] and .//th[text()='Descrição']]")
-                    )
+                    ),
+                    self.DEFAULT_TIMEOUT, deadline
                 )
                 logger.debug("Tabela de Movimentos encontrada.")
 
                 movimento_elements = movimentos_table.find_elements(By.XPATH, "./tbody/tr[./td]")
-                logger.debug(f"Encontrados {len(movimento_elements)} elementos de movimento.")
+                logger.debug("Encontrados %s elementos de movimento.", len(movimento_elements))
 
                 for i, elem in enumerate(movimento_elements):
                     try:
@@ -187,6 +228,7 @@ class EprocRjScraper(BaseScraper):
                             data_hora_str = cols[1].text.strip()
                             nome_movimento = cols[2].text.strip()
 
+                            data_hora_estimada = False
                             try:
                                 data_hora = datetime.strptime(data_hora_str, "%d/%m/%Y %H:%M:%S")
                             except ValueError:
@@ -194,23 +236,29 @@ class EprocRjScraper(BaseScraper):
                                 try:
                                     data_hora = datetime.strptime(data_hora_str, "%d/%m/%Y %H:%M")
                                 except ValueError as e:
-                                    logger.warning(f"Não foi possível parsear a data e hora '{data_hora_str}' do movimento. Usando a hora atual.", exc_info=True)
+                                    logger.warning("Não foi possível parsear a data e hora '%s' do movimento. "
+                                                   "Usando a hora atual.",
+                                                   data_hora_str, exc_info=True)
                                     data_hora = datetime.now() # Fallback seguro
+                                    data_hora_estimada = True
 
-                            mov = Movimento(ordem=i + 1, nome=nome_movimento, dataHora=data_hora)
+                            mov = Movimento(ordem=i + 1, nome=nome_movimento, dataHora=data_hora,
+                                            dataHoraEstimada=data_hora_estimada)
                             movimentos.append(mov)
 
-                            if data_hora > ultima_atualizacao:
+                            if not data_hora_estimada and data_hora > ultima_atualizacao:
                                 ultima_atualizacao = data_hora
                         else:
-                            logger.warning(f"Linha de movimento com número de colunas inesperado: {len(cols)}")
+                            logger.warning("Linha de movimento com número de colunas inesperado: %s", len(cols))
                     except NoSuchElementException as e:
-                        logger.warning(f"Pulando um movimento devido a elemento ausente: {e}", exc_info=True)
+                        logger.warning("Pulando um movimento devido a elemento ausente: %s", e, exc_info=True)
 
             except TimeoutException:
                 logger.warning("Tabela de movimentos não encontrada. Lista de movimentos estará vazia.")
+            except DeadlineExceededException:
+                raise
             except Exception as e:
-                logger.error(f"Ocorreu um erro ao tentar encontrar elementos de movimento: {e}", exc_info=True)
+                logger.error("Ocorreu um erro ao tentar encontrar elementos de movimento: %s", e, exc_info=True)
 
             # --- 4. Construir e Retornar o Objeto Processo ---
             processo = Processo(
@@ -235,31 +283,31 @@ class EprocRjScraper(BaseScraper):
 
 
     # Metodo Principal da classe
-    def scrape_processo(self, num_processo: str) -> ProcessoScrapedDTO:
+    def scrape_processo(self, num_processo: str, deadline: Optional[Deadline] = None) -> ProcessoScrapedDTO:
         """
         Realiza o scraping de um processo no Eproc-RJ.
         Executa a navegação, busca e extração de dados do processo.
         """
-        driver: Optional[WebDriver] = None
         try:
-            logger.info(f"Iniciando scraping do Eproc-RJ para o processo: {num_processo}")
+            logger.info("Iniciando scraping do Eproc-RJ para o processo: %s", num_processo)
 
-            driver = WebDriverFactory.create_chrome_driver(headless=True)
+            with self._driver_session(deadline) as driver:
+                # 1. Chamar o metodo auxiliar para acesso inicial ao processo
+                self._scrape_acesso(driver, num_processo, deadline)
 
-            # 1. Chamar o metodo auxiliar para acesso inicial ao processo
-            self._scrape_acesso(driver, num_processo)
-
-            logger.info(f"Acesso inicial para o processo {num_processo} bem-sucedido. Iniciando extração de dados.")
-            # _scrape_dados retorna a entidade Processo
-            processo_entity: Processo = self._scrape_dados(driver, num_processo)
+                logger.info("Acesso inicial para o processo %s bem-sucedido. Iniciando extração de dados.",
+                            num_processo)
+                self._emit_stage("extracting")
+                # _scrape_dados retorna a entidade Processo
+                processo_entity: Processo = self._scrape_dados(driver, num_processo, deadline)
 
             # >>> PONTO DA CONVERSÃO: Entidade para DTO <<<
-            processo_dto: ProcessoScrapedDTO = ProcessMapper.from_entity_to_dto(processo_entity)
-            logger.info(f"Entidade Processo convertida para ProcessoScrapedDTO para {num_processo}.")
-
-            logger.info(f"Objeto ProcessoScrapedDTO Extraído e Convertido com Sucesso para {num_processo}!")
-            # O debug agora mostra o DTO que será retornado
-            logger.debug(processo_dto.model_dump_json(indent=2, exclude_none=True))
+            with SCRAPE_STAGE_SECONDS.time(system=self.SYSTEM_NAME, stage="mapper"):
+                processo_dto: ProcessoScrapedDTO = ProcessMapper.from_entity_to_dto(processo_entity)
+            logger.info("Objeto ProcessoScrapedDTO Extraído e Convertido com Sucesso para %s!", num_processo)
+            # O JSON do DTO só é gerado com DEBUG habilitado
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s", processo_dto.model_dump_json(indent=2, exclude_none=True))
 
             return processo_dto
 
@@ -269,7 +317,7 @@ class EprocRjScraper(BaseScraper):
             raise
             # Captura exceções gerais do WebDriver no nível mais alto se não forem tratadas antes
         except WebDriverException as e:
-            logger.error(f"Erro de WebDriver (Eproc) para processo {num_processo}: {e}", exc_info=True)
+            logger.error("Erro de WebDriver (Eproc) para processo %s: %s", num_processo, e, exc_info=True)
             raise ScraperTechnicalException(
                 f"Erro no WebDriver durante scraping do Eproc-RJ para {num_processo}.",
                 code="EPROC_WEBDRIVER_ERROR",
@@ -277,14 +325,10 @@ class EprocRjScraper(BaseScraper):
             )
         except Exception as e:
             # Captura qualquer exceção genérica não esperada
-            logger.critical(f"Erro inesperado e não tratado durante o scraping do Eproc-RJ para {num_processo}: {e}",
+            logger.critical("Erro inesperado e não tratado durante o scraping do Eproc-RJ para %s: %s", num_processo, e,
                             exc_info=True)
             raise ScraperTechnicalException(
                 f"Erro inesperado no scraping do Eproc-RJ para {num_processo}.",
                 code="EPROC_UNEXPECTED_ERROR",
                 original_exception=e
             )
-        finally:
-            if driver:
-                driver.quit()
-                logger.info("WebDriver do Eproc encerrado.")
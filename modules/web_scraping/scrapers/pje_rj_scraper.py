@@ -7,17 +7,17 @@ from typing import Optional
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, \
     UnexpectedAlertPresentException
 
+from modules.core.deadline import Deadline
+from modules.metrics.metrics import SCRAPE_STAGE_SECONDS
 from modules.models.process_dtos import ProcessoScrapedDTO
 # Importa os modelos Pydantic
 from modules.models.process_models import Processo, Movimento
 from modules.models.utils.process_mapper import ProcessMapper
 from modules.web_scraping.scrapers.base_scrapper import BaseScraper
-from modules.web_scraping.selenium_utils import WebDriverFactory  # Importa a fábrica do WebDriver
 from modules.models.exception.exceptions import (
     ScraperTechnicalException,
     ProcessNotFoundException, BaseScrapingException
@@ -31,7 +31,10 @@ class PjeRjScraper(BaseScraper):
     Classe responsável por realizar o web scraping de processos no sistema PJE do TJRJ.
     """
 
+    SYSTEM_NAME = "pje_rj"
+
     def __init__(self):
+        super().__init__()
         self.QUICK_TIMEOUT = 3 # Timeouts curtos
         self.DEFAULT_TIMEOUT = 10  # Aumentei um pouco para estabilidade
         self.PJE_URL = "https://tjrj.pje.jus.br/1g/ConsultaPublica/listView.seam"
@@ -55,21 +58,22 @@ class PjeRjScraper(BaseScraper):
             )
             logger.debug("Cookie 'rxvisitor' e localStorage adicionados.")
         except Exception as e:
-            logger.warning(f"Não foi possível adicionar cookies/localStorage: {e}", exc_info=True)
+            logger.warning("Não foi possível adicionar cookies/localStorage: %s", e, exc_info=True)
 
 
-    def _navigate_and_search(self, driver: WebDriver, num_processo: str, wait: WebDriverWait):
+    def _navigate_and_search(self, driver: WebDriver, num_processo: str, deadline: Optional[Deadline] = None):
         """Navega para a URL do PJE e insere o número do processo."""
-        logger.info(f"Navegando para o PJE URL: {self.PJE_URL}")
-        driver.get(self.PJE_URL)
-        logger.debug(f"Acessada URL: {self.PJE_URL}")
+        logger.info("Navegando para o PJE URL: %s", self.PJE_URL)
+        self._navigate(driver, self.PJE_URL, deadline)
+        logger.debug("Acessada URL: %s", self.PJE_URL)
 
         self._add_cookies_and_local_storage(driver)
         driver.refresh() # Recarrega a página para aplicar os cookies
 
         search_field_id = "fPP:numProcesso-inputNumeroProcessoDecoration:numProcesso-inputNumeroProcesso"
         try:
-            search_field = wait.until(EC.element_to_be_clickable((By.ID, search_field_id)))
+            search_field = self._wait_until(driver, "campo_pesquisa", EC.element_to_be_clickable((By.ID, search_field_id)),
+                                            self.DEFAULT_TIMEOUT, deadline)
             search_field.send_keys(num_processo)
             logger.info("vou apertar o enter")
             search_field.send_keys(Keys.ENTER)
@@ -95,13 +99,14 @@ class PjeRjScraper(BaseScraper):
         #================================================================================
 
         # Lógica de redirecionamento de login
-        time.sleep(2)  # Pequena espera para verificar redirecionamento
+        time.sleep(min(2, deadline.remaining()) if deadline else 2)  # Pequena espera para verificar redirecionamento
         if "login" in driver.current_url.lower():
             logger.info("Redirecionado para a página de login, voltando e reenviando a busca...")
             driver.back()
 
             try:
-                search_field = wait.until(EC.element_to_be_clickable((By.ID, search_field_id)))
+                search_field = self._wait_until(driver, "campo_pesquisa", EC.element_to_be_clickable((By.ID, search_field_id)),
+                                                self.DEFAULT_TIMEOUT, deadline)
                 search_field.clear()
                 search_field.send_keys(num_processo)
                 logger.info("Reenviando número do processo após login e apertando Enter.")
@@ -121,26 +126,28 @@ class PjeRjScraper(BaseScraper):
                     original_exception=e
                 )
 
-    def _extract_data(self, driver: WebDriver, num_processo: str, wait: WebDriverWait) -> Processo:
+    def _extract_data(self, driver: WebDriver, num_processo: str, deadline: Optional[Deadline] = None) -> Processo:
         """Extrai os dados do processo da tabela de resultados do PJE."""
         table_body_xpath = "//tbody[@id='fPP:processosTable:tb']"
         first_row_xpath = f"{table_body_xpath}/tr[1]"
-        quick_wait = WebDriverWait(driver, self.QUICK_TIMEOUT)
 
         # --- Extração da última movimentação ---
         ultima_movimentacao_str: str
         try:
-            movimentacao_element = wait.until(
-                EC.visibility_of_element_located((By.XPATH, f"{first_row_xpath}/td[3]"))
+            movimentacao_element = self._wait_until(
+                driver, "linha_resultado",
+                EC.visibility_of_element_located((By.XPATH, f"{first_row_xpath}/td[3]")),
+                self.DEFAULT_TIMEOUT, deadline
             )
             ultima_movimentacao_str = movimentacao_element.text
-            logger.info(f"Última movimentação capturada: '{ultima_movimentacao_str}'")
+            logger.info("Última movimentação capturada: '%s'", ultima_movimentacao_str)
         except (TimeoutException, NoSuchElementException) as e:
             # Verifica se é um caso de processo não encontrado antes de lançar erro técnico
             raise ProcessNotFoundException(num_processo=num_processo)
 
         # --- Extração das partes envolvidas ---
         partes_envolvidas: str
+        wait = self._wait(driver, self.DEFAULT_TIMEOUT, deadline, "partes_envolvidas")
         try:
             partes_element = wait.until(
                 EC.visibility_of_element_located((By.XPATH, f"{first_row_xpath}/td[2]"))
@@ -152,12 +159,13 @@ class PjeRjScraper(BaseScraper):
                 partes_envolvidas_raw = texto_completo_td.replace(texto_link, "").strip()
                 lines = partes_envolvidas_raw.split('\n')
                 partes_envolvidas = "\n".join(lines[1:]).strip() if len(lines) > 1 else partes_envolvidas_raw
-                logger.info(f"Partes envolvidas capturadas: '{partes_envolvidas}'")
+                logger.info("Partes envolvidas capturadas: '%s'", partes_envolvidas)
             except NoSuchElementException:
                 partes_envolvidas = texto_completo_td.strip()
-                logger.info(f"Partes envolvidas capturadas (sem link): '{partes_envolvidas}'")
+                logger.info("Partes envolvidas capturadas (sem link): '%s'", partes_envolvidas)
             except Exception as e:
-                logger.warning(f"Erro ao extrair partes envolvidas, usando texto bruto do TD. Erro: {e}", exc_info=True)
+                logger.warning("Erro ao extrair partes envolvidas, usando texto bruto do TD. Erro: %s",
+                               e, exc_info=True)
                 partes_envolvidas = texto_completo_td.strip() # Fallback
         except (TimeoutException, NoSuchElementException) as e:
             raise ScraperTechnicalException(
@@ -178,7 +186,7 @@ class PjeRjScraper(BaseScraper):
                 raise ValueError(f"Formato de data/hora esperado não encontrado na string da movimentação: '{ultima_movimentacao_str}'")
 
             ultimo_movimento = Movimento(ordem=1, nome=descricao, dataHora=data_hora_obj)
-            logger.debug(f"Último movimento criado: {ultimo_movimento}")
+            logger.debug("Último movimento criado: %s", ultimo_movimento)
         except Exception as e:
             raise ScraperTechnicalException(
                 f"Falha ao processar última movimentação: '{ultima_movimentacao_str}'",
@@ -196,43 +204,44 @@ class PjeRjScraper(BaseScraper):
             movimentos=[ultimo_movimento],
             dataHoraUltimaAtualizacao=ultimo_movimento.dataHora
         )
-        logger.info(f"Processo capturado com sucesso para {num_processo}.")
+        logger.info("Processo capturado com sucesso para %s.", num_processo)
         return processo_scraped
 
-    def scrape_processo(self, num_processo: str) -> ProcessoScrapedDTO:
+    def scrape_processo(self, num_processo: str, deadline: Optional[Deadline] = None) -> ProcessoScrapedDTO:
         """
         Realiza o scraping de um processo no PJE e retorna um objeto Processo.
         Este é o metodo principal que orquestra as etapas e trata as exceções.
 
         :param num_processo: O número do processo formatado.
+        :param deadline: Prazo da requisição; as esperas são limitadas ao tempo restante.
         :return: Um objeto Processo com os dados raspados.
         :raises BaseScrapingException: Se ocorrer qualquer erro durante o scraping (técnico ou de negócio).
         """
-        driver: Optional[WebDriver] = None
         try:
-            logger.info(f"Iniciando scraping do PJE para o processo: {num_processo}")
-
-            driver = WebDriverFactory.create_chrome_driver(headless=True)
-            wait = WebDriverWait(driver, self.DEFAULT_TIMEOUT)
+            logger.info("Iniciando scraping do PJE para o processo: %s", num_processo)
 
-            # Navega e realiza a busca
-            logger.info(f"Navegação e busca iniciada")
-            self._navigate_and_search(driver, num_processo, wait)
+            with self._driver_session(deadline) as driver:
+                # Navega e realiza a busca
+                logger.info("Navegação e busca iniciada")
+                self._navigate_and_search(driver, num_processo, deadline)
 
-            # Extrai os dados do processo
-            logger.info(f"Captura do Processo")
-            processo_entity = self._extract_data(driver, num_processo, wait)
+                # Extrai os dados do processo
+                logger.info("Captura do Processo")
+                self._emit_stage("extracting")
+                processo_entity = self._extract_data(driver, num_processo, deadline)
 
-            logger.info(f"Transformação para DTO Iniciada")
-            processo_dto: ProcessoScrapedDTO = ProcessMapper.from_entity_to_dto(processo_entity)
+            logger.info("Transformação para DTO Iniciada")
+            with SCRAPE_STAGE_SECONDS.time(system=self.SYSTEM_NAME, stage="mapper"):
+                processo_dto: ProcessoScrapedDTO = ProcessMapper.from_entity_to_dto(processo_entity)
 
             return processo_dto
 
         except BaseScrapingException: # Captura qualquer uma das nossas exceções base e as relança
             raise
-        except (TimeoutException, NoSuchElementException, WebDriverException, ProcessNotFoundException) as e:
+        except (TimeoutException, NoSuchElementException, WebDriverException) as e:
             # Captura exceções comuns do Selenium não tratadas em métodos internos
-            logger.error(f"Erro técnico de WebDriver/elemento no PJE para processo {num_processo}: {e}", exc_info=True)
+            logger.error("Erro técnico de WebDriver/elemento no PJE para processo %s: %s",
+                         num_processo, e, exc_info=True)
             raise ScraperTechnicalException(
                 f"Erro técnico durante o scraping do PJE para {num_processo}. Problema com o navegador ou elementos da página.",
                 code="PJE_WEBDRIVER_ERROR",
@@ -240,16 +249,13 @@ class PjeRjScraper(BaseScraper):
             )
         except Exception as e:
             # Captura qualquer outra exceção genérica e inesperada
-            logger.critical(f"Erro inesperado e não tratado durante o scraping do PJE para {num_processo}: {e}", exc_info=True)
+            logger.critical("Erro inesperado e não tratado durante o scraping do PJE para %s: %s",
+                            num_processo, e, exc_info=True)
             raise ScraperTechnicalException(
                 f"Erro inesperado no scraping do PJE para {num_processo}.",
                 code="PJE_UNEXPECTED_ERROR",
                 original_exception=e
             )
-        finally:
-            if driver:
-                driver.quit()
-                logger.info("WebDriver do PJE encerrado.")
 
 
 
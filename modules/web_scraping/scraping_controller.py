@@ -1,55 +1,249 @@
-from flask import Blueprint
+import contextvars
+import hashlib
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timezone
+from zoneinfo import ZoneInfo
+
+from flask import Blueprint, Response, current_app, request, stream_with_context
 from flask_pydantic import validate
+from pydantic_core import to_json
 
-from modules.models.process_dtos import WSRequest
-from modules.web_scraping.scrapers.pje_rj_scraper import PjeRjScraper
-from modules.web_scraping.scrapers.eproc_rj_scraper import EprocRjScraper
+from modules.core.deadline import deadline_from_request
+from modules.core.idempotency import idempotent
+from modules.core.process_consultant import ProcessConsultant
+from modules.models.exception.exceptions import BaseScrapingException
+from modules.models.exception.validations_exceptions import InvalidQueryParameterException, InvalidSystemException
+from modules.models.process_dtos import BatchScrapeRequest, WSRequest
+from modules.web_scraping.scrapers.base_scrapper import stage_listener
 import logging
 
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Criação de um Blueprint para organizar as rotas
 # O prefixo base será /api/v1/scrape
 scraping_bp = Blueprint('scraping_api', __name__, url_prefix='/api/v1/scrape')
 
+# Quantos processos de um lote são raspados ao mesmo tempo
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "4"))
+
+# max_age usado em requisições condicionais (If-None-Match/If-Modified-Since) sem max_age explícito:
+# um cliente que só quer saber se algo mudou é atendido pelo cache enquanto ele for recente
+CONDITIONAL_MAX_AGE_SECONDS = float(os.getenv("CONDITIONAL_MAX_AGE_SECONDS", "300"))
+
+# Intervalo dos comentários de keep-alive no stream SSE enquanto nenhuma etapa nova acontece
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Fuso dos horários raspados (dataHoraUltimaAtualizacao vem sem fuso, no horário do tribunal)
+COURT_TIMEZONE = ZoneInfo(os.getenv("COURT_TIMEZONE", "America/Sao_Paulo"))
+
+process_consultant = ProcessConsultant()
+
+@scraping_bp.route('/<system>', methods=['POST'])
+@idempotent
+@validate()
+def scrape_system(system: str, body: WSRequest):
+    """
+    Endpoint genérico de scraping: raspa o processo no sistema informado na URL, que pode ser o nome
+    (ex: 'pje_rj') ou o identificador numérico (ex: '2'). Passa pelo ProcessConsultant compartilhado,
+    que aplica retry, circuit breaker, cache e junta consultas simultâneas ao mesmo processo.
+
+    Query string opcional:
+    - max_age: idade máxima, em segundos, de um resultado em cache aceitável no lugar de uma nova raspagem;
+    - depth: quantos movimentos (os mais recentes) devolver.
+
+    A resposta traz ETag (hash dos movimentos) e Last-Modified (dataHoraUltimaAtualizacao); com
+    If-None-Match/If-Modified-Since, um processo sem mudanças responde 304 sem corpo.
+    """
+    return _scrape(system, body.numProcesso)
+
 @scraping_bp.route('/rj/pje', methods=['POST'])
+@idempotent
 @validate()
 def scrape_rj_pje(body:WSRequest):
     """
     Endpoint para realizar o scraping de um processo no PJE-RJ.
-    Recebe apenas o número do processo no corpo da requisição.
+    Alias de POST /api/v1/scrape/pje_rj.
     """
-    num_processo = body.numProcesso
-
-    logger.info(f"Requisição de scraping para PJE-RJ processo: {num_processo}")
-
-    scraper = PjeRjScraper()
-    processo_scraped = scraper.scrape_processo(num_processo)
-    logger.info(f"Scraping PJE-RJ concluído para {num_processo}")
-
-    # Retorna o objeto Processo raspado, serializado para JSON
-    return processo_scraped.model_dump_json(), 200, {'Content-Type': 'application/json'}
+    return _scrape("pje_rj", body.numProcesso)
 
 @scraping_bp.route('/rj/eproc', methods=['POST'])
+@idempotent
 @validate()
 def scrape_rj_eproc(body:WSRequest):
     """
     Endpoint para realizar o scraping de um processo no Eproc-RJ.
-    Recebe apenas o número do processo no corpo da requisição.
+    Alias de POST /api/v1/scrape/eproc_rj.
     """
-    num_processo = body.numProcesso
+    return _scrape("eproc_rj", body.numProcesso)
+
+
+def _scrape(system: str, num_processo: str):
+    try:
+        system_type = process_consultant.resolve_system_type(system)
+    except ValueError:
+        raise InvalidSystemException(system, list(process_consultant.scraper_classes.keys()))
+    max_age = _query_number("max_age", float)
+    depth = _query_number("depth", int)
+    if max_age is None and (request.if_none_match or request.if_modified_since):
+        max_age = CONDITIONAL_MAX_AGE_SECONDS
+
+    logger.info("Requisição de scraping para %s processo: %s", system_type, num_processo)
+
+    deadline = deadline_from_request(request.headers.get("X-Request-Timeout"))
+    processo_scraped = process_consultant.get_process_details(num_processo, system_type,
+                                                              deadline=deadline, max_age=max_age)
+    logger.info("Scraping %s concluído para %s", system_type, num_processo)
+
+    if depth is not None:
+        # Cópia rasa: o DTO pode ser o mesmo objeto guardado no cache do ProcessConsultant
+        processo_scraped = processo_scraped.model_copy(update={"movimentos": processo_scraped.movimentos[:depth]})
+
+    # Retorna o objeto Processo raspado, serializado para JSON (ou 304, se o cliente já tem esta versão)
+    response = current_app.response_class(processo_scraped.model_dump_json(), status=200,
+                                          mimetype='application/json')
+    response.set_etag(_movements_etag(processo_scraped))
+    last_modified = processo_scraped.dataHoraUltimaAtualizacao
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=COURT_TIMEZONE)
+    response.last_modified = last_modified.astimezone(timezone.utc)
+    return response.make_conditional(request)
+
+
+def _movements_etag(processo_scraped) -> str:
+    """Hash dos movimentos devolvidos: muda sempre que um movimento entra, sai ou é alterado."""
+    digest = hashlib.sha256()
+    for movimento in processo_scraped.movimentos:
+        digest.update(f"{movimento.dataHora.isoformat()}|{movimento.nome.strip()}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def _query_number(name: str, cast):
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    try:
+        value = cast(raw)
+    except ValueError:
+        value = -1
+    # float("nan") passa por "< 0": ?max_age=nan faria qualquer resultado em cache valer para sempre
+    if not math.isfinite(value) or value < 0:
+        raise InvalidQueryParameterException(name, raw, "número maior ou igual a zero")
+    return value
+
+
+@scraping_bp.route('/batch', methods=['POST'])
+@validate()
+def scrape_batch(body: BatchScrapeRequest):
+    """
+    Endpoint para raspar vários processos (sistema, número) numa só requisição.
+    Responde em NDJSON: uma linha por processo, na ordem em que terminam, com o ProcessoScrapedDTO
+    ou o erro. No máximo BATCH_SCRAPE_CONCURRENCY processos rodam ao mesmo tempo e um novo só é iniciado
+    depois que uma linha é entregue ao cliente, então a memória não cresce com o tamanho do lote.
+    """
+    timeout_header = request.headers.get("X-Request-Timeout")
+    logger.info("Requisição de scraping em lote com %s processos.", len(body.items))
+
+    def scrape_item(item):
+        return process_consultant.get_process_details(item.numProcesso, item.system,
+                                                      deadline=deadline_from_request(timeout_header))
+
+    def generate():
+        items = iter(enumerate(body.items))
+        executor = ThreadPoolExecutor(max_workers=BATCH_SCRAPE_CONCURRENCY, thread_name_prefix="batch-scrape")
+        in_flight = {}
+        try:
+            while True:
+                for index, item in items:
+                    in_flight[executor.submit(contextvars.copy_context().run, scrape_item, item)] = (index, item)
+                    if len(in_flight) >= BATCH_SCRAPE_CONCURRENCY:
+                        break
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, item = in_flight.pop(future)
+                    yield _batch_line(index, item, future) + "\n"
+        finally:
+            # Cliente desconectou ou lote terminou: não inicia o que ainda estava na fila
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@scraping_bp.route('/<system>/events', methods=['GET'])
+def scrape_system_events(system: str):
+    """
+    Versão em Server-Sent Events do scraping genérico: GET /api/v1/scrape/<system>/events?numProcesso=...
+    Transmite um evento por etapa do scraper (driver_ready, navigating, captcha_attempt, extracting), com o
+    tempo decorrido, e termina com `done` (o ProcessoScrapedDTO) ou `error`. O scraping roda numa thread
+    própria; se o cliente desconectar ele continua até o fim e o resultado fica no cache do ProcessConsultant.
+    """
+    num_processo = WSRequest(numProcesso=request.args.get("numProcesso", "")).numProcesso
+    try:
+        system_type = process_consultant.resolve_system_type(system)
+    except ValueError:
+        raise InvalidSystemException(system, list(process_consultant.scraper_classes.keys()))
+    max_age = _query_number("max_age", float)
+    deadline = deadline_from_request(request.headers.get("X-Request-Timeout"))
+
+    logger.info("Requisição de scraping (SSE) para %s processo: %s", system_type, num_processo)
+    events = queue.Queue()
+    started_at = time.monotonic()
+
+    def on_stage(_system, stage, data):
+        events.put((stage, dict(data, elapsed_seconds=round(time.monotonic() - started_at, 3))))
+
+    def run():
+        try:
+            with stage_listener(on_stage):
+                processo_scraped = process_consultant.get_process_details(num_processo, system_type,
+                                                                          deadline=deadline, max_age=max_age)
+            events.put(("done", dict(processo_scraped.model_dump(mode="json"),
+                                     elapsed_seconds=round(time.monotonic() - started_at, 3))))
+        except Exception as e:
+            events.put(("error", _error_body(e, num_processo)))
+
+    threading.Thread(target=contextvars.copy_context().run, args=(run,),
+                     name=f"sse-scrape-{num_processo}", daemon=True).start()
 
-    logger.info(f"Requisição de scraping para Eproc-RJ processo: {num_processo}")
+    def generate():
+        while True:
+            try:
+                stage, data = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {stage}\ndata: {to_json(data).decode('utf-8')}\n\n"
+            if stage in ("done", "error"):
+                return
 
-    scraper = EprocRjScraper()
-    processo_scraped = scraper.scrape_processo(num_processo)
-    logger.info(f"Scraping Eproc-RJ concluído para {num_processo}")
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    # Retorna o objeto Processo raspado, serializado para JSON
-    return processo_scraped.model_dump_json(), 200, {'Content-Type': 'application/json'}
 
+def _batch_line(index: int, item, future) -> str:
+    line = {"index": index, "system": item.system, "numProcesso": item.numProcesso}
+    try:
+        line["status"] = "success"
+        line["result"] = future.result()
+    except Exception as e:
+        line.update(status="error", error=_error_body(e, item.numProcesso))
+    # O DTO vai direto para o encoder do pydantic, sem passar por um dict intermediário
+    return to_json(line).decode("utf-8")
 
 
+def _error_body(e: Exception, num_processo: str) -> dict:
+    """Corpo de erro (formato do ResponseError) para respostas em stream, onde o handler global não atua."""
+    if isinstance(e, BaseScrapingException):
+        logger.warning("Erro no scraping do processo %s (Code: %s, Message: %s)", num_processo, e.code, e.message)
+        return {"message": e.message, "code": e.code, "details": e.details}
+    if isinstance(e, ValueError):
+        return {"message": str(e), "code": "INVALID_SYSTEM", "details": None}
+    logger.error("Erro inesperado no scraping do processo %s: %s", num_processo, e, exc_info=True)
+    return {"message": "Um erro interno inesperado ocorreu.", "code": "INTERNAL_SERVER_ERROR", "details": None}
@@ -1,3 +1,4 @@
+import logging
 import os
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -5,6 +6,8 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class WebDriverFactory:
     """
@@ -26,9 +29,9 @@ class WebDriverFactory:
         # Configurações de headless
         if headless:
             options.add_argument("--headless=new") # Modo mais recente e recomendado para headless
-            print("INFO: Executando Chrome em modo headless.")
+            logger.info("Executando Chrome em modo headless.")
         else:
-            print("INFO: Executando Chrome com UI visível (não headless).")
+            logger.info("Executando Chrome com UI visível (não headless).")
 
         # Argumentos essenciais para ambientes de servidor/Docker e para evitar detecção
         options.add_argument("--no-sandbox")
@@ -49,38 +52,38 @@ class WebDriverFactory:
 
         # Lógica para definir o caminho do chromedriver: Docker vs. Local
         if os.getenv("DOCKER_ENV", "false").lower() == "true":
-            print("INFO: Detectado ambiente Docker.")
+            logger.info("Detectado ambiente Docker.")
             if driver_path:
                 # Se um caminho explícito for fornecido, use-o (ideal para Dockerfile que instala chromedriver)
                 service = ChromeService(executable_path=driver_path)
-                print(f"INFO: Usando chromedriver no caminho especificado: {driver_path}")
+                logger.info("Usando chromedriver no caminho especificado: %s", driver_path)
             else:
                 # Em Docker, é altamente recomendado que o chromedriver esteja no PATH
                 # ou que você forneça um `driver_path` via variável de ambiente ou config.
                 # Se webdriver_manager for usado sem um driver_path, ele tentará baixar.
                 try:
                     service = ChromeService(ChromeDriverManager().install())
-                    print("INFO: Usando webdriver_manager para Docker (certifique-se de que o container tem as dependências para baixar).")
+                    logger.info("Usando webdriver_manager para Docker (certifique-se de que o container tem as dependências para baixar).")
                 except Exception as e:
-                    print(f"ERRO: Não foi possível instalar o chromedriver via webdriver_manager no Docker: {e}")
-                    print("Por favor, certifique-se de que o chromedriver está no PATH do container ou forneça um 'driver_path'.")
+                    logger.error("Não foi possível instalar o chromedriver via webdriver_manager no Docker: %s", e)
+                    logger.error("Por favor, certifique-se de que o chromedriver está no PATH do container ou forneça um 'driver_path'.")
                     raise RuntimeError(f"Falha ao iniciar ChromeDriver em Docker: {e}")
         else:
-            print("INFO: Detectado ambiente local.")
+            logger.info("Detectado ambiente local.")
             if driver_path:
                 service = ChromeService(executable_path=driver_path)
-                print(f"INFO: Usando chromedriver no caminho especificado: {driver_path}")
+                logger.info("Usando chromedriver no caminho especificado: %s", driver_path)
             else:
                 # Em ambiente local, webdriver_manager é a opção mais conveniente
                 service = ChromeService(ChromeDriverManager().install())
-                print("INFO: Usando chromedriver gerenciado automaticamente por webdriver_manager.")
+                logger.info("Usando chromedriver gerenciado automaticamente por webdriver_manager.")
 
         try:
             driver = webdriver.Chrome(service=service, options=options)
-            print("INFO: WebDriver Chrome iniciado com sucesso.")
+            logger.info("WebDriver Chrome iniciado com sucesso.")
             return driver
         except Exception as e:
-            print(f"ERRO: Falha ao iniciar WebDriver Chrome: {e}")
+            logger.error("Falha ao iniciar WebDriver Chrome: %s", e)
             raise RuntimeError(f"Não foi possível iniciar o WebDriver Chrome: {e}")
 
 
@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIMEOUTS_STATE_FILE = os.getenv("WAIT_TIMEOUTS_STATE_FILE", "data/wait_timeouts.json")
+
+
+class AdaptiveWaitTimeouts:
+    """
+    Aprende o timeout de cada espera nomeada dos scrapers (ex: "campo_pesquisa", "linha_resultado",
+    "imagem_captcha", "tabela_movimentos") a partir das latências observadas.
+
+    Para cada (sistema, espera) é mantida uma janela móvel das últimas `window_size` latências,
+    separada por hora do dia. Uma espera que estoura entra na janela com o timeout usado (a latência
+    real foi no mínimo essa), para que o timeout aprendido possa crescer depois de um período lento. O timeout é o p99 da janela vezes `margin_factor`
+    mais `margin_seconds`, limitado entre `min_timeout` e `max_timeout_factor` vezes o timeout fixo.
+    Enquanto não houver `min_samples` amostras na hora atual usa-se a janela de todas as horas, e sem
+    amostras suficientes nela o timeout fixo do scraper.
+
+    O estado é persistido em JSON (WAIT_TIMEOUTS_STATE_FILE) a cada `save_every` registros e ao encerrar o processo.
+    """
+
+    ALL_HOURS = "all"
+
+    def __init__(self, state_file: str = WAIT_TIMEOUTS_STATE_FILE,
+                 window_size: int = 200,
+                 min_samples: int = 20,
+                 margin_factor: float = 1.25,
+                 margin_seconds: float = 1.0,
+                 min_timeout: float = 1.0,
+                 max_timeout_factor: float = 3.0,
+                 save_every: int = 25):
+        self.state_file = state_file
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.margin_factor = margin_factor
+        self.margin_seconds = margin_seconds
+        self.min_timeout = min_timeout
+        self.max_timeout_factor = max_timeout_factor
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict[str, deque]] = {}
+        self._loaded = False
+        self._unsaved = 0
+
+    def timeout_for(self, system: str, wait_name: str, default_timeout: float, now: Optional[datetime] = None) -> float:
+        """Timeout a usar na espera `wait_name` do `system`, ou `default_timeout` se ainda não houver histórico."""
+        hour = str((now or datetime.now()).hour)
+
+        with self._lock:
+            self._ensure_loaded()
+            buckets = self._samples.get(self._key(system, wait_name), {})
+            window = buckets.get(hour)
+            if window is None or len(window) < self.min_samples:
+                window = buckets.get(self.ALL_HOURS)
+            if window is None or len(window) < self.min_samples:
+                return default_timeout
+            p99 = self._percentile(window, 0.99)
+
+        learned = p99 * self.margin_factor + self.margin_seconds
+        return min(max(learned, self.min_timeout), default_timeout * self.max_timeout_factor)
+
+    def record(self, system: str, wait_name: str, elapsed_seconds: float, now: Optional[datetime] = None):
+        """Registra a latência de uma espera que encontrou o elemento."""
+        self._append(system, wait_name, elapsed_seconds, now)
+
+    def record_timeout(self, system: str, wait_name: str, timeout_seconds: float, now: Optional[datetime] = None):
+        """
+        Registra uma espera que estourou o timeout. A amostra é o próprio timeout: contar só as esperas
+        bem-sucedidas faria o p99 apenas cair, e o timeout encolheria a cada período lento.
+        """
+        self._append(system, wait_name, timeout_seconds, now)
+
+    def _append(self, system: str, wait_name: str, seconds: float, now: Optional[datetime]):
+        hour = str((now or datetime.now()).hour)
+
+        with self._lock:
+            self._ensure_loaded()
+            buckets = self._samples.setdefault(self._key(system, wait_name), {})
+            for bucket in (hour, self.ALL_HOURS):
+                buckets.setdefault(bucket, deque(maxlen=self.window_size)).append(round(seconds, 3))
+
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if not self._loaded:
+                return
+            state = {key: {bucket: list(window) for bucket, window in buckets.items()}
+                     for key, buckets in self._samples.items()}
+            self._unsaved = 0
+
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning("Não foi possível salvar o estado dos timeouts aprendidos em '%s': %s", self.state_file, e)
+
+    def _ensure_loaded(self):
+        # Chamado com o lock adquirido
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+            self._samples = {
+                key: {bucket: deque(values, maxlen=self.window_size) for bucket, values in buckets.items()}
+                for key, buckets in state.items()
+            }
+            logger.info("Timeouts aprendidos carregados de '%s' (%s esperas).", self.state_file, len(self._samples))
+        except (OSError, ValueError) as e:
+            logger.warning("Estado dos timeouts aprendidos inválido em '%s'. Começando do zero: %s", self.state_file, e)
+
+    @staticmethod
+    def _key(system: str, wait_name: str) -> str:
+        return f"{system}:{wait_name}"
+
+    @staticmethod
+    def _percentile(values, q: float) -> float:
+        ordered = sorted(values)
+        index = max(math.ceil(q * len(ordered)) - 1, 0)
+        return ordered[index]
+
+
+wait_timeouts = AdaptiveWaitTimeouts()
+atexit.register(wait_timeouts.save)
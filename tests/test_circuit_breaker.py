@@ -0,0 +1,54 @@
+from modules.core.circuit_breaker import CircuitBreaker, CircuitState
+from modules.models.exception.exceptions import (
+    DeadlineExceededException, ProcessNotFoundException, ScraperTechnicalException
+)
+
+
+def make_breaker(threshold: int = 3) -> CircuitBreaker:
+    return CircuitBreaker("pje_rj", failure_codes={"PJE_WEBDRIVER_ERROR"}, failure_threshold=threshold,
+                          recovery_timeout=60)
+
+
+def webdriver_error():
+    return ScraperTechnicalException("falha", code="PJE_WEBDRIVER_ERROR")
+
+
+def test_listed_failures_open_the_circuit():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure(webdriver_error())
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_unexpected_errors_count_as_failures():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure(RuntimeError("erro inesperado"))
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_unmapped_code_does_not_reset_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(ScraperTechnicalException("falha", code="PJE_PARTIES_ELEMENT_MISSING"))
+    breaker.record_failure(webdriver_error())
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_deadline_exceeded_is_neutral():
+    breaker = make_breaker()
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(DeadlineExceededException(stage="scraping", budget=5))
+    breaker.record_failure(webdriver_error())
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_business_error_counts_as_success():
+    breaker = make_breaker()
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(webdriver_error())
+    breaker.record_failure(ProcessNotFoundException("0000000-00.0000.0.00.0000"))
+    breaker.record_failure(webdriver_error())
+    assert breaker.state == CircuitState.CLOSED
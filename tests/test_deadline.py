@@ -0,0 +1,13 @@
+from modules.core.deadline import REQUEST_DEADLINE_SECONDS, deadline_from_request
+
+
+def test_request_can_shorten_the_deadline():
+    assert deadline_from_request("5").budget == 5
+    assert deadline_from_request(str(REQUEST_DEADLINE_SECONDS * 10)).budget == REQUEST_DEADLINE_SECONDS
+
+
+def test_invalid_header_values_fall_back_to_the_default():
+    for value in ("nan", "NaN", "inf", "-inf", "-5", "0", "abc", ""):
+        deadline = deadline_from_request(value)
+        assert deadline.budget == REQUEST_DEADLINE_SECONDS, value
+        assert not deadline.expired
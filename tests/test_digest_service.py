@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.message.whatsapp.digest_service import DigestStore, NotificationDigestService
+from modules.models.process_dtos import AnaliseUltimoMovimentoDTO, MovimentoDTO
+
+
+class FakeOutboundQueue:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.enqueued = []
+
+    def enqueue(self, recipient_wpp: str, message_body: str):
+        if self.fail:
+            raise RuntimeError("fila indisponível")
+        self.enqueued.append((recipient_wpp, message_body))
+
+
+def add_items(store: DigestStore, recipient: str, count: int):
+    store.add([(recipient, f"{i:07d}-00.2024.8.19.0001", "TJRJ", "Eproc", "AUTOR: Fulano", f"Despacho {i}",
+                time.time()) for i in range(count)])
+
+
+def test_failed_enqueue_keeps_items_for_next_flush(tmp_path):
+    store = DigestStore(str(tmp_path / "monitor.db"))
+    add_items(store, "+5521999990000", 3)
+
+    failing = NotificationDigestService(FakeOutboundQueue(fail=True), store=store)
+    assert failing.flush(force=True) == 0
+
+    queue = FakeOutboundQueue()
+    service = NotificationDigestService(queue, store=store)
+    assert service.flush(force=True) == 1
+    assert all(f"Despacho {i}" in queue.enqueued[0][1] for i in range(3))
+    assert store.due_recipients(float("inf")) == []
+
+
+def test_items_claimed_by_a_crashed_flush_return_after_the_lease(tmp_path):
+    store = DigestStore(str(tmp_path / "monitor.db"))
+    add_items(store, "+5521999990000", 2)
+    assert len(store.claim("+5521999990000", "processo-que-caiu", lease_seconds=0.2)) == 2
+
+    queue = FakeOutboundQueue()
+    service = NotificationDigestService(queue, store=store)
+    assert service.flush(force=True) == 0
+    time.sleep(0.3)
+    assert service.flush(force=True) == 1
+    assert store.confirm("+5521999990000", "processo-que-caiu") == 0
+
+
+def make_analise(nomes: list) -> AnaliseUltimoMovimentoDTO:
+    base = datetime(2025, 6, 2, 10, 0)
+    movimentos = [MovimentoDTO(nome=nome, dataHora=base + timedelta(hours=i)) for i, nome in enumerate(nomes)]
+    return AnaliseUltimoMovimentoDTO.model_construct(
+        partesEnvolvidas="AUTOR: Fulano", numeroProcesso="0000001-00.2024.8.19.0001", tribunal="TJRJ",
+        sistema="Eproc", novosMovimentos=movimentos
+    )
+
+
+def test_urgent_movement_that_cannot_be_enqueued_goes_to_the_digest(tmp_path):
+    store = DigestStore(str(tmp_path / "monitor.db"))
+    service = NotificationDigestService(FakeOutboundQueue(fail=True), store=store)
+
+    service.consume("+5521999990000", make_analise(["Despacho", "Sentença publicada", "Juntada"]))
+
+    queue = FakeOutboundQueue()
+    assert NotificationDigestService(queue, store=store).flush(force=True) == 1
+    assert all(nome in queue.enqueued[0][1] for nome in ("Despacho", "Sentença publicada", "Juntada"))
+
+
+def test_items_separated_before_a_failure_are_kept(tmp_path, monkeypatch):
+    store = DigestStore(str(tmp_path / "monitor.db"))
+    service = NotificationDigestService(FakeOutboundQueue(), store=store)
+    analise = make_analise(["Despacho", "Juntada"])
+    original = service.is_urgent
+
+    def failing_is_urgent(nome):
+        if nome == "Juntada":
+            raise RuntimeError("falha no meio do lote")
+        return original(nome)
+
+    monkeypatch.setattr(service, "is_urgent", failing_is_urgent)
+    with pytest.raises(RuntimeError):
+        service.consume("+5521999990000", analise)
+    monkeypatch.setattr(service, "is_urgent", original)
+
+    # A reentrega do mesmo processo não duplica o que já estava pendente
+    service.consume("+5521999990000", analise)
+    items = store.claim("+5521999990000", "teste", lease_seconds=60)
+    assert sorted(item["nome"] for item in items) == ["Despacho", "Juntada"]
@@ -0,0 +1,54 @@
+import pytest
+from flask import Flask
+
+from modules.core import idempotency
+from modules.core.idempotency import idempotent
+from modules.core.storage.idempotency_store import IdempotencyStore
+from modules.models.exception.exceptions import ProcessNotFoundException, ScraperTechnicalException
+from modules.models.exception.global_exception_handler import exception_scrape_bp
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(idempotency, "_store", IdempotencyStore(str(tmp_path / "idempotency.db")))
+    calls = {"not_found": 0, "technical": 0}
+    app = Flask(__name__)
+    app.register_blueprint(exception_scrape_bp)
+
+    @app.route("/not-found", methods=["POST"])
+    @idempotent
+    def not_found():
+        calls["not_found"] += 1
+        raise ProcessNotFoundException("0000000-00.2024.8.19.0001")
+
+    @app.route("/technical", methods=["POST"])
+    @idempotent
+    def technical():
+        calls["technical"] += 1
+        raise ScraperTechnicalException(message="Falha no navegador", code="DRIVER_ERROR")
+
+    return app.test_client(), calls
+
+
+def test_handled_business_error_is_stored_and_replayed(client):
+    client, calls = client
+    first = client.post("/not-found", json={}, headers={"Idempotency-Key": "k1"})
+    second = client.post("/not-found", json={}, headers={"Idempotency-Key": "k1"})
+
+    assert first.status_code == second.status_code == 404
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.get_json()["code"] == "PROCESS_NOT_FOUND"
+    assert calls["not_found"] == 1
+
+
+def test_server_error_is_not_stored(client):
+    client, calls = client
+    for _ in range(2):
+        response = client.post("/technical", json={}, headers={"Idempotency-Key": "k2"})
+        assert response.status_code == 500
+        assert "Idempotent-Replayed" not in response.headers
+    assert calls["technical"] == 2
+
+
+def test_stale_takeover_waits_longer_than_the_request_deadline():
+    assert idempotency.IDEMPOTENCY_STALE_AFTER_SECONDS > idempotency.REQUEST_DEADLINE_SECONDS
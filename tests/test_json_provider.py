@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+
+from flask import Flask
+
+from modules.models.process_dtos import MovimentoDTO
+from modules.models.utils.json_provider import PydanticJSONProvider
+
+
+def make_provider(**attributes) -> PydanticJSONProvider:
+    provider = PydanticJSONProvider(Flask(__name__))
+    for name, value in attributes.items():
+        setattr(provider, name, value)
+    return provider
+
+
+def test_default_output_keeps_field_order_and_utf8():
+    movimento = MovimentoDTO(ordem=1, nome="Decisão", dataHora=datetime(2025, 1, 2, 3, 4, 5))
+    dumped = make_provider().dumps({"z": 1, "movimento": movimento})
+
+    assert dumped.index('"z"') < dumped.index('"movimento"')
+    assert "Decisão" in dumped
+    assert json.loads(dumped)["movimento"]["dataHora"] == "2025-01-02T03:04:05"
+
+
+def test_sort_keys_and_ensure_ascii_are_honored():
+    obj = {"z": 1, "a": "Decisão"}
+    for provider, kwargs in ((make_provider(), dict(sort_keys=True, ensure_ascii=True)),
+                             (make_provider(sort_keys=True, ensure_ascii=True), {})):
+        dumped = provider.dumps(obj, **kwargs)
+        assert dumped.index('"a"') < dumped.index('"z"')
+        assert "\\u00e3" in dumped
+        assert json.loads(dumped) == obj
+
+
+def test_sort_keys_fallback_still_serializes_pydantic_models():
+    movimento = MovimentoDTO(ordem=1, nome="Decisão", dataHora=datetime(2025, 1, 2, 3, 4, 5))
+    dumped = make_provider().dumps({"movimento": movimento}, sort_keys=True)
+    assert json.loads(dumped)["movimento"]["nome"] == "Decisão"
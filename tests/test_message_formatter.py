@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from modules.message.whatsapp.templates.message_formatter import format_digest_messages
+
+
+def make_items(count: int, processes: int, nome: str = "Juntada de petição intercorrente", partes: str = None):
+    started_at = datetime(2025, 1, 1)
+    return [
+        dict(numero_processo=f"{i % processes:07d}-00.2024.8.19.0001", tribunal="TJRJ", sistema="Eproc",
+             partes=partes or "AUTOR: Fulano de Tal; RÉU: Beltrano", nome=f"{nome} {i}" * (1 + i % 4),
+             data_hora=started_at + timedelta(hours=i))
+        for i in range(count)
+    ]
+
+
+def test_every_part_fits_in_max_length():
+    items = make_items(400, 7)
+    for max_length in (1600, 700, 300):
+        messages = format_digest_messages(items, max_length=max_length)
+        assert len(messages) > 1
+        assert all(len(m) <= max_length for m in messages)
+        assert all(m.startswith(f"({i}/{len(messages)}) ") for i, m in enumerate(messages, start=1))
+
+
+def test_all_movements_are_kept_and_split_processes_are_marked():
+    items = make_items(120, 2)
+    messages = format_digest_messages(items, max_length=600)
+    text = "\n".join(messages)
+    for item in items:
+        assert f"{item['data_hora']:%d/%m/%Y %H:%M} - " in text
+    assert "(continuação)" in text
+
+
+def test_oversized_item_is_cut_to_fit():
+    items = make_items(3, 1, nome="x" * 5000, partes="AUTOR: " + "Fulano " * 1000)
+    messages = format_digest_messages(items, max_length=1600)
+    assert all(len(m) <= 1600 for m in messages)
+    assert "…" in messages[0]
+
+
+def test_small_digest_is_a_single_unnumbered_message():
+    messages = format_digest_messages(make_items(2, 2))
+    assert len(messages) == 1
+    assert messages[0].startswith("*📬 Resumo de movimentações (2 processo(s), 2 movimento(s)):*")
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from modules.core.consults.movement_analytics import MovementColumns, analyze_recency, last_movement
+from modules.models.process_dtos import MovimentoDTO, ProcessoScrapedDTO
+
+NOW = datetime(2025, 3, 10, 12, 0)
+
+
+def make_dto(numero: str, tribunal: str, hours_ago: list) -> ProcessoScrapedDTO:
+    movimentos = [MovimentoDTO.model_construct(ordem=i, nome=f"Movimento {i}", dataHora=NOW - timedelta(hours=h))
+                  for i, h in enumerate(hours_ago)]
+    return ProcessoScrapedDTO.model_construct(
+        partesEnvolvidas="", numeroProcesso=numero, tribunal=tribunal, sistema="pje_rj", grau="1",
+        dataHoraUltimaAtualizacao=NOW, movimentos=movimentos
+    )
+
+
+def test_grouped_last_movement_matches_max_per_process():
+    dtos = [
+        make_dto("1", "TJRJ", [5, 1, 30]),
+        make_dto("2", "TJRJ", []),
+        make_dto("3", "TRF2", [2, 2, 8]),  # empate: vale o primeiro, como em max()
+        make_dto("4", "TRF2", [100]),
+    ]
+    analysis = analyze_recency(MovementColumns.from_scraped(dtos, changed=[True, False, False, True]), now=NOW)
+
+    for dto, index in zip(dtos, analysis.last_index):
+        expected = max(dto.movimentos, key=lambda m: m.dataHora) if dto.movimentos else None
+        assert (dto.movimentos[index] if index >= 0 else None) is expected
+        assert last_movement(dto.movimentos) is expected
+    assert np.allclose(analysis.delta_hours[[0, 2, 3]], [1, 2, 100])
+    assert np.isnan(analysis.delta_hours[1])
+
+
+def test_summary_counts_changed_processes_from_the_diff():
+    columns = MovementColumns()
+    columns.append(make_dto("1", "TJRJ", [1]), changed=False)  # recente, mas sem movimento novo
+    columns.append(make_dto("2", "TJRJ", [500]), changed=True)
+    columns.append(make_dto("3", "TRF2", []), changed=False)
+
+    summary = analyze_recency(columns, now=NOW).summary()
+    assert (summary["processes"], summary["with_movements"], summary["changed"]) == (3, 2, 1)
+    assert set(summary["staleness_by_tribunal"]) == {"TJRJ"}
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from modules.core.storage.movement_fingerprint_store import MovementFingerprintStore
+from modules.models.process_dtos import MovimentoDTO
+
+PROCESSO = "0000001-00.2024.8.19.0001"
+
+
+def movimento(nome: str, data_hora: datetime, estimada: bool = False) -> MovimentoDTO:
+    return MovimentoDTO(nome=nome, dataHora=data_hora, dataHoraEstimada=estimada)
+
+
+def test_first_scrape_is_baseline_even_without_movements(tmp_path):
+    store = MovementFingerprintStore(str(tmp_path / "monitor.db"))
+
+    assert store.diff("1", PROCESSO, []) == ([], True)
+
+    novo = movimento("Distribuído", datetime(2025, 6, 2, 10, 0))
+    assert store.diff("1", PROCESSO, [novo]) == ([novo], False)
+
+
+def test_movement_without_date_is_reported_once(tmp_path):
+    store = MovementFingerprintStore(str(tmp_path / "monitor.db"))
+    store.diff("1", PROCESSO, [movimento("Distribuído", datetime(2025, 6, 2, 10, 0))])
+
+    sem_data = movimento("Juntada", datetime(2025, 6, 3, 9, 0), estimada=True)
+    novos, _ = store.diff("1", PROCESSO, [sem_data])
+    assert novos == [sem_data]
+    store.record("1", PROCESSO, novos)
+
+    # Na consulta seguinte a data estimada (hora da raspagem) é outra, mas o movimento é o mesmo
+    novos, _ = store.diff("1", PROCESSO, [movimento("Juntada", datetime(2025, 6, 3, 9, 30), estimada=True)])
+    assert novos == []
+
+
+def test_new_movements_stay_new_until_recorded(tmp_path):
+    store = MovementFingerprintStore(str(tmp_path / "monitor.db"))
+    antigo = movimento("Distribuído", datetime(2025, 6, 2, 10, 0))
+    store.diff("1", PROCESSO, [antigo])
+
+    novo = movimento("Sentença", datetime(2025, 6, 5, 16, 0))
+    # A notificação falhou e nada foi registrado: o movimento continua novo
+    assert store.diff("1", PROCESSO, [novo, antigo]) == ([novo], False)
+    assert store.diff("1", PROCESSO, [novo, antigo]) == ([novo], False)
+
+    store.record("1", PROCESSO, [novo])
+    assert store.diff("1", PROCESSO, [novo, antigo]) == ([], False)
+
+
+def test_excluded_flag_is_not_serialized():
+    dumped = movimento("Juntada", datetime(2025, 6, 3, 9, 0), estimada=True).model_dump()
+    assert "dataHoraEstimada" not in dumped
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import Counter
+
+from modules.message.whatsapp.outbound_queue import (
+    OutboundMessageStore, OutboundWhatsappQueue, STATUS_FAILED, STATUS_SENDING, STATUS_SENT
+)
+
+
+class FakeWhatsappService:
+    twilio_phone_number = "+552130000000"
+
+    def __init__(self, sent: Counter, lock: threading.Lock, latency: float = 0.002):
+        self.sent = sent
+        self.lock = lock
+        self.latency = latency
+
+    def send_whatsapp_message(self, recipient_wpp: str, message_body: str) -> dict:
+        time.sleep(self.latency)
+        with self.lock:
+            self.sent[message_body] += 1
+        return {"message_sid": f"SM{message_body}"}
+
+
+def make_queue(db_path: str, sent: Counter, lock: threading.Lock, **kwargs) -> OutboundWhatsappQueue:
+    options = dict(rate_per_second=10_000, burst=10_000, batch_size=5, lease_seconds=60)
+    options.update(kwargs)
+    return OutboundWhatsappQueue(FakeWhatsappService(sent, lock), store=OutboundMessageStore(db_path), **options)
+
+
+def wait_until(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_two_dispatchers_on_one_database_send_each_message_once(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    sent, lock = Counter(), threading.Lock()
+    queue_a = make_queue(db_path, sent, lock)
+    queue_b = make_queue(db_path, sent, lock)
+
+    for i in range(100):
+        (queue_a if i % 2 else queue_b).enqueue(f"+55219999{i:05d}", f"mensagem {i}")
+    try:
+        assert wait_until(lambda: sum(sent.values()) >= 100)
+        # Um dispatcher que inicia ou para depois não pode devolver à fila o que o outro já reivindicou
+        queue_a.stop(timeout=5)
+        queue_b.start()
+        time.sleep(0.2)
+    finally:
+        queue_a.stop(timeout=5)
+        queue_b.stop(timeout=5)
+
+    assert len(sent) == 100
+    assert set(sent.values()) == {1}
+
+
+def test_starting_a_dispatcher_does_not_steal_leased_messages(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    sent, lock = Counter(), threading.Lock()
+    store = OutboundMessageStore(db_path)
+    store.enqueue(FakeWhatsappService.twilio_phone_number, "+5521999990000", "mensagem reivindicada", dedup_window=600)
+    assert len(store.claim_ready("outro-dispatcher", 10, lease_seconds=60, max_attempts=5)) == 1
+
+    queue = make_queue(db_path, sent, lock)
+    queue.start()
+    time.sleep(0.2)
+    queue.stop(timeout=5)
+
+    assert sent == Counter()
+    message = store.get(1)
+    assert (message["status"], message["claimed_by"]) == (STATUS_SENDING, "outro-dispatcher")
+
+
+def test_expired_lease_is_sent_by_another_dispatcher(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    sent, lock = Counter(), threading.Lock()
+    store = OutboundMessageStore(db_path)
+    store.enqueue(FakeWhatsappService.twilio_phone_number, "+5521999990000", "mensagem órfã", dedup_window=600)
+    store.claim_ready("dispatcher-morto", 10, lease_seconds=0.1, max_attempts=5)
+
+    queue = make_queue(db_path, sent, lock)
+    queue.start()
+    try:
+        assert wait_until(lambda: store.get(1)["status"] == STATUS_SENT)
+    finally:
+        queue.stop(timeout=5)
+    assert sent == Counter({"mensagem órfã": 1})
+    assert store.get(1)["attempts"] == 2
+
+
+def test_message_whose_lease_keeps_expiring_fails_at_max_attempts(tmp_path):
+    store = OutboundMessageStore(str(tmp_path / "monitor.db"))
+    store.enqueue(FakeWhatsappService.twilio_phone_number, "+5521999990000", "mensagem venenosa", dedup_window=600)
+
+    for attempt in range(3):
+        assert len(store.claim_ready(f"dispatcher-{attempt}", 10, lease_seconds=0, max_attempts=3)) == 1
+        time.sleep(0.01)
+    assert store.claim_ready("dispatcher-3", 10, lease_seconds=60, max_attempts=3) == []
+
+    message = store.get(1)
+    assert (message["status"], message["attempts"], message["claimed_by"]) == (STATUS_FAILED, 3, None)
+
+
+def test_start_sends_messages_left_pending_by_a_previous_process(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    sent, lock = Counter(), threading.Lock()
+    OutboundMessageStore(db_path).enqueue(FakeWhatsappService.twilio_phone_number, "+5521999990000",
+                                          "mensagem de antes do reinício", dedup_window=600)
+
+    queue = make_queue(db_path, sent, lock)
+    queue.start()
+    try:
+        assert wait_until(lambda: sent == Counter({"mensagem de antes do reinício": 1}))
+    finally:
+        queue.stop(timeout=5)
+
+
+def test_rate_limit_is_shared_between_dispatchers(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    store_a, store_b = OutboundMessageStore(db_path), OutboundMessageStore(db_path)
+
+    assert store_a.take_send_token("+552130000000", rate=1, capacity=2) == 0
+    assert store_b.take_send_token("+552130000000", rate=1, capacity=2) == 0
+    assert store_a.take_send_token("+552130000000", rate=1, capacity=2) > 0
+    assert store_b.take_send_token("+552130000000", rate=1, capacity=2) > 0
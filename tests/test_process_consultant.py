@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from modules.core.deadline import Deadline
+from modules.core.process_consultant import ProcessConsultant
+from modules.models.exception.exceptions import DeadlineExceededException
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    key = ("eproc", "0000000-00.2024.8.19.0001")
+    started, release = threading.Event(), threading.Event()
+
+    def slow_scrape():
+        started.set()
+        release.wait(5)
+        return "resultado"
+
+    leader_result = []
+    leader = threading.Thread(
+        target=lambda: leader_result.append(ProcessConsultant._single_flight(key, slow_scrape, Deadline(10)))
+    )
+    leader.start()
+    assert started.wait(5)
+
+    with pytest.raises(DeadlineExceededException) as exc_info:
+        ProcessConsultant._single_flight(key, slow_scrape, Deadline(0.2))
+    assert exc_info.value.code == "DEADLINE_EXCEEDED"
+
+    release.set()
+    leader.join(5)
+    assert leader_result == ["resultado"]
+
+
+def test_follower_shares_the_leader_result():
+    key = ("eproc", "0000001-00.2024.8.19.0001")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def scrape():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "resultado"
+
+    leader = threading.Thread(target=ProcessConsultant._single_flight, args=(key, scrape, Deadline(10)))
+    leader.start()
+    assert started.wait(5)
+    threading.Timer(0.1, release.set).start()
+
+    assert ProcessConsultant._single_flight(key, scrape, Deadline(5)) == "resultado"
+    leader.join(5)
+    assert len(calls) == 1
@@ -0,0 +1,21 @@
+import pytest
+from flask import Flask
+
+from modules.models.exception.validations_exceptions import InvalidQueryParameterException
+from modules.web_scraping.scraping_controller import _query_number
+
+app = Flask(__name__)
+
+
+@pytest.mark.parametrize("raw", ["nan", "NaN", "inf", "-1", "abc"])
+def test_query_number_rejects_non_finite_and_negative_values(raw):
+    with app.test_request_context(f"/?max_age={raw}"):
+        with pytest.raises(InvalidQueryParameterException):
+            _query_number("max_age", float)
+
+
+def test_query_number_accepts_finite_non_negative_values():
+    with app.test_request_context("/?max_age=0&depth=3"):
+        assert _query_number("max_age", float) == 0
+        assert _query_number("depth", int) == 3
+        assert _query_number("ausente", int) is None
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from modules.web_scraping.wait_timeouts import AdaptiveWaitTimeouts
+
+NOW = datetime(2025, 6, 2, 14, 0)
+
+
+def make_timeouts(tmp_path) -> AdaptiveWaitTimeouts:
+    return AdaptiveWaitTimeouts(state_file=str(tmp_path / "wait_timeouts.json"), window_size=50, min_samples=5,
+                                save_every=10_000)
+
+
+def test_successful_waits_shrink_the_timeout(tmp_path):
+    timeouts = make_timeouts(tmp_path)
+    for _ in range(10):
+        timeouts.record("pje_rj", "campo_pesquisa", 1.0, now=NOW)
+    assert timeouts.timeout_for("pje_rj", "campo_pesquisa", 20, now=NOW) == 1.0 * 1.25 + 1.0
+
+
+def test_timeout_never_shrinks_when_every_wait_times_out(tmp_path):
+    timeouts = make_timeouts(tmp_path)
+    for _ in range(10):
+        timeouts.record("pje_rj", "campo_pesquisa", 1.0, now=NOW)
+
+    previous = timeouts.timeout_for("pje_rj", "campo_pesquisa", 20, now=NOW)
+    for _ in range(100):
+        timeouts.record_timeout("pje_rj", "campo_pesquisa", previous, now=NOW)
+        current = timeouts.timeout_for("pje_rj", "campo_pesquisa", 20, now=NOW)
+        assert current >= previous
+        previous = current
+
+    # Sem nenhuma espera bem-sucedida, o timeout cresce até o teto (3x o timeout fixo)
+    assert previous == 20 * timeouts.max_timeout_factor
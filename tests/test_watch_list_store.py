@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+
+from modules.core.storage.watch_list_store import WatchListStore
+
+
+def populate(db_path: str, processes: int) -> WatchListStore:
+    store = WatchListStore(db_path)
+    store.bulk_import(
+        {"adv_wpp": f"55219999{i % 7:05d}", "system_identifier": str(1 + i % 2),
+         "num_processo": f"{i:07d}-00.2024.8.19.0001"}
+        for i in range(processes)
+    )
+    return store
+
+
+def _claim_until_empty(db_path: str, node_id: str, start, results):
+    store = WatchListStore(db_path)  # outro processo, outra conexão: como outro nó
+    start.wait()
+    keys = []
+    while True:
+        batch = store.claim_due_processes(node_id, due_before=time.time(), batch_size=7, lease_seconds=60)
+        if not batch:
+            break
+        keys.extend((p["system_identifier"], p["num_processo"]) for p in batch)
+    results.put((node_id, keys))
+
+
+def test_concurrent_processes_never_claim_the_same_process(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    populate(db_path, 300)
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=_claim_until_empty, args=(db_path, f"node-{n}", start, results))
+               for n in range(4)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    claimed = dict(results.get(timeout=60) for _ in workers)
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    all_keys = [key for keys in claimed.values() for key in keys]
+    assert len(all_keys) == len(set(all_keys)) == 300
+
+
+def test_claim_skips_excluded_processes_without_leasing_them(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    populate(db_path, 4)
+    node_a, node_b = WatchListStore(db_path), WatchListStore(db_path)
+    excluded = {"0000000-00.2024.8.19.0001", "0000002-00.2024.8.19.0001"}
+
+    claimed = node_a.claim_due_processes("a", due_before=time.time(), batch_size=10, lease_seconds=60,
+                                         exclude=excluded)
+    assert {p["num_processo"] for p in claimed} == {"0000001-00.2024.8.19.0001", "0000003-00.2024.8.19.0001"}
+    reclaimed = node_b.claim_due_processes("b", due_before=time.time(), batch_size=10, lease_seconds=60)
+    assert {p["num_processo"] for p in reclaimed} == excluded
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    db_path = str(tmp_path / "monitor.db")
+    populate(db_path, 3)
+    node_a, node_b = WatchListStore(db_path), WatchListStore(db_path)
+
+    assert len(node_a.claim_due_processes("a", due_before=time.time(), batch_size=10, lease_seconds=0.2)) == 3
+    assert node_b.claim_due_processes("b", due_before=time.time(), batch_size=10, lease_seconds=60) == []
+
+    time.sleep(0.3)
+    reclaimed = node_b.claim_due_processes("b", due_before=time.time(), batch_size=10, lease_seconds=60)
+    assert len(reclaimed) == 3
+    assert node_a.renew_leases("a", lease_seconds=60) == 0